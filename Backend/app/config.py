@@ -47,8 +47,43 @@ class Settings(BaseSettings):
     
     # ML Models Path
     ML_MODELS_PATH: str = "../models"
+    # Where incidents are scored: "in-process" (models loaded here) or "remote" (the models API)
+    ML_BACKEND: str = "in-process"
     ML_API_BASE_URL: str = "http://127.0.0.1:8000"
+
+    # Shared ML API client (see utils/ml_service.py)
+    ML_API_MAX_CONNECTIONS: int = 100
+    ML_API_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ML_API_KEEPALIVE_EXPIRY: float = 30.0
+    ML_API_HTTP2: bool = False  # needs the 'h2' package and an HTTP/2-capable ML API
+    ML_API_TIMEOUT: float = 10.0
+    ML_API_CONNECT_TIMEOUT: float = 2.0
+    # Per-category overrides of ML_API_TIMEOUT ("scan" for the composite call), e.g. "phishing=5,zero-day=2"
+    ML_API_ENDPOINT_TIMEOUTS: Optional[str] = None
+    # Circuit breaker: consecutive failures that open it, and seconds before a trial call
+    ML_API_BREAKER_FAILURES: int = 5
+    ML_API_BREAKER_RESET_SECONDS: float = 30.0
+    # Adaptive timeouts: p95 latency x multiplier, between ML_API_MIN_TIMEOUT and the configured timeout
+    ML_API_ADAPTIVE_TIMEOUTS: bool = True
+    ML_API_TIMEOUT_P95_MULTIPLIER: float = 3.0
+    ML_API_MIN_TIMEOUT: float = 0.5
+    # Hedged requests to a second ML API replica, sent after ML_API_HEDGE_AFTER_MS (default: observed p95)
+    ML_API_HEDGE_BASE_URL: Optional[str] = None
+    ML_API_HEDGE_AFTER_MS: Optional[float] = None
+
+    # In-process prediction cache (0 entries disables it)
+    PREDICTION_CACHE_SIZE: int = 10000
+    PREDICTION_CACHE_TTL_SECONDS: int = 600
+
+    # Seconds between checks for retrained model files (0 disables hot reload)
+    ML_MODEL_RELOAD_INTERVAL: float = 10.0
     
+    # Background enrichment of new incidents (see utils/enrichment_queue.py)
+    ENRICHMENT_QUEUE_PATH: str = "enrichment_queue.db"
+    ENRICHMENT_WORKERS: int = 2
+    ENRICHMENT_MAX_ATTEMPTS: int = 5
+    ENRICHMENT_RETRY_SECONDS: float = 5.0  # doubled after each failed attempt
+
     # Debug Mode
     DEBUG: bool = True
     
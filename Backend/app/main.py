@@ -7,6 +7,8 @@ from fastapi.responses import JSONResponse
 from app.config import settings
 from app.routes import auth, incidents, admin, report, notifications, llm, chat
 from app.utils.firebase import initialize_firebase
+from app.utils.ml_backend import ml_backend
+from app.utils.enrichment_queue import enrichment_queue
 import uvicorn
 
 # Create media directory if it doesn't exist
@@ -33,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize Firebase
@@ -72,6 +75,21 @@ async def health_check():
         "version": settings.VERSION
     }
 
+# Readiness check endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: per-model ML load state, 503 until every model is loaded"""
+    ml = await ml_backend.readiness()
+    return JSONResponse(
+        status_code=200 if ml["ready"] else 503,
+        content={
+            "status": "ready" if ml["ready"] else "not ready",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "ml_backend": ml_backend.name,
+            "models": ml["models"]
+        }
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -91,12 +109,16 @@ async def startup_event():
     """Application startup event"""
     print(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
     print("API Documentation available at /docs")
+    await ml_backend.start()
+    await enrichment_queue.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     print("Shutting down CyberRakshak API")
+    await enrichment_queue.close()
+    await ml_backend.close()
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,21 +1,26 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Response
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import io
 import csv
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from app.models.user import UserStatusUpdate
+from app.models.user import User, UserStatusUpdate
 from app.models.response import ( # This AdminAction is not used, the one in this file is.
     StandardResponse, AnalyticsData, SystemStatus, AdminSummary, 
     AdminAction, BulkNotification, SystemAction
 )
 from app.utils.auth import require_admin, verify_password, get_password_hash
-from app.utils.firebase import db, get_timestamp
+from app.utils.firebase import async_db, get_timestamp
 from app.utils.helpers import (
     generate_analytics_data, generate_system_status, 
     generate_admin_actions, generate_random_string
 )
 from app.config import settings
+from app.utils.ml_backend import ml_backend
+from app.utils.enrichment_queue import enrichment_queue
+from app.utils.ml_models import MODEL_NAMES
 from pydantic import BaseModel, EmailStr, Field
 
 # Redefine AdminAction here to use datetime for proper validation from string
@@ -26,6 +31,12 @@ class AdminAction(BaseModel):
     timestamp: str # Match the string format from Firestore to prevent validation errors
     type: str
 
+# Fields each list endpoint reads; Firestore returns only these (see FirebaseDB.get_collection).
+# Incident documents carry evidence text, comments and the ML analysis, and user
+# documents the password hash, none of which these endpoints need.
+USER_LIST_FIELDS = list(User.model_fields) + ["department", "updated_at"]
+ID_ONLY = ["id"]  # when only the number of documents matters
+
 class AdminProfileUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -59,12 +70,14 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 async def get_admin_summary(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get admin dashboard summary"""
     try:
-        # Get user count
-        users = db.get_collection("users")
+        # Both reads at once
+        users, incidents = await asyncio.gather(
+            async_db.get_collection("users", select=ID_ONLY),
+            async_db.get_collection("incidents", select=["status"])
+        )
         user_count = len(users)
         
         # Get incident statistics
-        incidents = db.get_collection("incidents")
         total_incidents = len(incidents)
         pending_incidents = len([i for i in incidents if i.get("status") == "Pending"])
         resolved_incidents = len([i for i in incidents if i.get("status") == "Resolved"])
@@ -91,7 +104,7 @@ async def get_recent_admin_actions(current_user: Dict[str, Any] = Depends(requir
     """Get recent admin actions"""
     try:        
         # Fetch recent admin actions from Firestore, ordered by timestamp descending, limit to 10
-        actions = db.get_collection("admin_actions", order_by="timestamp", direction="DESCENDING", limit=10)
+        actions = await async_db.get_collection("admin_actions", order_by="timestamp", direction="DESCENDING", limit=10)
 
         # The data from Firestore is already in the correct format.
         # Pydantic will validate it.
@@ -113,11 +126,11 @@ async def send_bulk_notification(
     try:
         # Get target users based on notification target
         if notification.target == "all":
-            users = db.get_collection("users")
+            users = await async_db.get_collection("users", select=ID_ONLY)
         elif notification.target == "admins":
-            users = db.query_documents("users", "role", "==", "ADMIN")
+            users = await async_db.get_collection("users", [("role", "==", "ADMIN")], select=ID_ONLY)
         else:
-            users = db.query_documents("users", "role", "==", "USER")
+            users = await async_db.get_collection("users", [("role", "==", "USER")], select=ID_ONLY)
         
         # Create notification records
         notification_id = generate_random_string(12)
@@ -132,7 +145,7 @@ async def send_bulk_notification(
         }
         
         # Save notification record
-        db.create_document("notifications", notification_id, notification_doc)
+        await async_db.create_document("notifications", notification_id, notification_doc)
         
         # Log admin action
         action_doc = {
@@ -142,7 +155,7 @@ async def send_bulk_notification(
             "timestamp": get_timestamp(),
             "type": "system"
         }
-        db.create_document("admin_actions", action_doc["id"], action_doc)
+        await async_db.create_document("admin_actions", action_doc["id"], action_doc)
         
         return StandardResponse(
             success=True,
@@ -160,16 +173,8 @@ async def send_bulk_notification(
 async def get_all_users(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get all users (admin only)"""
     try:
-        users = db.get_collection("users")
-        
-        # Remove sensitive information
-        safe_users = []
-        for user in users:
-            safe_user = user.copy()
-            safe_user.pop("password_hash", None)
-            safe_users.append(safe_user)
-        
-        return safe_users
+        # The password hash is never read: it is not among the selected fields.
+        return await async_db.get_collection("users", select=USER_LIST_FIELDS)
         
     except Exception as e:
         raise HTTPException(
@@ -186,7 +191,7 @@ async def update_user_status(
     """Update user active status (admin only)"""
     try:
         # Check if user exists
-        user = db.get_document("users", user_id)
+        user = await async_db.get_document("users", user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -194,7 +199,7 @@ async def update_user_status(
             )
         
         # Update user status
-        success = db.update_document("users", user_id, {
+        success = await async_db.update_document("users", user_id, {
             "is_active": status_update.is_active,
             "updated_at": get_timestamp()
         })
@@ -208,7 +213,7 @@ async def update_user_status(
                 "timestamp": get_timestamp(),
                 "type": "user"
             }
-            db.create_document("admin_actions", action_doc["id"], action_doc)
+            await async_db.create_document("admin_actions", action_doc["id"], action_doc)
             
             return StandardResponse(
                 success=True,
@@ -235,7 +240,7 @@ async def export_incidents(
 ):
     """Export incidents data (admin only)"""
     try:
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents")
         
         if not incidents:
             return Response(content="No incidents to export.", media_type="text/plain", status_code=204)
@@ -248,7 +253,7 @@ async def export_incidents(
             "timestamp": get_timestamp(),
             "type": "export"
         }
-        db.create_document("admin_actions", action_doc["id"], action_doc)
+        await async_db.create_document("admin_actions", action_doc["id"], action_doc)
 
         # Create a CSV in-memory
         output = io.StringIO()
@@ -291,7 +296,7 @@ async def create_system_backup(current_user: Dict[str, Any] = Depends(require_ad
         }
         
         # Save backup record
-        db.create_document("backups", backup_id, backup_doc)
+        await async_db.create_document("backups", backup_id, backup_doc)
         
         # Log admin action
         action_doc = {
@@ -301,7 +306,7 @@ async def create_system_backup(current_user: Dict[str, Any] = Depends(require_ad
             "timestamp": get_timestamp(),
             "type": "system"
         }
-        db.create_document("admin_actions", action_doc["id"], action_doc)
+        await async_db.create_document("admin_actions", action_doc["id"], action_doc)
         
         return StandardResponse(
             success=True,
@@ -315,13 +320,35 @@ async def create_system_backup(current_user: Dict[str, Any] = Depends(require_ad
             detail=f"Failed to create backup: {str(e)}"
         )
 
+@router.get("/metrics/ml", response_model=Dict[str, Any])
+async def get_ml_metrics(current_user: Dict[str, Any] = Depends(require_admin)):
+    """ML runtime metrics for the configured ML backend (admin only)"""
+    return ml_backend.stats()
+
+@router.get("/metrics/enrichment", response_model=Dict[str, Any])
+async def get_enrichment_metrics(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Background enrichment queue depth and job counters (admin only)"""
+    return await enrichment_queue.stats()
+
+@router.post("/ml/reload", response_model=Dict[str, Any])
+async def reload_ml_models(model: Optional[str] = None, current_user: Dict[str, Any] = Depends(require_admin)):
+    """Reload one ML model (or all) from disk without dropping requests (admin only)"""
+    if model is not None and model not in MODEL_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model '{model}'"
+        )
+    return await ml_backend.reload(model)
+
 # Dashboard Statistics
 @router.get("/dashboard/stats", response_model=Dict[str, Any])
 async def get_dashboard_stats(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get admin dashboard statistics"""
     # Get incident statistics
-    incidents = db.get_collection("incidents")
-    users = db.get_collection("users")
+    incidents, users = await asyncio.gather(
+        async_db.get_collection("incidents", select=["status", "created_at"]),
+        async_db.get_collection("users", select=["is_active"])
+    )
     
     # Calculate stats
     total_incidents = len(incidents)
@@ -366,7 +393,7 @@ async def get_dashboard_alerts(current_user: Dict[str, Any] = Depends(require_ad
     """Get admin dashboard alerts"""
     try:
         # Get high priority incidents
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents", select=["id", "title", "priority", "status", "created_at"])
         high_priority = [
             {
                 "id": i.get("id"),
@@ -404,7 +431,7 @@ async def get_dashboard_alerts(current_user: Dict[str, Any] = Depends(require_ad
 async def get_incident_trends(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get incident trends over time"""
     try:
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents", select=["created_at"])
         
         # If no incidents, return mock data
         if len(incidents) == 0:
@@ -457,7 +484,7 @@ async def get_incident_trends(current_user: Dict[str, Any] = Depends(require_adm
 async def get_incident_risk_analysis(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get incident risk analysis"""
     try:
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents", select=["risk_level", "category"])
         
         # Risk level distribution
         risk_levels = {"low": 0, "medium": 0, "high": 0, "critical": 0}
@@ -508,7 +535,7 @@ async def get_incident_risk_analysis(current_user: Dict[str, Any] = Depends(requ
 async def get_incident_priority_distribution(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get incident priority distribution"""
     try:
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents", select=["id", "category", "priority", "unit", "created_at"])
         
         priorities = {"low": 0, "medium": 0, "high": 0, "critical": 0}
         for incident in incidents:
@@ -563,7 +590,7 @@ async def get_incident_priority_distribution(current_user: Dict[str, Any] = Depe
 async def get_incident_heatmap_data(current_user: Dict[str, Any] = Depends(require_admin)):
     """Get incident heatmap data for visualization"""
     try:
-        incidents = db.get_collection("incidents")
+        incidents = await async_db.get_collection("incidents", select=["department", "created_at"])
         
         # Group by department and time
         from collections import defaultdict
@@ -670,13 +697,13 @@ async def update_admin_profile(
         update_data["updated_at"] = get_timestamp()
         
         # Update user document
-        success = db.update_document("users", user_id, update_data)
+        success = await async_db.update_document("users", user_id, update_data)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update profile in database.")
 
         # Fetch the updated user to return
-        updated_user = db.get_document("users", user_id)
+        updated_user = await async_db.get_document("users", user_id)
         updated_user.pop("password_hash", None)
 
         return StandardResponse(success=True, message="Profile updated successfully", data=updated_user)
@@ -694,21 +721,21 @@ async def change_admin_password(
         user_id = current_user["id"]
         
         # Verify current password
-        if not verify_password(password_data.current_password, current_user["password_hash"]):
+        if not await run_in_threadpool(verify_password, password_data.current_password, current_user["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Incorrect current password"
             )
 
         # Hash the new password
-        new_password_hash = get_password_hash(password_data.new_password)
+        new_password_hash = await run_in_threadpool(get_password_hash, password_data.new_password)
 
         # Update user document with new password hash
         update_data = {
             "password_hash": new_password_hash,
             "updated_at": get_timestamp()
         }
-        success = db.update_document("users", user_id, update_data)
+        success = await async_db.update_document("users", user_id, update_data)
 
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update password in database.")
@@ -721,10 +748,10 @@ async def change_admin_password(
             "timestamp": get_timestamp(),
             "type": "security"
         }
-        db.create_document("admin_actions", action_doc["id"], action_doc)
+        await async_db.create_document("admin_actions", action_doc["id"], action_doc)
 
         # Create an in-app notification for the admin as an acknowledgement
-        db.create_document("notifications", None, {
+        await async_db.create_document("notifications", None, {
             "user_id": current_user["id"],
             "message": "Your account password was changed successfully.",
             "incident_id": None, # Not related to an incident
@@ -750,7 +777,7 @@ async def make_user_admin(email: str):
 
     try:
         # Find user by email
-        users = db.query_documents("users", "email", "==", email)
+        users = await async_db.query_documents("users", "email", "==", email)
         if not users:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -761,7 +788,7 @@ async def make_user_admin(email: str):
         user_id = user["id"]
         
         # Update user role to ADMIN
-        success = db.update_document("users", user_id, {
+        success = await async_db.update_document("users", user_id, {
             "role": "ADMIN",
             "updated_at": get_timestamp()
         })
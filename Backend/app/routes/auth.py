@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from datetime import timedelta
 from typing import Dict, Any, Optional
 from app.utils.auth import (
     authenticate_user, create_access_token, get_password_hash,
     get_current_user, generate_user_id, validate_email_domain,
 )
-from app.utils.firebase import db, get_timestamp
+from app.utils.firebase import async_db, get_timestamp
 from app.config import settings
 from app.models.user import UserCreate, UserLogin, Token, User, UserRole
 from app.models.response import StandardResponse
@@ -47,7 +48,7 @@ async def register(user_data: UserCreate):
             )
         
         # Check if user already exists
-        existing_users = db.query_documents("users", "email", "==", user_data.email)
+        existing_users = await async_db.query_documents("users", "email", "==", user_data.email)
         if existing_users:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,7 +56,7 @@ async def register(user_data: UserCreate):
             )
         
         # Check if service ID already exists
-        existing_service_ids = db.query_documents("users", "service_id", "==", user_data.service_id)
+        existing_service_ids = await async_db.query_documents("users", "service_id", "==", user_data.service_id)
         if existing_service_ids:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -75,7 +76,7 @@ async def register(user_data: UserCreate):
             "phone": user_data.phone,
             "unit": user_data.unit,
             "clearance_level": user_data.clearance_level,
-            "password_hash": get_password_hash(user_data.password),
+            "password_hash": await run_in_threadpool(get_password_hash, user_data.password),
             "role": UserRole.USER,
             "is_active": True,
             "created_at": get_timestamp(),
@@ -84,7 +85,7 @@ async def register(user_data: UserCreate):
         }
         
         # Save to database
-        success = db.create_document("users", user_id, user_doc)
+        success = await async_db.create_document("users", user_id, user_doc)
         
         if success:
             return StandardResponse(
@@ -111,7 +112,7 @@ async def login(login_data: UserLogin):
     """Authenticate user and return access token"""
     try:
         # Authenticate user
-        user = authenticate_user(login_data.email, login_data.password)
+        user = await authenticate_user(login_data.email, login_data.password)
         
         if not user:
             raise HTTPException(
@@ -133,7 +134,7 @@ async def login(login_data: UserLogin):
         )
         
         # Update last login
-        db.update_document("users", user["id"], {
+        await async_db.update_document("users", user["id"], {
             "last_login": get_timestamp()
         })
         
@@ -207,13 +208,13 @@ async def update_current_user_profile(
         update_data["updated_at"] = get_timestamp()
         
         # Update user document
-        success = db.update_document("users", user_id, update_data)
+        success = await async_db.update_document("users", user_id, update_data)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update profile in database.")
 
         # Fetch the updated user to return
-        updated_user = db.get_document("users", user_id)
+        updated_user = await async_db.get_document("users", user_id)
         updated_user.pop("password_hash", None)
 
         return StandardResponse(success=True, message="Profile updated successfully", data=updated_user)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
-from app.utils.firebase import db
+from app.utils.firebase import async_db
 from app.utils.auth import get_current_user
 from app.models.chat import ChatMessage
 
@@ -23,7 +23,7 @@ async def get_chat_history(
 
     try:
         # Fetch documents from Firestore, ordered by timestamp
-        chat_docs = db.get_collection("chats", filters=filters)
+        chat_docs = await async_db.get_collection("chats", filters=filters)
         
         # Sort by timestamp as Firestore query.stream() doesn't guarantee order with multiple filters
         chat_docs.sort(key=lambda x: x.get("timestamp", ""))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, status, Depends, Query, File, UploadFile, Form, Response
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import shutil
@@ -8,12 +8,17 @@ from app.models.incident import (
 )
 from app.models.response import StandardResponse, PaginatedResponse
 from app.utils.auth import get_current_active_user, require_admin
-from app.utils.firebase import db, get_timestamp
-from app.utils.helpers import generate_incident_id, get_risk_level
-from app.utils.ml_models import ml_manager
+from app.utils.firebase import async_db, get_timestamp
+from app.utils.helpers import generate_incident_id, get_risk_level, encode_cursor, decode_cursor
+from app.utils.enrichment_queue import enrichment_queue
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
+# Fields the list endpoints read; Firestore returns only these, not the evidence,
+# comments or ML analysis (see FirebaseDB.get_collection).
+INCIDENT_LIST_FIELDS = list(IncidentResponse.model_fields)
+INCIDENT_STATS_FIELDS = ["status", "category", "severity"]
+
 @router.post("/", response_model=StandardResponse, status_code=status.HTTP_201_CREATED)
 async def create_incident(
     title: str = Form(...),
@@ -74,29 +79,11 @@ async def create_incident(
         }
         
         # Save to database
-        success = db.create_document("incidents", incident_id, incident_doc)
+        success = await async_db.create_document("incidents", incident_id, incident_doc)
         
         if success:
-            ml_analysis = None
-            if evidence_text or evidence_url:
-                ml_analysis = ml_manager.analyze_incident(analysis_data)
-                
-                # Update incident with ML analysis
-                db.update_document("incidents", incident_id, {
-                    "ml_analysis": ml_analysis,
-                    "updated_at": get_timestamp()
-                })
-            
-            # Create notifications for all admins
-            admins = db.get_collection("users", [("role", "==", "ADMIN")])
-            for admin in admins:
-                db.create_document("notifications", None, {
-                    "user_id": admin["id"],
-                    "message": f"New incident '{incident_id}' reported by {current_user['name']}.",
-                    "incident_id": incident_id,
-                    "is_read": False,
-                    "created_at": get_timestamp()
-                })
+            # ML analysis and admin notifications run in the background (see utils/enrichment_queue.py).
+            await enrichment_queue.enqueue(incident_id, dict(analysis_data, reporter_name=current_user["name"]))
 
             return StandardResponse(
                 success=True,
@@ -105,7 +92,7 @@ async def create_incident(
                     "incident_id": incident_id,
                     "status": IncidentStatus.PENDING,
                     "severity": risk_level,
-                    "ml_analysis": ml_analysis
+                    "enrichment": "queued"
                 }
             )
         else:
@@ -124,14 +111,27 @@ async def create_incident(
 
 @router.get("/", response_model=List[IncidentResponse])
 async def get_incidents(
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_active_user),
     status_filter: Optional[IncidentStatus] = Query(None, description="Filter by status"),
     category_filter: Optional[IncidentCategory] = Query(None, description="Filter by category"),
     severity_filter: Optional[IncidentSeverity] = Query(None, description="Filter by severity"),
     limit: int = Query(50, ge=1, le=100, description="Number of incidents to return"),
-    offset: int = Query(0, ge=0, description="Number of incidents to skip")
+    offset: int = Query(0, ge=0, description="Number of incidents to skip"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
 ):
-    """Get incidents (user sees their own, admin sees all)"""
+    """
+    Get incidents (user sees their own, admin sees all), newest first.
+    When there are more, the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    try:
+        start_after = decode_cursor(cursor) if cursor else None
+        # A page cursor is [created_at, id], as set in X-Next-Cursor below.
+        if start_after is not None and (len(start_after) != 2 or not all(isinstance(value, str) for value in start_after)):
+            raise ValueError("Invalid cursor")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     try:
         # Build filters
         filters = []
@@ -148,14 +148,19 @@ async def get_incidents(
         if severity_filter:
             filters.append(("severity", "==", severity_filter))
         
-        # Get incidents from database
-        incidents = db.get_collection("incidents", filters)
-        
-        # Sort by created_at descending (newest first)
-        incidents.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        
-        # Apply pagination
-        paginated_incidents = incidents[offset:offset + limit]
+        # Newest first, sorted, skipped and limited by Firestore (the document ID breaks
+        # created_at ties, so a cursor is exact). One extra row tells whether there is a next page.
+        # A failed query (e.g. a missing index, see firestore.indexes.json) is a 500, not an empty list.
+        incidents = await async_db.get_collection(
+            "incidents", filters,
+            order_by=["created_at", "__name__"], direction="DESCENDING",
+            start_after=start_after, offset=offset, limit=limit + 1,
+            select=INCIDENT_LIST_FIELDS, raise_errors=True
+        )
+        paginated_incidents = incidents[:limit]
+        if len(incidents) > limit:
+            last = paginated_incidents[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor([last["created_at"], last["id"]])
         
         # Convert to response format
         incident_responses = []
@@ -190,7 +195,7 @@ async def get_incident(
     """Get a specific incident by ID"""
     try:
         # Get incident from database
-        incident = db.get_document("incidents", incident_id)
+        incident = await async_db.get_document("incidents", incident_id)
         
         if not incident:
             raise HTTPException(
@@ -229,7 +234,7 @@ async def update_incident(
     """Update an incident (admin only)"""
     try:
         # Check if incident exists
-        incident = db.get_document("incidents", incident_id)
+        incident = await async_db.get_document("incidents", incident_id)
         if not incident:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -250,7 +255,7 @@ async def update_incident(
             update_data["resolved_at"] = get_timestamp()
         
         # Update incident
-        success = db.update_document("incidents", incident_id, update_data)
+        success = await async_db.update_document("incidents", incident_id, update_data)
         
         if success:
             return StandardResponse(
@@ -280,7 +285,7 @@ async def delete_incident(
     """Delete an incident (admin only)"""
     try:
         # Check if incident exists
-        incident = db.get_document("incidents", incident_id)
+        incident = await async_db.get_document("incidents", incident_id)
         if not incident:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -288,7 +293,7 @@ async def delete_incident(
             )
         
         # Delete incident
-        success = db.delete_document("incidents", incident_id)
+        success = await async_db.delete_document("incidents", incident_id)
         
         if success:
             return StandardResponse(
@@ -318,7 +323,7 @@ async def add_comment_to_incident(
     """Add a comment to an incident (admin only)"""
     try:
         # Check if incident exists
-        incident = db.get_document("incidents", incident_id)
+        incident = await async_db.get_document("incidents", incident_id)
         if not incident:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -338,11 +343,11 @@ async def add_comment_to_incident(
         existing_comments.append(new_comment)
 
         # Update the incident with the new comments list and an updated timestamp
-        success = db.update_document("incidents", incident_id, {"comments": existing_comments, "updated_at": get_timestamp()})
+        success = await async_db.update_document("incidents", incident_id, {"comments": existing_comments, "updated_at": get_timestamp()})
 
         if success:
             # Create a notification for the user who reported the incident
-            db.create_document("notifications", None, {
+            await async_db.create_document("notifications", None, {
                 "user_id": incident["reporter_id"],
                 "message": f"A new comment has been added to your incident report {incident_id}.",
                 "incident_id": incident_id,
@@ -372,7 +377,7 @@ async def get_incident_stats(
         if current_user.get("role") != "ADMIN":
             filters.append(("reporter_id", "==", current_user["id"]))
         
-        incidents = db.get_collection("incidents", filters)
+        incidents = await async_db.get_collection("incidents", filters, select=INCIDENT_STATS_FIELDS)
         
         # Calculate statistics
         total_incidents = len(incidents)
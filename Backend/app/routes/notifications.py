@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Dict, Any
 from app.utils.auth import get_current_active_user, require_admin
-from app.utils.firebase import db, get_timestamp
+from app.utils.firebase import async_db, get_timestamp
 from app.models.response import StandardResponse
 
 router = APIRouter()
@@ -12,7 +12,7 @@ async def get_notifications(current_user: Dict[str, Any] = Depends(get_current_a
     """Get all notifications for the current user"""
     try:
         # Get notifications for the current user
-        notifications = db.query_documents("notifications", "user_id", "==", current_user["id"])
+        notifications = await async_db.query_documents("notifications", "user_id", "==", current_user["id"])
         
         # Sort by timestamp (newest first)
         notifications.sort(key=lambda x: x.get("created_at", ""), reverse=True)
@@ -33,7 +33,7 @@ async def mark_notification_read(
     """Mark a notification as read"""
     try:
         # Get the notification
-        notification = db.get_document("notifications", notification_id)
+        notification = await async_db.get_document("notifications", notification_id)
         if not notification:
             raise HTTPException(
                 status_code=404,
@@ -53,7 +53,7 @@ async def mark_notification_read(
             "read_at": get_timestamp()
         }
         
-        success = db.update_document("notifications", notification_id, update_data)
+        success = await async_db.update_document("notifications", notification_id, update_data)
         if not success:
             raise HTTPException(
                 status_code=500,
@@ -81,7 +81,7 @@ async def delete_notification(
     """Delete a notification"""
     try:
         # Get the notification
-        notification = db.get_document("notifications", notification_id)
+        notification = await async_db.get_document("notifications", notification_id)
         if not notification:
             raise HTTPException(
                 status_code=404,
@@ -96,7 +96,7 @@ async def delete_notification(
             )
         
         # Delete notification
-        success = db.delete_document("notifications", notification_id)
+        success = await async_db.delete_document("notifications", notification_id)
         if not success:
             raise HTTPException(
                 status_code=500,
@@ -123,22 +123,27 @@ async def mark_all_notifications_read(
     """Mark all notifications as read for the current user"""
     try:
         # Get all unread notifications for the user
-        notifications = db.query_documents("notifications", "user_id", "==", current_user["id"])
+        notifications = await async_db.get_collection(
+            "notifications", [("user_id", "==", current_user["id"])], select=["is_read"]
+        )
         unread_notifications = [n for n in notifications if not n.get("is_read", False)]
         
-        # Update each notification
-        updated_count = 0
-        for notification in unread_notifications:
-            update_data = {
-                "is_read": True,
-                "read_at": get_timestamp()
-            }
-            if db.update_document("notifications", notification["id"], update_data):
-                updated_count += 1
+        # Update them all in batched writes instead of one round trip each
+        update_data = {
+            "is_read": True,
+            "read_at": get_timestamp()
+        }
+        async with async_db.batch() as batch:
+            for notification in unread_notifications:
+                batch.update_document("notifications", notification["id"], update_data)
+        updated_count = batch.result["written"]
+        failed_count = len(batch.result["failed"])
         
         return StandardResponse(
-            success=True,
+            success=failed_count == 0,
             message=f"Marked {updated_count} notifications as read"
+                    + (f"; {failed_count} could not be updated" if failed_count else ""),
+            data={"updated": updated_count, "failed": failed_count}
         )
     except Exception as e:
         raise HTTPException(
@@ -154,7 +159,7 @@ async def get_notification_count(
     """Get notification count for the current user"""
     try:
         # Get all notifications for the user
-        notifications = db.query_documents("notifications", "user_id", "==", current_user["id"])
+        notifications = await async_db.query_documents("notifications", "user_id", "==", current_user["id"])
         
         total_count = len(notifications)
         unread_count = len([n for n in notifications if not n.get("is_read", False)])
@@ -4,9 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 from app.models.user import TokenData, UserRole
-from app.utils.firebase import db
+from app.utils.firebase import async_db
 import hashlib
 
 # Password hashing
@@ -47,7 +48,7 @@ def verify_token(token: str) -> Optional[TokenData]:
     except JWTError:
         return None
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,7 +62,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise credentials_exception
     
     # Get user from database
-    user_data = db.get_document("users", token_data.user_id)
+    user_data = await async_db.get_document("users", token_data.user_id)
     if user_data is None:
         raise credentials_exception
     
@@ -82,15 +83,16 @@ def require_admin(current_user: dict = Depends(get_current_active_user)):
         )
     return current_user
 
-def authenticate_user(email: str, password: str) -> Optional[dict]:
+async def authenticate_user(email: str, password: str) -> Optional[dict]:
     """Authenticate a user with email and password"""
     # Query user by email
-    users = db.query_documents("users", "email", "==", email)
+    users = await async_db.query_documents("users", "email", "==", email)
     if not users:
         return None
     
     user = users[0]
-    if not verify_password(password, user.get("password_hash", "")):
+    # bcrypt is slow on purpose; keep it off the event loop
+    if not await run_in_threadpool(verify_password, password, user.get("password_hash", "")):
         return None
     
     return user
@@ -0,0 +1,91 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls are rejected at once until `reset_seconds` have passed.
+    half-open: a single trial call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half-open"
+        if self.state == "closed":
+            return True
+        if self.state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half-open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed (e.g. a cancelled hedge)."""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyWindow:
+    """
+    Latencies of the most recent calls, for percentile-based timeouts.
+
+    A call that timed out counts with the time it was given: it took at least
+    that long. Otherwise a slowdown past the timeout would never show up in the
+    percentiles, and the timeout would never widen to fit it.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.consecutive_timeouts = 0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.consecutive_timeouts = 0
+
+    def add_timeout(self, seconds: float):
+        self.samples.append(seconds)
+        self.consecutive_timeouts += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile (0-100), or None until enough calls have been seen."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
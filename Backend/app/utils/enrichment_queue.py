@@ -0,0 +1,283 @@
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.firebase import async_db, get_timestamp
+from app.utils.ml_backend import ml_backend
+
+logger = logging.getLogger(__name__)
+
+# --- Background enrichment queue ---
+# Work that follows an incident report (ML analysis, saving it on the incident,
+# notifying the admins) runs here instead of inside the POST, so the reporter
+# only waits for the incident document to be written.
+#
+# Jobs live in a local SQLite table, so they survive a restart, and there is at
+# most one per incident_id (enqueueing the same incident again is a no-op). A
+# worker claims a job with a lease; a job whose worker died is picked up again
+# once its lease expires. A failed job is retried with exponential backoff up to
+# `max_attempts` times, then kept as "failed" for inspection. Job handlers must
+# be idempotent, since a job can run more than once. A handler that runs longer
+# than `job_timeout_seconds` (less than the lease, so no other worker claims the
+# job meanwhile) is cancelled and counts as failed.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichment_jobs (
+    incident_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    leased_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS enrichment_jobs_due ON enrichment_jobs (status, run_after);
+"""
+
+
+class EnrichmentQueue:
+    def __init__(
+        self,
+        path: str,
+        handler: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        workers: int = 2,
+        max_attempts: int = 5,
+        retry_seconds: float = 5.0,
+        lease_seconds: float = 300.0,
+        poll_seconds: float = 2.0,
+        retention_seconds: float = 86400.0,
+        job_timeout_seconds: Optional[float] = None
+    ):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.job_timeout_seconds = job_timeout_seconds or lease_seconds / 2
+        if self.job_timeout_seconds >= lease_seconds:
+            raise ValueError("job_timeout_seconds must be shorter than lease_seconds")
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats = {"enqueued": 0, "duplicates": 0, "completed": 0, "retried": 0, "failed": 0, "total_seconds": 0.0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation; they run in the threadpool.
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def _execute(self, sql: str, params=()) -> int:
+        connection = self._connect()
+        try:
+            return connection.execute(sql, params).rowcount
+        finally:
+            connection.close()
+
+    def _query(self, sql: str, params=()) -> list:
+        connection = self._connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def _init_db(self):
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    async def start(self):
+        """Creates the table and starts the workers (called on app startup)."""
+        await run_in_threadpool(self._init_db)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stops the workers; jobs they were running are picked up again after a restart."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _insert(self, incident_id: str, payload: Dict[str, Any]) -> bool:
+        now = time.time()
+        return self._execute(
+            "INSERT OR IGNORE INTO enrichment_jobs (incident_id, payload, run_after, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (incident_id, json.dumps(payload, default=str), now, now, now)
+        ) == 1
+
+    async def enqueue(self, incident_id: str, payload: Dict[str, Any]) -> bool:
+        """Queues enrichment for an incident; returns False if it was already queued."""
+        added = await run_in_threadpool(self._insert, incident_id, payload)
+        self._stats["enqueued" if added else "duplicates"] += 1
+        if added and self._wakeup is not None:
+            self._wakeup.set()
+        return added
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Leases the next due job (pending, or running with an expired lease) to this worker."""
+        now = time.time()
+        connection = self._connect()
+        connection.row_factory = sqlite3.Row
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so no other worker or process claims the same job.
+            connection.execute("BEGIN IMMEDIATE")
+            job = connection.execute(
+                "SELECT * FROM enrichment_jobs WHERE (status = 'pending' AND run_after <= ?) "
+                "OR (status = 'running' AND leased_until <= ?) ORDER BY run_after LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if job is not None:
+                connection.execute(
+                    "UPDATE enrichment_jobs SET status = 'running', attempts = attempts + 1, "
+                    "leased_until = ?, updated_at = ? WHERE incident_id = ?",
+                    (now + self.lease_seconds, now, job["incident_id"])
+                )
+            connection.execute("COMMIT")
+            return job
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def _complete(self, incident_id: str):
+        self._execute(
+            "UPDATE enrichment_jobs SET status = 'done', leased_until = NULL, last_error = NULL, updated_at = ? "
+            "WHERE incident_id = ?",
+            (time.time(), incident_id)
+        )
+
+    def _fail(self, incident_id: str, attempts: int, error: str) -> bool:
+        """Schedules a retry, or marks the job failed; returns True if it will be retried."""
+        now = time.time()
+        retry = attempts < self.max_attempts
+        self._execute(
+            "UPDATE enrichment_jobs SET status = ?, run_after = ?, leased_until = NULL, last_error = ?, updated_at = ? "
+            "WHERE incident_id = ?",
+            ("pending" if retry else "failed", now + self.retry_seconds * 2 ** (attempts - 1), error, now, incident_id)
+        )
+        return retry
+
+    def _prune(self):
+        self._execute(
+            "DELETE FROM enrichment_jobs WHERE status = 'done' AND updated_at < ?",
+            (time.time() - self.retention_seconds,)
+        )
+
+    async def _work(self):
+        while True:
+            # Cleared before looking, so a job enqueued meanwhile still wakes this worker.
+            self._wakeup.clear()
+            try:
+                job = await run_in_threadpool(self._claim)
+            except Exception as e:
+                logger.error(f"Enrichment queue unavailable: {e}")
+                job = None
+            if job is None:
+                # Idle: wait for a new job, or poll for retries and other processes' jobs.
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    try:
+                        await run_in_threadpool(self._prune)
+                    except Exception as e:
+                        logger.error(f"Could not prune finished enrichment jobs: {e}")
+                continue
+            await self._run(job)
+
+    async def _run(self, job: sqlite3.Row):
+        incident_id, attempts = job["incident_id"], job["attempts"] + 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.handler(incident_id, json.loads(job["payload"])), self.job_timeout_seconds)
+        except Exception as e:
+            error = f"timed out after {self.job_timeout_seconds:g}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            retry = await run_in_threadpool(self._fail, incident_id, attempts, error)
+            self._stats["retried" if retry else "failed"] += 1
+            logger.error(
+                f"Enrichment of incident {incident_id} failed (attempt {attempts}/{self.max_attempts}"
+                f"{', will retry' if retry else ''}): {error}"
+            )
+        else:
+            await run_in_threadpool(self._complete, incident_id)
+            self._stats["completed"] += 1
+        finally:
+            self._stats["total_seconds"] += time.perf_counter() - start
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth by job state, and this process's counters."""
+        counts = dict(await run_in_threadpool(
+            self._query, "SELECT status, COUNT(*) FROM enrichment_jobs GROUP BY status"
+        ))
+        oldest = (await run_in_threadpool(
+            self._query, "SELECT MIN(created_at) FROM enrichment_jobs WHERE status = 'pending'"
+        ))[0][0]
+        runs = self._stats["completed"] + self._stats["retried"] + self._stats["failed"]
+        return {
+            "queue_depth": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed_jobs": counts.get("failed", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 3) if oldest else None,
+            "workers": len(self._tasks),
+            **{key: value for key, value in self._stats.items() if key != "total_seconds"},
+            "avg_job_ms": round(self._stats["total_seconds"] / runs * 1000, 3) if runs else None,
+        }
+
+
+async def enrich_incident(incident_id: str, incident: Dict[str, Any]):
+    """Notifies the admins of a new incident and stores its ML analysis."""
+    admins = await async_db.get_collection("users", [("role", "==", "ADMIN")], select=["id"])
+    # One document per admin and incident, written only if it does not exist yet, so
+    # a retried job neither notifies anyone twice nor marks a read notification
+    # unread again; all of them in batched writes rather than one round trip per admin.
+    existing = await async_db.get_collection("notifications", [("incident_id", "==", incident_id)], select=["user_id"])
+    notified = {notification["id"] for notification in existing}
+    written = await async_db.bulk_write([
+        ("create_if_absent", "notifications", f"{incident_id}-{admin['id']}", {
+            "user_id": admin["id"],
+            "message": f"New incident '{incident_id}' reported by {incident['reporter_name']}.",
+            "incident_id": incident_id,
+            "is_read": False,
+            "created_at": get_timestamp()
+        })
+        for admin in admins if f"{incident_id}-{admin['id']}" not in notified
+    ])
+    if written["failed"]:
+        raise RuntimeError(f"could not notify {len(written['failed'])} admin(s): {'; '.join(written['errors'])}")
+
+    if incident.get("evidence_text") or incident.get("evidence_url"):
+        ml_analysis = await ml_backend.analyze_incident(incident)
+        if ml_analysis["models"] and len(ml_analysis["errors"]) == len(ml_analysis["models"]):
+            # Nothing could be scored (e.g. the ML API is down); try again later.
+            raise RuntimeError(f"ML analysis failed for {', '.join(ml_analysis['errors'])}")
+        updated = await async_db.update_document("incidents", incident_id, {
+            "ml_analysis": ml_analysis,
+            "updated_at": get_timestamp()
+        })
+        if not updated:
+            raise RuntimeError("could not save the ML analysis")
+
+
+# Global enrichment queue, started and stopped with the app
+enrichment_queue = EnrichmentQueue(
+    settings.ENRICHMENT_QUEUE_PATH,
+    enrich_incident,
+    workers=settings.ENRICHMENT_WORKERS,
+    max_attempts=settings.ENRICHMENT_MAX_ATTEMPTS,
+    retry_seconds=settings.ENRICHMENT_RETRY_SECONDS
+)
@@ -1,8 +1,8 @@
 import os
-from typing import Optional, List
+from typing import Optional, List, Union, Dict, Any, Tuple
 from datetime import datetime, timezone
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 from app.config import settings
 from dotenv import load_dotenv
 
@@ -68,6 +68,111 @@ def get_firestore_client() -> firestore.client:
         return initialize_firebase()
 
 
+# -----------------------------
+# Batched Writes
+# -----------------------------
+# Firestore commits at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+
+def _fill_batch(client, batch, operations: List[Tuple]):
+    """Adds bulk_write operations to a (sync or async) Firestore write batch"""
+    for operation in operations:
+        kind, collection, document_id = operation[:3]
+        ref = client.collection(collection).document(document_id)
+        if kind == "create":
+            batch.set(ref, operation[3])
+        elif kind == "create_if_absent":
+            batch.create(ref, operation[3])
+        elif kind == "update":
+            batch.update(ref, operation[3])
+        elif kind == "delete":
+            batch.delete(ref)
+        else:
+            raise ValueError(f"Unknown write operation '{kind}'")
+
+
+class BatchWriter:
+    """
+    Collects writes and commits them with FirebaseDB.bulk_write when the block ends:
+
+        with db.batch() as batch:
+            batch.update_document("notifications", notification_id, {"is_read": True})
+        batch.result  # {"written": ..., "failed": [...], "errors": [...]}
+    """
+
+    def __init__(self, db: "FirebaseDB"):
+        self._db = db
+        self.operations: List[Tuple] = []
+        self.result: Optional[Dict[str, Any]] = None
+
+    def create_document(self, collection: str, document_id: str, data: dict):
+        self.operations.append(("create", collection, document_id, data))
+
+    def update_document(self, collection: str, document_id: str, data: dict):
+        self.operations.append(("update", collection, document_id, data))
+
+    def delete_document(self, collection: str, document_id: str):
+        self.operations.append(("delete", collection, document_id))
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Nothing is written if the block raised
+        if exc_type is None:
+            self.result = self._db.bulk_write(self.operations)
+        return False
+
+
+class AsyncBatchWriter(BatchWriter):
+    """BatchWriter for AsyncFirebaseDB: `async with async_db.batch() as batch: ...`"""
+
+    async def __aenter__(self) -> "AsyncBatchWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.result = await self._db.bulk_write(self.operations)
+        return False
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def _with_id(doc) -> dict:
+    """A listed document's data, with its document ID as "id" (not every collection stores one)"""
+    return {**doc.to_dict(), "id": doc.id}
+
+
+def _build_query(
+    collection_ref,
+    filters: Optional[List[tuple]] = None,
+    order_by: Optional[Union[str, List[str]]] = None,
+    direction: str = "ASCENDING",
+    limit: Optional[int] = None,
+    start_after: Optional[Union[Dict[str, Any], list]] = None,
+    select: Optional[List[str]] = None,
+    offset: Optional[int] = None
+):
+    """Applies get_collection's arguments to a (sync or async) Firestore collection reference"""
+    query = collection_ref
+    if filters:
+        for field, operator, value in filters:
+            query = query.where(field, operator, value)
+    for field in [order_by] if isinstance(order_by, str) else order_by or []:
+        query = query.order_by(field, direction=direction)
+    if start_after is not None:
+        query = query.start_after(start_after)
+    if select is not None:
+        query = query.select(select)
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
 # -----------------------------
 # Firebase Database Wrapper
 # -----------------------------
@@ -109,31 +214,187 @@ class FirebaseDB:
             print(f"[Delete Document Error] {e}")
             return False
 
-    def get_collection(self, collection: str, filters: Optional[List[tuple]] = None) -> list:
+    def batch(self) -> BatchWriter:
+        """Context manager that groups create/update/delete_document calls into batched writes"""
+        return BatchWriter(self)
+
+    def bulk_write(self, operations: List[Tuple]) -> Dict[str, Any]:
+        """
+        Apply many writes in Firestore batched writes of up to MAX_BATCH_WRITES each.
+        operations: ("create", collection, document_id, data), ("update", collection, document_id, data)
+            or ("delete", collection, document_id); "create" overwrites like create_document.
+            ("create_if_absent", collection, document_id, data) fails (and with it its batch)
+            if the document exists.
+        Each batch is atomic: if one write in it fails (e.g. an update of a missing
+        document) none of that batch is applied, but the other batches still are.
+        Returns {"written": count, "failed": [(collection, document_id), ...], "errors": [messages]}
         """
-        Get all documents from a collection.
+        result = {"written": 0, "failed": [], "errors": []}
+        for start in range(0, len(operations), MAX_BATCH_WRITES):
+            chunk = operations[start:start + MAX_BATCH_WRITES]
+            try:
+                batch = self.db.batch()
+                _fill_batch(self.db, batch, chunk)
+                batch.commit()
+                result["written"] += len(chunk)
+            except Exception as e:
+                print(f"[Bulk Write Error] {e}")
+                result["failed"].extend((operation[1], operation[2]) for operation in chunk)
+                result["errors"].append(str(e))
+        return result
+
+    def get_collection(
+        self,
+        collection: str,
+        filters: Optional[List[tuple]] = None,
+        order_by: Optional[Union[str, List[str]]] = None,
+        direction: str = "ASCENDING",
+        limit: Optional[int] = None,
+        start_after: Optional[Union[Dict[str, Any], list]] = None,
+        select: Optional[List[str]] = None,
+        offset: Optional[int] = None,
+        raise_errors: bool = False
+    ) -> list:
+        """
+        Get documents from a collection; everything but `collection` runs in Firestore.
         Optional filters: List of tuples [(field, operator, value), ...]
+        order_by: field (or fields) to sort by, in `direction` ("ASCENDING" or "DESCENDING").
+            "__name__" sorts by document ID, e.g. as a tie-breaker for cursors.
+        limit: maximum number of documents returned.
+        start_after: cursor; the order_by values of the last document already seen,
+            as {field: value} or a list in order_by order. Needs order_by.
+        select: only return these fields of each document.
+        offset: skip this many documents first (Firestore still reads them; prefer start_after).
+        Every returned document has its document ID under "id", also when select leaves it out.
+        raise_errors: re-raise a failed query (e.g. a missing index) instead of returning [].
+        Filtering on one field and ordering by another needs a composite index in Firestore.
         """
         try:
-            query = self.db.collection(collection)
-            if filters:
-                for field, operator, value in filters:
-                    query = query.where(field, operator, value)
+            query = _build_query(
+                self.db.collection(collection), filters, order_by, direction, limit, start_after, select, offset
+            )
             docs = query.stream()
-            return [doc.to_dict() for doc in docs]
+            return [_with_id(doc) for doc in docs]
         except Exception as e:
             print(f"[Get Collection Error] {e}")
+            if raise_errors:
+                raise
             return []
 
     def query_documents(self, collection: str, field: str, operator: str, value) -> list:
         try:
             docs = self.db.collection(collection).where(field, operator, value).stream()
-            return [doc.to_dict() for doc in docs]
+            return [_with_id(doc) for doc in docs]
         except Exception as e:
             print(f"[Query Documents Error] {e}")
             return []
 
 
+
+class AsyncFirebaseDB:
+    """
+    FirebaseDB on Firestore's async client, for the routes: awaiting it leaves
+    the event loop free while Firestore answers. Same methods and return values.
+    The client is created on first use, inside the worker's event loop (serve.py
+    forks the workers after importing the app).
+    """
+
+    def __init__(self):
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            get_firestore_client()  # initializes the Firebase app
+            self._db = firestore_async.client()
+        return self._db
+
+    async def create_document(self, collection: str, document_id: str, data: dict) -> bool:
+        try:
+            await self.db.collection(collection).document(document_id).set(data)
+            return True
+        except Exception as e:
+            print(f"[Create Document Error] {e}")
+            return False
+
+    async def get_document(self, collection: str, document_id: str) -> Optional[dict]:
+        try:
+            doc = await self.db.collection(collection).document(document_id).get()
+            if doc.exists:
+                return doc.to_dict()
+            return None
+        except Exception as e:
+            print(f"[Get Document Error] {e}")
+            return None
+
+    async def update_document(self, collection: str, document_id: str, data: dict) -> bool:
+        try:
+            await self.db.collection(collection).document(document_id).update(data)
+            return True
+        except Exception as e:
+            print(f"[Update Document Error] {e}")
+            return False
+
+    async def delete_document(self, collection: str, document_id: str) -> bool:
+        try:
+            await self.db.collection(collection).document(document_id).delete()
+            return True
+        except Exception as e:
+            print(f"[Delete Document Error] {e}")
+            return False
+
+    def batch(self) -> AsyncBatchWriter:
+        """Async context manager that groups create/update/delete_document calls into batched writes"""
+        return AsyncBatchWriter(self)
+
+    async def bulk_write(self, operations: List[Tuple]) -> Dict[str, Any]:
+        """See FirebaseDB.bulk_write"""
+        result = {"written": 0, "failed": [], "errors": []}
+        for start in range(0, len(operations), MAX_BATCH_WRITES):
+            chunk = operations[start:start + MAX_BATCH_WRITES]
+            try:
+                batch = self.db.batch()
+                _fill_batch(self.db, batch, chunk)
+                await batch.commit()
+                result["written"] += len(chunk)
+            except Exception as e:
+                print(f"[Bulk Write Error] {e}")
+                result["failed"].extend((operation[1], operation[2]) for operation in chunk)
+                result["errors"].append(str(e))
+        return result
+
+    async def get_collection(
+        self,
+        collection: str,
+        filters: Optional[List[tuple]] = None,
+        order_by: Optional[Union[str, List[str]]] = None,
+        direction: str = "ASCENDING",
+        limit: Optional[int] = None,
+        start_after: Optional[Union[Dict[str, Any], list]] = None,
+        select: Optional[List[str]] = None,
+        offset: Optional[int] = None,
+        raise_errors: bool = False
+    ) -> list:
+        """See FirebaseDB.get_collection"""
+        try:
+            query = _build_query(
+                self.db.collection(collection), filters, order_by, direction, limit, start_after, select, offset
+            )
+            return [_with_id(doc) async for doc in query.stream()]
+        except Exception as e:
+            print(f"[Get Collection Error] {e}")
+            if raise_errors:
+                raise
+            return []
+
+    async def query_documents(self, collection: str, field: str, operator: str, value) -> list:
+        try:
+            docs = self.db.collection(collection).where(field, operator, value).stream()
+            return [_with_id(doc) async for doc in docs]
+        except Exception as e:
+            print(f"[Query Documents Error] {e}")
+            return []
+
 # -----------------------------
 # Timestamp Helper
 # -----------------------------
@@ -143,6 +404,8 @@ def get_timestamp() -> str:
 
 
 # -----------------------------
-# Global Database Instance
+# Global Database Instances
 # -----------------------------
+# `db` blocks; it is for scripts. Request handlers await `async_db`.
 db = FirebaseDB()
+async_db = AsyncFirebaseDB()
@@ -1,7 +1,11 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+import base64
+import json
+import os
 import random
 import string
+import sys
 
 def generate_random_string(length: int = 8) -> str:
     """Generate a random string of specified length"""
@@ -33,6 +37,51 @@ def calculate_response_time(created_at: datetime, resolved_at: Optional[datetime
         delta = datetime.utcnow() - created_at
         return int(delta.total_seconds() / 3600)
 
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque page cursor from the sort values of the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Sort values from a cursor made by encode_cursor; ValueError if it is not one"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Memory of a process (default: this one) in MB. On Linux `rss` counts pages
+    shared with other processes in full; `pss` divides them among the sharers,
+    and `private` is what the process alone holds.
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.rstrip().endswith("kB")}
+    except OSError:
+        pass
+    else:
+        mb = lambda *keys: round(sum(fields.get(key, 0) for key in keys) / 1024, 1)
+        return {
+            "pid": pid,
+            "rss_mb": mb("Rss"),
+            "pss_mb": mb("Pss"),
+            "shared_mb": mb("Shared_Clean", "Shared_Dirty"),
+            "private_mb": mb("Private_Clean", "Private_Dirty"),
+        }
+    try:
+        import resource  # not on Windows
+    except ImportError:
+        return {"pid": pid}
+    if pid != os.getpid():
+        return {"pid": pid}
+    # Elsewhere only the peak RSS of this process is known (macOS reports bytes, others KB).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"pid": pid, "max_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+
 def get_risk_level(incident_data: Dict[str, Any]) -> str:
     """Calculate risk level based on incident data"""
     category = incident_data.get("category", "").lower()
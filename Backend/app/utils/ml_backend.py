@@ -0,0 +1,197 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils import ml_service
+from app.utils.helpers import process_memory
+from app.utils.ml_models import (
+    MODEL_NAMES, ml_manager, analyze_incident_with, incident_model_inputs,
+    PhishingInput, MalwareInput, RansomwareInput, NetworkingInput, ZeroDayInput
+)
+
+logger = logging.getLogger(__name__)
+
+# --- ML backends ---
+# Routes score incidents through `ml_backend` and do not care where the models run:
+#   ML_BACKEND=in-process   the models are loaded into this process (MLModelManager)
+#   ML_BACKEND=remote       requests go to the models API at ML_API_BASE_URL (ml_service)
+# Both take an incident category and the model's input fields (the models API's
+# JSON field names), and return the prediction dict, or None if there is none.
+
+# Model name -> incident category, as used by predict().
+MODEL_CATEGORIES = {
+    "phishing": "phishing",
+    "malware": "malware",
+    "ransomware": "ransomware",
+    "networking": "network-intrusion",
+    "zero_day": "zero-day",
+}
+
+# Model name -> section of the models API's /scan event that carries its input.
+SCAN_SECTIONS = {
+    "phishing": "email",
+    "malware": "process",
+    "ransomware": "file",
+    "networking": "connection",
+    "zero_day": "connection",
+}
+
+class MLBackend(ABC):
+    name: str
+
+    async def start(self):
+        """Called on app startup."""
+
+    async def close(self):
+        """Called on app shutdown."""
+
+    @abstractmethod
+    async def predict(self, incident_category: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Prediction for one incident, or None if the category has no model or scoring failed."""
+
+    async def analyze_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+        """Scores the incident's evidence with every applicable model concurrently (see ml_models)."""
+        return await analyze_incident_with(incident, lambda name, data: self.predict(MODEL_CATEGORIES[name], data))
+
+    @abstractmethod
+    async def readiness(self) -> Dict[str, Any]:
+        """{"ready": bool, "models": per-model load state}"""
+
+    @abstractmethod
+    async def reload(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Reloads one model (or all) from disk and returns the load state per model."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Runtime metrics for the admin metrics endpoint."""
+
+
+class InProcessMLBackend(MLBackend):
+    """Scores with the models loaded into this process, in the threadpool so the event loop stays free."""
+
+    name = "in-process"
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.predictors = {
+            "phishing": (PhishingInput, manager.predict_phishing),
+            "malware": (MalwareInput, manager.predict_malware),
+            "ransomware": (RansomwareInput, manager.predict_ransomware),
+            "network-intrusion": (NetworkingInput, manager.predict_networking),
+            "zero-day": (ZeroDayInput, manager.predict_zero_day),
+        }
+
+    async def predict(self, incident_category: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        predictor = self.predictors.get(incident_category.lower())
+        if predictor is None:
+            logger.info(f"No ML model available for category: {incident_category}. Skipping prediction.")
+            return None
+        input_model, predict = predictor
+        try:
+            result = await run_in_threadpool(predict, input_model(**data))
+        except ValidationError as e:
+            logger.error(f"Invalid ML input for {incident_category}: {e}")
+            return None
+        if "error" in result:
+            logger.error(f"ML prediction failed for {incident_category}: {result['error']}")
+            return None
+        return result
+
+    async def start(self):
+        self.manager.start_watcher()
+
+    async def close(self):
+        self.manager.stop_watcher()
+
+    async def analyze_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+        # The manager reports why a model failed rather than just that it did.
+        return await self.manager.analyze_incident(incident)
+
+    async def readiness(self) -> Dict[str, Any]:
+        models = self.manager.load_status
+        return {"ready": all(status["state"] == "ready" for status in models.values()), "models": models}
+
+    async def reload(self, model: Optional[str] = None) -> Dict[str, Any]:
+        return await run_in_threadpool(self.manager.load_models, [model] if model else MODEL_NAMES)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "models": self.manager.load_status,
+            "latency_by_version": self.manager.latency_stats(),
+            "prediction_cache": self.manager.cache.stats(),
+            # This worker only; `python serve.py` reports every worker (see its --help).
+            "memory": process_memory()
+        }
+
+
+class RemoteMLBackend(MLBackend):
+    """Scores through the models API over the shared, pooled HTTP client (see ml_service)."""
+
+    name = "remote"
+
+    async def start(self):
+        await ml_service.start_ml_client()
+
+    async def close(self):
+        await ml_service.close_ml_client()
+
+    async def predict(self, incident_category: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await ml_service.get_ml_prediction(incident_category, data)
+
+    async def analyze_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+        # One /scan call scores every applicable model, instead of one call per model.
+        inputs = incident_model_inputs(incident)
+        if not inputs:
+            return await super().analyze_incident(incident)
+        event = {SCAN_SECTIONS[name]: data for name, data in inputs.items()}
+        event["models"] = list(inputs)
+        start = time.perf_counter()
+        scan = await ml_service.get_ml_scan(event)
+        if scan is None:
+            # E.g. one section failed validation (422): score model by model, so the others still get a result.
+            return await super().analyze_incident(incident)
+        total_latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        results = {
+            name: scan["models"].get(name) or {"error": "No prediction available.", "latency_ms": total_latency_ms}
+            for name in inputs
+        }
+        return {
+            "models": results,
+            "errors": sorted(name for name, result in results.items() if "error" in result),
+            "analyzed_at": datetime.utcnow().isoformat(),
+            "total_latency_ms": total_latency_ms
+        }
+
+    async def readiness(self) -> Dict[str, Any]:
+        ready = await ml_service.get_ml_readiness()
+        if ready is None:
+            return {"ready": False, "models": {}, "error": f"ML API at {ml_service.ML_API_BASE_URL} is unreachable"}
+        return ready
+
+    async def reload(self, model: Optional[str] = None) -> Dict[str, Any]:
+        statuses = await ml_service.reload_ml_models(model)
+        if statuses is None:
+            return {"error": f"ML API at {ml_service.ML_API_BASE_URL} did not reload the models"}
+        return statuses
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "ml_api_client": ml_service.ml_client_stats()}
+
+
+def create_ml_backend(kind: str) -> MLBackend:
+    if kind == "in-process":
+        return InProcessMLBackend(ml_manager)
+    if kind == "remote":
+        return RemoteMLBackend()
+    raise ValueError(f"Unknown ML_BACKEND '{kind}' (expected 'in-process' or 'remote')")
+
+
+# Global ML backend instance
+ml_backend = create_ml_backend(settings.ML_BACKEND)
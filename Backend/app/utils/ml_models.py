@@ -1,13 +1,22 @@
-import joblib
-import pandas as pd
-import numpy as np
-from typing import Dict, Any, Optional
-from pydantic import BaseModel, Field
-from pathlib import Path
-import re
-from urllib.parse import urlparse
-import string
-from bs4 import BeautifulSoup
+from typing import Dict, Any, Optional, Callable, Awaitable
+from pydantic import BaseModel, Field, ValidationError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
+import threading
+import time
+
+from app.config import settings
+
+# The trained models and their feature extractors live in the top-level `models`
+# tree, installed as the `cyberrakshak_ml` package (see requirements.txt);
+# importing model loading (compiled preprocessing plans and forests) and the
+# scorers from there keeps backend and ML API scoring identical.
+from cyberrakshak_ml.cache import PredictionCache
+from cyberrakshak_ml.registry import ModelRegistry
+from cyberrakshak_ml.scoring import MODEL_LABELS, MODEL_NAMES, SCORERS, ScoringError, build_model, model_version
 
 # --- Pydantic Input Models ---
 
@@ -170,195 +179,222 @@ class ZeroDayInput(BaseModel):
     btc: float = 0.0
 
 
-class MLModelManager:
-    def __init__(self):
-        self.models_path = Path(__file__).parent.parent.parent.parent / "models"
-        self.models = {}
-        self.load_models()
-    
-    def load_models(self):
-        """Load all available ML models"""
-        try:
-            # Phishing
-            phishing_model_path = self.models_path / "phishing/models/phishing_rf_model.pkl"
-            phishing_features_path = self.models_path / "phishing/models/phishing_features.pkl"
-            self.models["phishing_model"] = joblib.load(phishing_model_path)
-            self.models["phishing_features"] = joblib.load(phishing_features_path)
-            print("Phishing detection model loaded successfully")
-
-            # Malware
-            malware_model_path = self.models_path / "malware/models/malware_rf_model.pkl"
-            malware_features_path = self.models_path / "malware/models/malware_features.pkl"
-            self.models["malware_model"] = joblib.load(malware_model_path)
-            self.models["malware_features"] = joblib.load(malware_features_path)
-            print("Malware detection model loaded successfully")
-
-            # Ransomware
-            ransomware_model_path = self.models_path / "Ransomware/models/ransomware_rf_model.pkl"
-            self.models["ransomware_model"] = joblib.load(ransomware_model_path)
-            print("Ransomware detection model loaded successfully")
-
-            # Networking
-            networking_model_path = self.models_path / "networking/models/network_rf_model.pkl"
-            self.models["networking_model"] = joblib.load(networking_model_path)
-            print("Networking detection model loaded successfully")
-
-            # Zero-Day
-            zero_day_model_path = self.models_path / "zero_day_attack/models/zero_day_model.pkl"
-            self.models["zero_day_model"] = joblib.load(zero_day_model_path)
-            print("Zero-Day detection model loaded successfully")
-
-        except Exception as e:
-            print(f"Error loading ML models: {e}")
-
-    def predict_phishing(self, data: PhishingInput):
-        if "phishing_model" not in self.models:
-            return {"error": "Phishing model not loaded."}
-
-        try:
-            feats = self._extract_phishing_features(data.dict())
-            feat_array = np.array([feats.get(f, 0) for f in self.models["phishing_features"]]).reshape(1, -1)
-        except Exception as e:
-            return {"error": f"Feature extraction failed: {e}"}
-
-        model = self.models["phishing_model"]
-        pred_prob = model.predict_proba(feat_array)[0][1]
-        prediction = "phishing" if pred_prob >= 0.5 else "legitimate"
-
-        return {
-            "prediction": prediction,
-            "confidence": round(float(pred_prob), 4),
-            "features": feats.to_dict()
-        }
-
-    def predict_malware(self, data: MalwareInput):
-        if "malware_model" not in self.models:
-            return {"error": "Malware model not loaded."}
-
-        model = self.models["malware_model"]
-        features = self.models["malware_features"]
-        
-        input_dict = data.dict()
-        feat_array = np.array([input_dict.get(f, 0) for f in features]).reshape(1, -1)
-        
-        pred_prob = model.predict_proba(feat_array)[0][1]
-        prediction = "malware" if pred_prob >= 0.5 else "benign"
-
-        return {
-            "prediction": prediction,
-            "confidence": round(float(pred_prob), 4)
+# --- Incident analysis ---
+# Which models an incident's evidence goes to: free text and URLs to the phishing
+# model; evidence text that is a JSON object of model features (e.g. a process or
+# connection record pasted by an analyst) to the structured model whose fields it
+# matches best.
+
+STRUCTURED_INPUTS = {
+    "malware": MalwareInput,
+    "ransomware": RansomwareInput,
+    "networking": NetworkingInput,
+    "zero_day": ZeroDayInput,
+}
+
+
+def _input_fields(input_model) -> set:
+    return {field.alias or name for name, field in input_model.model_fields.items()}
+
+
+def incident_model_inputs(incident: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Input for each applicable model, keyed by model name (field names as in the models API)"""
+    text = incident.get("evidence_text") or ""
+    url = incident.get("evidence_url") or ""
+    try:
+        features = json.loads(text) if text.lstrip().startswith("{") else None
+    except ValueError:
+        features = None
+
+    inputs = {}
+    if isinstance(features, dict):
+        matches = {name: len(features.keys() & _input_fields(model)) for name, model in STRUCTURED_INPUTS.items()}
+        best = max(matches.values())
+        inputs.update({name: features for name, count in matches.items() if best and count == best})
+        text = ""
+    if text or url:
+        inputs["phishing"] = {
+            "subject": incident.get("title") or "",
+            "body": text or incident.get("description") or "",
+            "url": url
         }
+    return inputs
+
+
+async def analyze_incident_with(
+    incident: Dict[str, Any],
+    predict: Callable[[str, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+) -> Dict[str, Any]:
+    """
+    Runs `predict(model_name, data)` for every applicable model concurrently and merges
+    the results into one analysis record, with per-model and total latency.
+    """
+    inputs = incident_model_inputs(incident)
+    start = time.perf_counter()
+
+    async def timed(name, data):
+        model_start = time.perf_counter()
+        result = await predict(name, data)
+        return result, round((time.perf_counter() - model_start) * 1000, 3)
+
+    outcomes = await asyncio.gather(*[timed(name, data) for name, data in inputs.items()])
+    # Copies, so cached predictions are never modified.
+    results = {
+        name: dict(result or {"error": "No prediction available."}, latency_ms=latency_ms)
+        for name, (result, latency_ms) in zip(inputs, outcomes)
+    }
+    return {
+        "models": results,
+        "errors": sorted(name for name, result in results.items() if "error" in result),
+        "analyzed_at": datetime.utcnow().isoformat(),
+        "total_latency_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+
+def model_predictor(name: str, by_alias: bool = False):
+    """
+    A predict_* method for model `name`. It scores with the models API's own scorer
+    (cyberrakshak_ml.scoring.SCORERS), against one loaded version of the model, so a
+    reload mid-call cannot mix versions. Adds `model_version` to the result, serves
+    repeated inputs from the prediction cache (errors are not cached) and times each
+    call. A scorer that raises gives an error result, so one model never fails the others.
+    """
+    def predict(self, data: BaseModel) -> Dict[str, Any]:
+        model = self.registry.get(name)
+        if model is None:
+            return {"error": f"{MODEL_LABELS[name]} model not loaded."}
+
+        record = data.dict(by_alias=by_alias)
+        key = self.cache.key(name, model.version, record)
+        result = self.cache.get(key)
+        if result is None:
+            start = time.perf_counter()
+            try:
+                result = SCORERS[name](model, [record])[0]
+            except ScoringError as e:
+                result = {"error": e.detail}
+            except Exception as e:
+                result = {"error": f"Prediction failed: {e}"}
+            self._record_latency(name, model.version, time.perf_counter() - start, "error" in result)
+            if "error" not in result:
+                result["model_version"] = model.version
+                self.cache.put(key, result)
+        return result
+    predict.__name__ = f"predict_{name}"
+    return predict
 
-    def predict_ransomware(self, data: RansomwareInput):
-        if "ransomware_model" not in self.models:
-            return {"error": "Ransomware model not loaded."}
-        
-        model = self.models["ransomware_model"]
-        input_df = pd.DataFrame([data.dict()])
-
-        try:
-            preprocessor = model.named_steps.get('preprocessor')
-            if preprocessor and hasattr(preprocessor, 'transformers_'):
-                numeric_cols_from_model = [
-                    col for name, _, cols in preprocessor.transformers_ if name == 'num' for col in cols
-                ]
-
-                for col in numeric_cols_from_model:
-                    if col in input_df.columns:
-                        input_df[col] = pd.to_numeric(input_df[col], errors='coerce').fillna(0).astype(np.float64)
-
-            pred_prob_all = model.predict_proba(input_df)
-            pred_prob = pred_prob_all[0][1]
-            prediction = "malicious" if pred_prob >= 0.5 else "benign"
-        except Exception as e:
-            return {"error": f"Prediction failed: {e}"}
-
-        return {
-            "prediction": prediction,
-            "confidence": round(float(pred_prob), 4)
-        }
 
-    def predict_networking(self, data: NetworkingInput):
-        if "networking_model" not in self.models:
-            return {"error": "Networking model not loaded."}
-        
-        model = self.models["networking_model"]
-        input_df = pd.DataFrame([data.dict()])
-
-        try:
-            pred_prob = model.predict_proba(input_df)[0][1]
-            prediction = "anomaly" if pred_prob >= 0.5 else "normal"
-        except Exception as e:
-            return {"error": f"Prediction failed: {e}"}
-
-        return {
-            "prediction": prediction,
-            "confidence": round(float(pred_prob), 4)
+class MLModelManager:
+    def __init__(self, load: bool = True):
+        # Versioned models, swapped atomically on reload (see cyberrakshak_ml/registry.py).
+        self.registry = ModelRegistry(build_model)
+        self.cache = PredictionCache(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_TTL_SECONDS)
+        # Per model and version: completed, failed, total_seconds.
+        self.latency = {}
+        self._latency_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        if load:
+            self.load_models()
+
+    def start_watcher(self):
+        """Start hot reload of changed model files (on app startup, so it runs in each worker process)"""
+        if settings.ML_MODEL_RELOAD_INTERVAL > 0 and (self._watcher is None or not self._watcher.is_alive()):
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(
+                target=self._watch_models, args=(settings.ML_MODEL_RELOAD_INTERVAL,), daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watching.set()
+
+    @property
+    def load_status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.registry.status(name) for name in MODEL_NAMES}
+
+    def load_models(self, names=MODEL_NAMES) -> Dict[str, Dict[str, Any]]:
+        """(Re)load ML models concurrently; each is swapped in only once it loaded successfully"""
+        names = list(names)
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            list(executor.map(self._load_model, names))
+        return {name: self.registry.status(name) for name in names}
+
+    def _load_model(self, name: str):
+        if self.registry.load(name) is None:
+            print(f"Error loading the {name} model: {self.registry.status(name)['error']}")
+        else:
+            print(f"{MODEL_LABELS[name]} detection model loaded successfully")
+
+    def _watch_models(self, interval: float):
+        """Reload models whose files changed; a change must hold for two checks so half-copied files are skipped"""
+        seen, rejected = {}, {}
+        while not self._stop_watching.wait(interval):
+            for name in MODEL_NAMES:
+                model = self.registry.get(name)
+                current = model_version(name)
+                if (model is not None and current == model.version) or current == rejected.get(name):
+                    seen.pop(name, None)
+                    continue
+                if seen.get(name) != current:
+                    seen[name] = current
+                    continue
+                seen.pop(name, None)
+                self._load_model(name)
+                if self.registry.status(name)["error"]:
+                    rejected[name] = current
+
+    def _record_latency(self, name: str, version: str, seconds: float, failed: bool):
+        with self._latency_lock:
+            counters = self.latency.setdefault(name, {}).setdefault(
+                version, {"completed": 0, "failed": 0, "total_seconds": 0.0}
+            )
+            counters["completed"] += 1
+            counters["failed"] += failed
+            counters["total_seconds"] += seconds
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._latency_lock:
+            return {
+                name: {
+                    version: {
+                        "completed": counters["completed"],
+                        "failed": counters["failed"],
+                        "avg_latency_ms": round(counters["total_seconds"] / counters["completed"] * 1000, 3),
+                    }
+                    for version, counters in versions.items()
+                }
+                for name, versions in self.latency.items()
+            }
+
+    async def analyze_incident(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+        """Score an incident's evidence with all applicable models at once, in the threadpool"""
+        predictors = {
+            "phishing": (PhishingInput, self.predict_phishing),
+            "malware": (MalwareInput, self.predict_malware),
+            "ransomware": (RansomwareInput, self.predict_ransomware),
+            "networking": (NetworkingInput, self.predict_networking),
+            "zero_day": (ZeroDayInput, self.predict_zero_day),
         }
 
-    def predict_zero_day(self, data: ZeroDayInput):
-        if "zero_day_model" not in self.models:
-            return {"error": "Zero-Day model not loaded."}
-
-        model = self.models["zero_day_model"]
-        
-        input_df = pd.DataFrame([data.dict(by_alias=True)])
+        async def predict(name, data):
+            input_model, method = predictors[name]
+            try:
+                return await run_in_threadpool(method, input_model(**data))
+            except ValidationError as e:
+                return {"error": f"Invalid input: {e}"}
+            except Exception as e:
+                return {"error": f"Prediction failed: {e}"}
 
-        try:
-            prediction = model.predict(input_df)[0]
-            pred_probs = model.predict_proba(input_df)[0]
-            
-            classifier = model.named_steps['classifier']
-            class_probabilities = {classifier.classes_[i]: round(float(prob), 4) for i, prob in enumerate(pred_probs)}
+        return await analyze_incident_with(incident, predict)
 
-        except Exception as e:
-            return {"error": f"Prediction failed: {e}"}
+    predict_phishing = model_predictor("phishing")
+    predict_malware = model_predictor("malware")
+    predict_ransomware = model_predictor("ransomware")
+    predict_networking = model_predictor("networking")
+    predict_zero_day = model_predictor("zero_day", by_alias=True)
 
-        return {
-            "prediction": prediction,
-            "class_probabilities": class_probabilities
-        }
-
-    def _extract_phishing_features(self, row):
-        feats = {}
-        if 'url' in row and pd.notna(row['url']):
-            feats.update(self._extract_url_features(row['url']))
-        feats.update(self._extract_text_features(row.get('subject', ''), row.get('body', '')))
-        return pd.Series(feats)
-
-    def _extract_url_features(self, url):
-        if not url or pd.isna(url): return { "url_length": 0, "num_dots": 0, "num_hyphens": 0, "num_digits": 0, "has_https": 0, "has_at_symbol": 0, "num_slash": 0, "has_ip_address": 0, "contains_login": 0, "contains_verify": 0 }
-        return {
-            "url_length": len(url), "num_dots": url.count('.'), "num_hyphens": url.count('-'),
-            "num_digits": sum(c.isdigit() for c in url), "has_https": int("https" in url.lower()),
-            "has_at_symbol": int("@" in url), "num_slash": url.count('/'),
-            "has_ip_address": int(bool(re.match(r"^\d{1,3}(\.\d{1,3}){3}$", urlparse(url).hostname or ""))),
-            "contains_login": int("login" in url.lower()), "contains_verify": int("verify" in url.lower())
-        }
-
-    def _extract_text_features(self, subject, body):
-        STOPWORDS = {
-            'a','about','above','after','again','against','all','am','an','and','any','are','as','at','be','because','been',
-            'before','being','below','between','both','but','by','could','did','do','does','doing','down','during','each',
-            'few','for','from','further','had','has','have','having','he','her','here','hers','herself','him','himself','his',
-            'how','i','if','in','into','is','it','its','itself','just','me','more','most','my','myself','no','nor','not','now',
-            'of','off','on','once','only','or','other','our','ours','ourselves','out','over','own','same','she','should','so',
-            'some','such','than','that','the','their','theirs','them','themselves','then','there','these','they','this','those',
-            'through','to','too','under','until','up','very','was','we','were','what','when','where','which','while','who','whom',
-            'why','will','with','you','your','yours','yourself','yourselves'
-        }
-        if pd.isna(subject): subject = ""
-        if pd.isna(body): body = ""
-        text = BeautifulSoup(str(subject) + " " + str(body), "html.parser").get_text()
-        text = text.lower()
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        tokens = [w for w in text.split() if w not in STOPWORDS]
-        combined = " ".join(tokens)
-        return {
-            "text_length": len(combined), "num_words": len(combined.split()), "num_exclamations": combined.count('!'),
-            "num_digits": sum(c.isdigit() for c in combined), "contains_login": int("login" in combined),
-            "contains_verify": int("verify" in combined), "contains_password": int("password" in combined)
-        }
 
-# Global ML model manager instance
-ml_manager = MLModelManager()
\ No newline at end of file
+# Global ML model manager instance; models are only loaded when this process scores
+# in-process (with ML_BACKEND=remote the models API does, see ml_backend.py).
+ml_manager = MLModelManager(load=settings.ML_BACKEND == "in-process")
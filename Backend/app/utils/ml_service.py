@@ -1,12 +1,261 @@
+import asyncio
 import httpx
+import time
 from typing import Dict, Any, Optional
 from ..config import settings
+from .circuit_breaker import CircuitBreaker, LatencyWindow
 import logging
 
 logger = logging.getLogger(__name__)
 
 ML_API_BASE_URL = settings.ML_API_BASE_URL
 
+# Map incident category to ML API endpoint path
+ENDPOINT_MAP = {
+    "phishing": "predict/phishing",
+    "malware": "predict/malware",
+    "ransomware": "predict/ransomware", # Assuming 'Ransomware' in data maps to this
+    "network-intrusion": "predict/networking",
+    "zero-day": "predict/zero-day",
+}
+
+# Composite endpoint: one event, every applicable model (see analyze_incident in ml_backend)
+SCAN_PATH = "scan"
+
+# One client for the whole app, opened at startup and closed at shutdown, so calls
+# reuse keep-alive connections to the ML API instead of paying TCP setup each time.
+_client: Optional[httpx.AsyncClient] = None
+_stats = {
+    "requests": 0, "errors": 0, "in_flight": 0, "requests_sent": 0, "connections_opened": 0, "total_seconds": 0.0,
+    "hedged": 0, "hedge_wins": 0,
+}
+
+# Resilience, per endpoint URL (each replica has its own): a circuit breaker that
+# stops calling an endpoint that keeps failing, and recent latencies, which set
+# the adaptive timeout (a multiple of the observed p95, capped by the configured
+# timeout) and the default delay before a hedged request to ML_API_HEDGE_BASE_URL.
+# Timed-out calls count in the latencies, and each consecutive timeout doubles the
+# adaptive timeout, so it widens when the endpoint slows down. A breaker's
+# half-open trial call always gets the full configured timeout.
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyWindow] = {}
+
+
+def _breaker(url: str) -> CircuitBreaker:
+    if url not in _breakers:
+        _breakers[url] = CircuitBreaker(settings.ML_API_BREAKER_FAILURES, settings.ML_API_BREAKER_RESET_SECONDS)
+    return _breakers[url]
+
+
+def _latency(url: str) -> LatencyWindow:
+    return _latencies.setdefault(url, LatencyWindow())
+
+
+def _parse_endpoint_timeouts(value: Optional[str]) -> Dict[str, float]:
+    """Parses "phishing=5,zero-day=2" into {"phishing": 5.0, "zero-day": 2.0}."""
+    timeouts = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            category, seconds = item.split("=", 1)
+            timeouts[category.strip().lower()] = float(seconds)
+    return timeouts
+
+
+ENDPOINT_TIMEOUTS = _parse_endpoint_timeouts(settings.ML_API_ENDPOINT_TIMEOUTS)
+
+
+def _timeout_seconds(category: str, url: str) -> float:
+    configured = ENDPOINT_TIMEOUTS.get(category, settings.ML_API_TIMEOUT)
+    latency = _latency(url)
+    p95 = latency.percentile(95) if settings.ML_API_ADAPTIVE_TIMEOUTS else None
+    if p95 is None or _breaker(url).state != "closed":
+        return configured
+    adaptive = max(settings.ML_API_MIN_TIMEOUT, p95 * settings.ML_API_TIMEOUT_P95_MULTIPLIER)
+    return min(configured, adaptive * 2 ** min(latency.consecutive_timeouts, 16))
+
+
+def _timeout_for(category: str, url: str) -> httpx.Timeout:
+    seconds = _timeout_seconds(category, url)
+    return httpx.Timeout(seconds, connect=min(settings.ML_API_CONNECT_TIMEOUT, seconds))
+
+
+def _http2_enabled() -> bool:
+    if not settings.ML_API_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401 - httpx needs it for HTTP/2
+    except ImportError:
+        logger.warning("ML_API_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1.")
+        return False
+    return True
+
+
+async def start_ml_client():
+    """Creates the shared ML API client (called on app startup)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.ML_API_TIMEOUT, connect=settings.ML_API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.ML_API_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ML_API_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ML_API_KEEPALIVE_EXPIRY
+            ),
+            http2=_http2_enabled()
+        )
+    return _client
+
+
+async def close_ml_client():
+    """Closes the shared ML API client and its connections (called on app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _trace(event_name: str, info: Dict[str, Any]):
+    # httpcore reports each new TCP connection and each request written to a connection;
+    # a request sent without a new connection went over a pooled keep-alive one.
+    if event_name == "connection.connect_tcp.complete":
+        _stats["connections_opened"] += 1
+    elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+        _stats["requests_sent"] += 1
+
+
+def ml_client_stats() -> Dict[str, Any]:
+    """Request and connection counters for the shared client."""
+    requests = _stats["requests"]
+    stats = {
+        "started": _client is not None,
+        "requests": requests,
+        "errors": _stats["errors"],
+        "in_flight": _stats["in_flight"],
+        "connections_opened": _stats["connections_opened"],
+        # From the request trace (see _trace), not the client's connection pool, which httpx keeps private.
+        "connections_reused": max(0, _stats["requests_sent"] - _stats["connections_opened"]),
+        "avg_latency_ms": round(_stats["total_seconds"] / requests * 1000, 3) if requests else None,
+        "max_connections": settings.ML_API_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.ML_API_MAX_KEEPALIVE_CONNECTIONS,
+    }
+    stats["hedged"] = _stats["hedged"]
+    stats["hedge_wins"] = _stats["hedge_wins"]
+    stats["endpoints"] = {}
+    for url, breaker in _breakers.items():
+        p95 = _latency(url).percentile(95)
+        category = next((c for c, path in {**ENDPOINT_MAP, "scan": SCAN_PATH}.items() if url.endswith("/" + path)), None)
+        stats["endpoints"][url] = {
+            **breaker.stats(),
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+            "timeout_seconds": round(_timeout_seconds(category, url), 3),
+        }
+    return stats
+
+
+async def _post(url: str, category: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """One call to one endpoint, recorded in its breaker, latency window and the client stats."""
+    client = await start_ml_client()
+    breaker = _breaker(url)
+    _stats["requests"] += 1
+    _stats["in_flight"] += 1
+    start = time.perf_counter()
+    timeout = _timeout_for(category, url)
+    try:
+        response = await client.post(url, json=data, timeout=timeout, extensions={"trace": _trace})
+        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+    except asyncio.CancelledError:
+        # The other side of a hedge won; this says nothing about the endpoint's health.
+        breaker.release()
+        raise
+    except httpx.HTTPStatusError as e:
+        _stats["errors"] += 1
+        # A 4xx means the endpoint is up and rejected this input; only 5xx counts against it.
+        if e.response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except httpx.ReadTimeout:
+        # Slower than its timeout (not unreachable, which is a connect timeout).
+        _stats["errors"] += 1
+        breaker.record_failure()
+        _latency(url).add_timeout(timeout.read)
+        raise
+    except Exception:
+        _stats["errors"] += 1
+        breaker.record_failure()
+        raise
+    else:
+        breaker.record_success()
+        _latency(url).add(time.perf_counter() - start)
+        return response.json()
+    finally:
+        _stats["in_flight"] -= 1
+        _stats["total_seconds"] += time.perf_counter() - start
+
+
+async def _hedged_post(url: str, replica: str, category: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calls `url`; if it has not answered after the hedge delay (or failed early),
+    also calls `replica` and returns whichever succeeds first.
+    """
+    if settings.ML_API_HEDGE_AFTER_MS:
+        delay = settings.ML_API_HEDGE_AFTER_MS / 1000
+    else:
+        delay = _latency(url).percentile(95)
+    primary = asyncio.ensure_future(_post(url, category, data))
+    tasks = [primary]
+    try:
+        if delay is None:
+            # No latency history yet, so no basis for hedging.
+            return await primary
+        await asyncio.wait(tasks, timeout=delay)
+        if primary.done() and primary.exception() is None:
+            return primary.result()
+        if not _breaker(replica).allow():
+            return await primary
+
+        _stats["hedged"] += 1
+        hedge = asyncio.ensure_future(_post(replica, category, data))
+        tasks.append(hedge)
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    _stats["hedge_wins"] += task is hedge
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def get_ml_readiness() -> Optional[Dict[str, Any]]:
+    """The models API's GET /ready report, or None if it cannot be reached."""
+    client = await start_ml_client()
+    try:
+        response = await client.get(f"{ML_API_BASE_URL}/ready", timeout=settings.ML_API_CONNECT_TIMEOUT)
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error checking ML API readiness: {e}")
+        return None
+
+
+async def reload_ml_models(model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Asks the models API to reload one model (or all); returns the load states, or None on failure."""
+    client = await start_ml_client()
+    try:
+        response = await client.post(f"{ML_API_BASE_URL}/models/reload", params={"model": model} if model else None)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error reloading models on the ML API: {e}")
+        return None
+
+
 async def get_ml_prediction(incident_category: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Calls the external ML API to get a prediction for an incident.
@@ -22,31 +271,45 @@ async def get_ml_prediction(incident_category: str, data: Dict[str, Any]) -> Opt
         logger.warning("ML_API_BASE_URL is not configured. Skipping ML prediction.")
         return None
 
-    # Map incident category to ML API endpoint path
-    endpoint_map = {
-        "phishing": "predict/phishing",
-        "malware": "predict/malware",
-        "ransomware": "predict/ransomware", # Assuming 'Ransomware' in data maps to this
-        "network-intrusion": "predict/networking",
-        "zero-day": "predict/zero-day",
-    }
-
-    endpoint_path = endpoint_map.get(incident_category.lower())
+    category = incident_category.lower()
+    endpoint_path = ENDPOINT_MAP.get(category)
 
     if not endpoint_path:
         logger.info(f"No ML model available for category: {incident_category}. Skipping prediction.")
         return None
 
+    return await _call(category, endpoint_path, data)
+
+
+async def _call(category: str, endpoint_path: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """POSTs to the models API through the breakers, with a hedge when configured; None on failure."""
     url = f"{ML_API_BASE_URL}/{endpoint_path}"
-    
+    replica = f"{settings.ML_API_HEDGE_BASE_URL}/{endpoint_path}" if settings.ML_API_HEDGE_BASE_URL else None
+
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=data)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-            return response.json()
+        if _breaker(url).allow():
+            if replica:
+                return await _hedged_post(url, replica, category, data)
+            return await _post(url, category, data)
+        # The primary's breaker is open; fail over to the replica when there is one.
+        if replica and _breaker(replica).allow():
+            return await _post(replica, category, data)
+        logger.warning(f"ML API circuit is open for {category}. Skipping prediction.")
+        return None
     except httpx.RequestError as e:
         logger.error(f"Error calling ML API at {url}: {e}")
         return None
     except Exception as e:
-        logger.error(f"An unexpected error occurred during ML prediction for {incident_category}: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"An unexpected error occurred during ML prediction for {category}: {e}")
+        return None
+
+
+async def get_ml_scan(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Scores a composite event with every applicable model in one call to the models
+    API's POST /scan. Returns its combined result, or None if the call failed.
+    """
+    if not ML_API_BASE_URL:
+        logger.warning("ML_API_BASE_URL is not configured. Skipping ML scan.")
+        return None
+    return await _call("scan", SCAN_PATH, event)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare the in-process and remote ML backends under concurrent load.
+
+The remote backend needs the models API running at ML_API_BASE_URL:
+    cd ../models && uvicorn api.main:app --port 8000
+Then, from the Backend directory:
+    python benchmark_ml_backend.py --requests 2000 --concurrency 32
+
+Every request carries a distinct input, so neither backend can answer from its
+prediction cache; the numbers are for real scoring.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Keep the app's global backend from loading models on import; both backends are built below.
+os.environ["ML_BACKEND"] = "remote"
+
+from app.utils.ml_backend import InProcessMLBackend, RemoteMLBackend
+from app.utils.ml_models import MLModelManager
+from cyberrakshak_ml.cache import PredictionCache
+
+
+def make_requests(n, seed=0):
+    """A mix of phishing, malware and network incidents, each with a unique input."""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            requests.append(("phishing", {
+                "subject": f"Verify your account #{i}",
+                "body": f"Please log in at http://secure-{i}.example.com/verify to keep your password",
+                "url": f"http://secure-{i}.example.com/login?id={rng.randint(0, 10**6)}",
+            }))
+        elif kind == 1:
+            requests.append(("malware", {
+                "prio": rng.randint(0, 140), "static_prio": rng.randint(0, 140),
+                "total_vm": rng.randint(0, 10**6), "map_count": rng.randint(0, 5000), "nvcsw": i,
+            }))
+        else:
+            requests.append(("network-intrusion", {
+                "protocol_type": rng.choice(["tcp", "udp", "icmp"]), "service": "http", "flag": "SF",
+                "src_bytes": rng.randint(0, 10**5), "dst_bytes": i, "count": rng.randint(0, 500),
+            }))
+    return requests
+
+
+async def run_load(backend, requests, concurrency, report=True):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(category, data):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            result = await backend.predict(category, data)
+            latencies.append(time.perf_counter() - start)
+            failures += result is None
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(category, data) for category, data in requests])
+    elapsed = time.perf_counter() - start
+
+    if not report:
+        return
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))] * 1000
+    print(f"  {backend.name:<11} {len(requests) / elapsed:9.1f} req/s   p50 {pct(50):7.2f} ms   "
+          f"p95 {pct(95):7.2f} ms   p99 {pct(99):7.2f} ms   failed {failures}")
+
+
+async def main(n, concurrency):
+    requests = make_requests(n)
+
+    manager = MLModelManager()
+    manager.cache = PredictionCache(max_entries=0)
+    backends = [InProcessMLBackend(manager), RemoteMLBackend()]
+
+    for backend in backends:
+        await backend.start()
+    try:
+        if not (await backends[1].readiness())["ready"]:
+            print("Models API is not ready; benchmarking the in-process backend only.")
+            backends = backends[:1]
+        print(f"\n{n} requests, concurrency {concurrency}")
+        for backend in backends:
+            # Warm up (connections, threadpool, compiled models) before measuring.
+            await run_load(backend, make_requests(60, seed=1), concurrency, report=False)
+            await run_load(backend, requests, concurrency)
+    finally:
+        for backend in backends:
+            await backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
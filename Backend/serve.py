@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Multi-worker CyberRakshak Backend server that shares the ML models between workers.
+
+With ML_BACKEND=in-process (the default) each uvicorn worker would load its own
+copy of all five models. Here the master process loads them once, freezes the
+garbage collector (so the workers' collections never write to the models'
+memory) and forks the workers, which then share the model memory copy-on-write.
+Linux/macOS only; on Windows use run.py.
+
+    python serve.py --workers 4
+    python serve.py --workers 4 --no-preload    # every worker loads its own copy, for comparison
+
+A per-worker memory report (RSS, and PSS, which divides shared pages among the
+processes sharing them) is printed --report-after seconds after start and on
+SIGUSR1. A model hot-reloaded in a worker is loaded into that worker only.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+from app.utils.helpers import process_memory
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock) -> int:
+    # The models' objects stay frozen; only objects created from here on are collected.
+    gc.enable()
+    server = uvicorn.Server(uvicorn.Config("app.main:app", log_level="info"))
+    server.run(sockets=[sock])
+    return 0 if server.started else 3
+
+
+def fork_worker(sock):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = run_worker(sock)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+    return pid
+
+
+def print_memory_report(workers):
+    rows = [("master", process_memory())] + [(f"worker {i}", process_memory(pid)) for pid, i in workers.items()]
+    if "rss_mb" not in rows[0][1]:
+        print("Per-process memory is only available on Linux (/proc/<pid>/smaps_rollup).")
+        return
+    print(f"\n{'process':<10} {'pid':>7} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+    for label, memory in rows:
+        print(f"{label:<10} {memory['pid']:>7} {memory['rss_mb']:>9} {memory['pss_mb']:>9} "
+              f"{memory['shared_mb']:>10} {memory['private_mb']:>11}")
+    total_rss = sum(memory["rss_mb"] for _, memory in rows)
+    total_pss = sum(memory["pss_mb"] for _, memory in rows)
+    # PSS adds up to the memory actually used; RSS counts every shared page once per process.
+    print(f"{'total':<10} {'':>7} {total_rss:>9.1f} {total_pss:>9.1f}   (saved by sharing: {total_rss - total_pss:.1f} MB)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="let every worker load its own models")
+    parser.add_argument("--report-after", type=float, default=30.0,
+                        help="seconds after start to print the memory report (0 = only on SIGUSR1)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); on this platform use run.py")
+
+    # No collections in the master: they would only add copies of the models' pages.
+    gc.disable()
+    if args.preload:
+        from app.utils.ml_models import ml_manager
+        loaded = [name for name, status in ml_manager.load_status.items() if status["state"] == "ready"]
+        print(f"Preloaded ML models in the master: {', '.join(loaded) or 'none (ML_BACKEND is not in-process)'}")
+    # Move everything allocated so far out of the collector's reach, so the workers'
+    # collections do not touch these objects (and copy the pages they live in).
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"Starting {args.workers} workers on http://{args.host}:{args.port}")
+    workers = {fork_worker(sock): i for i in range(args.workers)}
+
+    stopping = False
+    failed_worker = None
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    report_requested = False
+
+    def request_report(signum, frame):
+        nonlocal report_requested
+        report_requested = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR1, request_report)
+
+    report_at = time.monotonic() + args.report_after if args.report_after > 0 else None
+    while workers:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid in workers:
+            index = workers.pop(pid)
+            if not stopping:
+                if os.waitstatus_to_exitcode(status) == 3:
+                    # The app failed to start; a new worker would fail the same way. Stop the
+                    # others too, and keep reaping until they are gone, so none is left serving
+                    # on the shared socket without a master.
+                    print(f"Worker {index} failed to start the app; stopping.")
+                    failed_worker = index
+                    stop(None, None)
+                    continue
+                # Replaced from the master, so the new worker shares the preloaded models too.
+                print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting it.")
+                time.sleep(1)
+                workers[fork_worker(sock)] = index
+            continue
+        if report_requested or (report_at is not None and time.monotonic() >= report_at):
+            report_requested, report_at = False, None
+            print_memory_report(workers)
+        time.sleep(0.5)
+
+    if failed_worker is not None:
+        sys.exit(f"Worker {failed_worker} failed to start the app.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Shared test setup. The app reads its settings from the environment on import,
+so the defaults below are set first. Firestore is replaced by an in-memory fake
+(`firestore` fixture) and the ML API by mocked httpx transports, so the tests
+need no network or credentials.
+"""
+
+import os
+import tempfile
+import uuid
+
+os.environ.setdefault("MISTRAL_API_KEY", "test")
+os.environ.setdefault("ML_BACKEND", "remote")  # do not load the trained models
+os.environ.setdefault("ENRICHMENT_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "enrichment_queue.db"))
+
+import firebase_admin
+import pytest
+from firebase_admin import credentials
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.auth.credentials import AnonymousCredentials
+
+
+class _TestCredential(credentials.Base):
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
+# app.utils.firebase creates its clients on import; this app keeps it from reading real credentials.
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(_TestCredential(), {"projectId": "cyberrakshak-test"})
+
+
+class FakeSnapshot:
+    def __init__(self, document_id, data):
+        self.id = document_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, store, collection, document_id):
+        self._store = store
+        self._key = (collection, document_id or uuid.uuid4().hex)
+        self.id = self._key[1]
+
+    async def get(self):
+        return FakeSnapshot(self.id, self._store.docs.get(self._key))
+
+    async def set(self, data):
+        self._store.docs[self._key] = dict(data)
+
+    async def create(self, data):
+        self._store.apply([("create", self, data)])
+
+    async def update(self, data):
+        self._store.apply([("update", self, data)])
+
+    async def delete(self):
+        self._store.docs.pop(self._key, None)
+
+
+class FakeQuery:
+    """Enough of Firestore's query API for FirebaseDB's get_collection and query_documents."""
+
+    def __init__(self, store, collection, steps=()):
+        self._store = store
+        self._collection = collection
+        self._steps = steps
+
+    def _with(self, *step):
+        return FakeQuery(self._store, self._collection, self._steps + (step,))
+
+    def document(self, document_id=None):
+        return FakeDocument(self._store, self._collection, document_id)
+
+    def where(self, field, operator, value):
+        assert operator == "==", "the fake supports equality filters only"
+        return self._with("where", field, value)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._with("order_by", field, direction)
+
+    def start_after(self, cursor):
+        return self._with("start_after", cursor)
+
+    def select(self, fields):
+        return self._with("select", list(fields))
+
+    def offset(self, count):
+        return self._with("offset", count)
+
+    def limit(self, count):
+        return self._with("limit", count)
+
+    async def stream(self):
+        if self._store.query_error is not None:
+            raise self._store.query_error
+        rows = [(key[1], data) for key, data in self._store.docs.items() if key[0] == self._collection]
+        orders, fields, cursor, offset, limit = [], None, None, 0, None
+        for step in self._steps:
+            if step[0] == "where":
+                rows = [(i, d) for i, d in rows if d.get(step[1]) == step[2]]
+            elif step[0] == "order_by":
+                orders.append(step[1:])
+            elif step[0] == "start_after":
+                cursor = step[1]
+            elif step[0] == "select":
+                fields = step[1]
+            elif step[0] == "offset":
+                offset = step[1]
+            elif step[0] == "limit":
+                limit = step[1]
+        # Like Firestore, ordering drops the documents that lack an ordered field.
+        rows = [(i, d) for i, d in rows if all(f == "__name__" or f in d for f, _ in orders)]
+        for field, direction in reversed(orders):
+            rows.sort(key=lambda row: row[0] if field == "__name__" else row[1][field],
+                      reverse=direction == "DESCENDING")
+        if cursor is not None:
+            values = [cursor[f] for f, _ in orders] if isinstance(cursor, dict) else list(cursor)
+            key = lambda row: [row[0] if f == "__name__" else row[1][f] for f, _ in orders]
+            descending = orders[0][1] == "DESCENDING"
+            rows = [row for row in rows if (key(row) < values if descending else key(row) > values)]
+        rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        for document_id, data in rows:
+            yield FakeSnapshot(document_id, data if fields is None else {f: data[f] for f in fields if f in data})
+
+
+class FakeBatch:
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def set(self, ref, data):
+        self._writes.append(("set", ref, data))
+
+    def create(self, ref, data):
+        self._writes.append(("create", ref, data))
+
+    def update(self, ref, data):
+        self._writes.append(("update", ref, data))
+
+    def delete(self, ref):
+        self._writes.append(("delete", ref, None))
+
+    async def commit(self):
+        self._store.commits += 1
+        self._store.apply(self._writes)
+
+
+class FakeFirestore:
+    """In-memory stand-in for the async Firestore client."""
+
+    def __init__(self):
+        self.docs = {}
+        self.commits = 0
+        self.query_error = None
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def apply(self, writes):
+        """Applies writes atomically: all of them, or none if one fails."""
+        for kind, ref, _ in writes:
+            if kind == "create" and ref._key in self.docs:
+                raise AlreadyExists(f"Document already exists: {ref.id}")
+            if kind == "update" and ref._key not in self.docs:
+                raise NotFound(f"No document to update: {ref.id}")
+        for kind, ref, data in writes:
+            if kind in ("set", "create"):
+                self.docs[ref._key] = dict(data)
+            elif kind == "update":
+                self.docs[ref._key].update(data)
+            else:
+                self.docs.pop(ref._key, None)
+
+
+@pytest.fixture
+def firestore(monkeypatch):
+    from app.utils.firebase import async_db
+
+    fake = FakeFirestore()
+    monkeypatch.setattr(async_db, "_db", fake)
+    return fake
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.utils import enrichment_queue
+from app.utils.enrichment_queue import EnrichmentQueue, enrich_incident
+
+INCIDENT = {
+    "title": "Prize email", "category": "phishing", "description": "d", "reporter_name": "Reporter",
+    "evidence_text": "Click here to claim your prize",
+}
+
+
+def test_a_retried_job_does_not_renotify_or_mark_read_notifications_unread(firestore, monkeypatch):
+    firestore.docs[("users", "admin-1")] = {"id": "admin-1", "role": "ADMIN"}
+    firestore.docs[("users", "admin-2")] = {"id": "admin-2", "role": "ADMIN"}
+
+    async def ml_api_down(incident):
+        return {"models": {"phishing": {"error": "unreachable"}}, "errors": ["phishing"]}
+
+    monkeypatch.setattr(enrichment_queue.ml_backend, "analyze_incident", ml_api_down)
+
+    async def attempt():
+        try:
+            await enrich_incident("INC-1", INCIDENT)
+        except RuntimeError as e:
+            return str(e)
+
+    assert "ML analysis failed" in asyncio.run(attempt())
+    read = firestore.docs[("notifications", "INC-1-admin-1")]
+    read.update(is_read=True, read_at="then")
+    created_at = firestore.docs[("notifications", "INC-1-admin-2")]["created_at"]
+
+    assert "ML analysis failed" in asyncio.run(attempt())  # the retry
+
+    assert firestore.docs[("notifications", "INC-1-admin-1")] == read
+    assert firestore.docs[("notifications", "INC-1-admin-2")]["created_at"] == created_at
+    assert len([key for key in firestore.docs if key[0] == "notifications"]) == 2
+
+
+def test_a_job_running_past_its_timeout_is_cancelled_and_retried(tmp_path):
+    runs, cancelled = [], []
+
+    async def slow_handler(incident_id, payload):
+        runs.append(incident_id)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(incident_id)
+            raise
+
+    queue = EnrichmentQueue(
+        str(tmp_path / "queue.db"), slow_handler, workers=1,
+        lease_seconds=1.0, job_timeout_seconds=0.2, retry_seconds=60, poll_seconds=0.05
+    )
+
+    async def scenario():
+        await queue.start()
+        await queue.enqueue("INC-1", {})
+        await asyncio.sleep(0.6)
+        await queue.close()
+        return queue._query("SELECT status, attempts, last_error FROM enrichment_jobs")
+
+    # Failed once and waiting for its retry, rather than claimed again while still running.
+    assert asyncio.run(scenario()) == [("pending", 1, "timed out after 0.2s")]
+    assert runs == cancelled == ["INC-1"]
+
+
+def test_the_job_timeout_must_be_shorter_than_the_lease(tmp_path):
+    with pytest.raises(ValueError):
+        EnrichmentQueue(str(tmp_path / "queue.db"), None, lease_seconds=10, job_timeout_seconds=10)
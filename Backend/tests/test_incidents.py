@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+from google.api_core.exceptions import FailedPrecondition
+
+from app.routes.incidents import get_incidents
+from app.utils.helpers import encode_cursor
+
+USER = {"id": "user-1", "role": "USER"}
+
+
+def list_incidents(**params):
+    arguments = dict(status_filter=None, category_filter=None, severity_filter=None, limit=10, offset=0, cursor=None)
+    arguments.update(params)
+    return asyncio.run(get_incidents(Response(), USER, **arguments))
+
+
+def test_a_rejected_incident_query_is_an_error_not_an_empty_list(firestore):
+    firestore.query_error = FailedPrecondition("The query requires an index.")
+
+    with pytest.raises(HTTPException) as error:
+        list_incidents()
+
+    assert error.value.status_code == 500
+    assert "requires an index" in error.value.detail
+
+
+def test_incidents_are_listed_newest_first(firestore):
+    for day in (1, 3, 2):
+        firestore.docs[("incidents", f"INC-{day}")] = {
+            "id": f"INC-{day}", "title": "t", "category": "Phishing", "description": "d", "status": "Pending",
+            "severity": "Low", "reporter_id": "user-1", "reporter_name": "r",
+            "created_at": f"2026-01-0{day}T00:00:00", "updated_at": f"2026-01-0{day}T00:00:00",
+        }
+
+    assert [incident.id for incident in list_incidents()] == ["INC-3", "INC-2", "INC-1"]
+
+
+@pytest.mark.parametrize("values", [[], ["2026-01-01T00:00:00"], ["2026-01-01T00:00:00", 7], [1, 2, 3], [{}, []]])
+def test_a_cursor_of_the_wrong_shape_is_a_bad_request(firestore, values):
+    with pytest.raises(HTTPException) as error:
+        list_incidents(cursor=encode_cursor(values))
+
+    assert error.value.status_code == 400
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from cyberrakshak_ml.phishing_features import TEXT_FEATURES
+from cyberrakshak_ml.registry import LoadedModel
+from cyberrakshak_ml.scoring import score_phishing
+
+from app.utils.ml_models import MLModelManager, PhishingInput
+
+
+class Classifier:
+    """Scores every row with `probability`, or raises `error` if one is given."""
+
+    def __init__(self, probability=0.9, error=None):
+        self.probability = probability
+        self.error = error
+
+    def predict_proba(self, X):
+        if self.error is not None:
+            raise self.error
+        return np.tile([1 - self.probability, self.probability], (len(X), 1))
+
+
+@pytest.fixture
+def manager():
+    manager = MLModelManager(load=False)
+    manager.registry._models.update({
+        "phishing": LoadedModel("phishing", "p1", {"phishing_features": TEXT_FEATURES}, predictor=Classifier()),
+        "malware": LoadedModel(
+            "malware", "m1", {"malware_features": ["state", "prio"]},
+            predictor=Classifier(error=RuntimeError("corrupt model"))
+        ),
+    })
+    return manager
+
+
+def test_a_failing_model_does_not_discard_the_others(manager):
+    incident = {
+        "title": "Suspicious process",
+        "evidence_text": json.dumps({"state": 1, "prio": 120, "static_prio": 120}),
+        "evidence_url": "http://login.example.com/verify",
+    }
+
+    analysis = asyncio.run(manager.analyze_incident(incident))
+
+    assert analysis["errors"] == ["malware"]
+    assert "corrupt model" in analysis["models"]["malware"]["error"]
+    assert analysis["models"]["phishing"]["prediction"] == "phishing"
+    assert analysis["models"]["phishing"]["model_version"] == "p1"
+    stats = manager.latency_stats()
+    assert stats["malware"]["m1"]["failed"] == 1
+    assert stats["phishing"]["p1"]["failed"] == 0
+
+
+def test_in_process_predictions_match_the_models_api_scorers(manager):
+    # The models API stringifies null subjects and bodies, so must the in-process backend.
+    data = {"subject": None, "body": None, "url": "http://192.168.0.1/login"}
+    model = manager.registry.get("phishing")
+
+    result = manager.predict_phishing(PhishingInput(**data))
+
+    assert result == dict(score_phishing(model, [data])[0], model_version="p1")
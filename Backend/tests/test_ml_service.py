@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.utils import ml_service
+
+
+class SlowTransport(httpx.AsyncBaseTransport):
+    """A models API that answers after `delay` seconds, and honours the client's read timeout."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def handle_async_request(self, request):
+        try:
+            await asyncio.wait_for(asyncio.sleep(self.delay), request.extensions["timeout"]["read"])
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(200, json={"prediction": "Phishing", "confidence": 0.9})
+
+
+@pytest.fixture
+def ml_api(monkeypatch):
+    transport = SlowTransport(delay=0.002)
+    for name, value in {
+        "ML_API_TIMEOUT": 5.0, "ML_API_ADAPTIVE_TIMEOUTS": True, "ML_API_TIMEOUT_P95_MULTIPLIER": 3.0,
+        "ML_API_MIN_TIMEOUT": 0.05, "ML_API_BREAKER_FAILURES": 3, "ML_API_BREAKER_RESET_SECONDS": 0.2,
+        "ML_API_HEDGE_BASE_URL": None,
+    }.items():
+        monkeypatch.setattr(ml_service.settings, name, value)
+    monkeypatch.setattr(ml_service, "_breakers", {})
+    monkeypatch.setattr(ml_service, "_latencies", {})
+    monkeypatch.setattr(ml_service, "_client", httpx.AsyncClient(transport=transport))
+    return transport
+
+
+def test_calls_recover_when_the_endpoint_slows_down_past_its_adaptive_timeout(ml_api):
+    url = f"{ml_service.ML_API_BASE_URL}/predict/phishing"
+
+    async def scenario():
+        # Warm up: a fast endpoint gets the minimum adaptive timeout.
+        for _ in range(30):
+            assert await ml_service.get_ml_prediction("phishing", {"url": "http://a.example"}) is not None
+        assert ml_service._timeout_seconds("phishing", url) == pytest.approx(0.05)
+
+        # The endpoint now answers in 0.3 s, six times its current timeout.
+        ml_api.delay = 0.3
+        successes, deadline = 0, time.monotonic() + 10
+        while successes < 5 and time.monotonic() < deadline:
+            if await ml_service.get_ml_prediction("phishing", {"url": "http://a.example"}) is None:
+                successes = 0
+                await asyncio.sleep(0.05)
+            else:
+                successes += 1
+        return successes
+
+    assert asyncio.run(scenario()) == 5
+    assert ml_service._breaker(url).state == "closed"
+    assert ml_service._timeout_seconds("phishing", url) > 0.3
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.routes.notifications import mark_all_notifications_read
+from app.utils.enrichment_queue import enrich_incident
+
+INCIDENT = {"title": "Prize email", "category": "phishing", "description": "d", "reporter_name": "Reporter"}
+
+
+def add_user(firestore, user_id, role):
+    firestore.docs[("users", user_id)] = {"id": user_id, "email": f"{user_id}@test.com", "role": role}
+
+
+def test_mark_all_read_updates_the_notifications_enrichment_created(firestore):
+    add_user(firestore, "admin-1", "ADMIN")
+    add_user(firestore, "admin-2", "ADMIN")
+
+    async def scenario():
+        await enrich_incident("INC-1", INCIDENT)
+        await enrich_incident("INC-2", INCIDENT)
+        return await mark_all_notifications_read(current_user={"id": "admin-1"})
+
+    response = asyncio.run(scenario())
+
+    assert response.success
+    assert response.data == {"updated": 2, "failed": 0}
+    notifications = {key[1]: data for key, data in firestore.docs.items() if key[0] == "notifications"}
+    assert sorted(notifications) == ["INC-1-admin-1", "INC-1-admin-2", "INC-2-admin-1", "INC-2-admin-2"]
+    assert all(data["is_read"] == (data["user_id"] == "admin-1") for data in notifications.values())
+    # The documents keep their fields; the ID is not written into them.
+    assert "id" not in notifications["INC-1-admin-1"]
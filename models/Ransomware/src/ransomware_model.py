@@ -10,6 +10,8 @@ import joblib
 from pathlib import Path
 import os
 
+from cyberrakshak_ml.registry import save_atomically
+
 # -----------------------------------------------------
 # Base paths
 # -----------------------------------------------------
@@ -133,9 +135,9 @@ model_file = MODELS_DIR / "ransomware_rf_model.pkl"
 numeric_cols_file = MODELS_DIR / "ransomware_numeric_cols.pkl"
 categorical_cols_file = MODELS_DIR / "ransomware_categorical_cols.pkl"
 
-joblib.dump(model, model_file)
-joblib.dump(numeric_cols, numeric_cols_file)
-joblib.dump(categorical_cols, categorical_cols_file)
+save_atomically(model, model_file)
+save_atomically(numeric_cols, numeric_cols_file)
+save_atomically(categorical_cols, categorical_cols_file)
 
 print(f"\nModel saved to: {model_file}")
 print(f"Numeric columns saved to: {numeric_cols_file}")
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cyberrakshak_ml import scoring
+
+# --- Dynamic micro-batching ---
+# Concurrent single-record requests for the same model are coalesced: the first
+# request opens a short window, and everything that arrives before it closes (or
+# until the batch is full) is scored with one scorer call. Results are fanned back
+# to the waiting callers in order, so the single-record API is unchanged.
+#
+# Settings come from the environment (per model overrides the default):
+#   BATCH_WINDOW_MS=<ms>, BATCH_WINDOW_MS_<MODEL>=<ms>      default 2, 0 disables batching
+#   BATCH_MAX_SIZE=<n>,   BATCH_MAX_SIZE_<MODEL>=<n>        default 64
+
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_SIZE = 64
+
+ScoreFn = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+def _setting(variable: str, name: str, default: float) -> float:
+    return float(os.getenv(f"{variable}_{name.upper()}", os.getenv(variable, default)))
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-record requests for one model into batched scorer calls."""
+
+    def __init__(self, score: ScoreFn, window_ms: float = DEFAULT_WINDOW_MS, max_size: int = DEFAULT_MAX_SIZE):
+        self.score = score
+        self.window = window_ms / 1000
+        self.max_size = max(1, int(max_size))
+        self.enabled = self.window > 0 and self.max_size > 1
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.records = 0
+        self.largest_batch = 0
+
+    async def submit(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.enabled:
+            return (await self.score([record]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            self.records += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            results = await self.score([record for record, _ in batch])
+        except Exception as e:
+            unavailable = isinstance(e, scoring.ScoringError) and e.status_code == 503
+            if len(batch) > 1 and not unavailable:
+                # A single bad record fails the whole call; rescore callers one by
+                # one so only that record's caller sees the error.
+                await asyncio.gather(*[self._run([item]) for item in batch])
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # the caller may have gone away
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_size,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "records": self.records,
+            "avg_batch_size": round(self.records / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+        }
+
+
+batchers: Dict[str, MicroBatcher] = {}
+
+
+def start_batchers(score: Callable[[str, List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]):
+    """Creates one batcher per model; `score(name, records)` scores a batch for that model."""
+    for name in scoring.MODEL_NAMES:
+        batchers[name] = MicroBatcher(
+            lambda records, name=name: score(name, records),
+            window_ms=_setting("BATCH_WINDOW_MS", name, DEFAULT_WINDOW_MS),
+            max_size=int(_setting("BATCH_MAX_SIZE", name, DEFAULT_MAX_SIZE)),
+        )
+
+
+async def score_one(name: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    return await batchers[name].submit(record)
+
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: batcher.stats() for name, batcher in batchers.items()}
@@ -0,0 +1,213 @@
+"""
+Micro-benchmarks for the models API hot paths.
+
+Each benchmark times an optimized code path against the original implementation
+it replaced; their parity is tested in tests/test_parity.py. No running server
+is needed; the model benchmarks use whichever trained models are present and
+skip the rest.
+
+Run from the 'models' directory:
+    python -m api.benchmarks
+"""
+import asyncio
+import random
+import time
+
+import joblib
+from bs4 import BeautifulSoup
+
+from starlette.concurrency import run_in_threadpool
+
+from cyberrakshak_ml import scoring
+from cyberrakshak_ml.cache import PredictionCache
+from cyberrakshak_ml.forest import CompiledForest, final_forest, probe_inputs
+from cyberrakshak_ml.preprocessing import DataFramePlan, compile_preprocessing, probe_records
+from cyberrakshak_ml.html_text import html_to_text
+from cyberrakshak_ml.phishing_features import extract_phishing_feature_columns, text_feature_columns
+from cyberrakshak_ml.url_features import url_feature_matrix, url_features
+
+from tests.reference import (
+    HTML_EDGE_CASES, newsletter_html, previous_text_feature_columns, random_text, reference_phishing_features,
+    reference_url_features, sample_phishing_rows, sample_urls
+)
+
+from .batching import MicroBatcher
+
+def timed(label, fn, repeat=3):
+    best = min(_time_once(fn) for _ in range(repeat))
+    print(f"  {label:<40} {best * 1000:10.2f} ms")
+    return best
+
+def _time_once(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+# --- Benchmarks ---
+
+def bench_phishing_features(n=2000):
+    print("--- Phishing feature extraction ---")
+    rows = sample_phishing_rows(n)
+    subjects = [str(row["subject"]) for row in rows]
+    bodies = [str(row["body"]) for row in rows]
+    urls = [row["url"] for row in rows]
+
+    timed("per-row (original)", lambda: [reference_phishing_features(row) for row in rows])
+    timed("column-oriented", lambda: extract_phishing_feature_columns(subjects, bodies, urls))
+
+
+def bench_text_features(n=300):
+    print("--- Text features (single-pass tokenizer) ---")
+    rng = random.Random(2)
+    bodies = [newsletter_html(rng.randint(20, 80), seed=i) if i % 3 == 0 else random_text(rng, rng.randint(500, 3000))
+              for i in range(n)]
+    subjects = [random_text(rng, rng.randint(0, 8)) for _ in bodies]
+    size = sum(len(body) for body in bodies) / len(bodies) / 1024
+    print(f"  {len(bodies)} emails (avg body {size:.1f} KB)")
+
+    timed("clean_text + pandas columns (previous)", lambda: previous_text_feature_columns(subjects, bodies))
+    timed("single-pass tokenizer", lambda: text_feature_columns(subjects, bodies))
+    timed("  of which HTML stripping", lambda: [html_to_text(s + " " + b) for s, b in zip(subjects, bodies)])
+
+
+def bench_url_features(n=20000):
+    print("--- URL features ---")
+    urls = sample_urls(n)
+    print(f"  {n} URLs ({len(set(urls))} distinct)")
+
+    timed("per-URL (original)", lambda: [reference_url_features(url) for url in urls])
+    uncached = getattr(url_features, "__wrapped__", url_features)
+    timed("single pass, uncached", lambda: [uncached(url) for url in urls])
+    if hasattr(url_features, "cache_clear"):
+        url_features.cache_clear()
+        timed("single pass, cached", lambda: url_feature_matrix(urls), repeat=1)
+        timed("single pass, cached (warm)", lambda: url_feature_matrix(urls))
+
+
+def bench_html_text(n=5000):
+    print("--- HTML-to-text stripper ---")
+    rng = random.Random(1)
+    documents = HTML_EDGE_CASES + [random_text(rng, rng.randint(0, 60)) for _ in range(n)]
+    print(f"  {len(documents)} short documents:")
+    timed("BeautifulSoup get_text", lambda: [BeautifulSoup(markup, "html.parser").get_text() for markup in documents])
+    timed("html_to_text", lambda: [html_to_text(markup) for markup in documents])
+
+    for n_blocks in (10, 1000):
+        markup = newsletter_html(n_blocks)
+        print(f"  {len(markup) / 1024:.0f} KB newsletter:")
+        timed("BeautifulSoup get_text", lambda: BeautifulSoup(markup, "html.parser").get_text())
+        timed("html_to_text", lambda: html_to_text(markup))
+
+
+FOREST_MODELS = [
+    "phishing/models/phishing_rf_model.pkl",
+    "malware/models/malware_rf_model.pkl",
+    "Ransomware/models/ransomware_rf_model.pkl",
+    "networking/models/network_rf_model.pkl",
+]
+
+def bench_compiled_forest(n=2000):
+    print("--- Compiled random forests ---")
+    for relative_path in FOREST_MODELS:
+        path = scoring.MODELS_ROOT / relative_path
+        if not path.exists():
+            print(f"  {relative_path}: not found, skipped")
+            continue
+        forest = final_forest(joblib.load(path))
+        compiled = CompiledForest(forest)
+        print(f"  {relative_path}: {compiled.n_estimators} trees, {compiled.feature.size} nodes")
+
+        # sklearn sums trees in completion order when n_jobs != 1, so time the
+        # sequential run that the compiled forest is tested against.
+        forest.n_jobs = 1
+        X = probe_inputs(forest, n_rows=n, seed=2)
+        row = X[:1]
+        timed("sklearn predict_proba, 1 row x100", lambda: [forest.predict_proba(row) for _ in range(100)])
+        timed("compiled predict_proba, 1 row x100", lambda: [compiled.predict_proba(row) for _ in range(100)])
+        timed(f"sklearn predict_proba, {n} rows", lambda: forest.predict_proba(X))
+        timed(f"compiled predict_proba, {n} rows", lambda: compiled.predict_proba(X))
+
+
+PIPELINE_MODELS = [
+    ("Ransomware/models/ransomware_rf_model.pkl", True),
+    ("networking/models/network_rf_model.pkl", False),
+    ("zero_day_attack/models/zero_day_model.pkl", False),
+]
+
+def bench_preprocessing_plans(n=500):
+    print("--- Precompiled preprocessing plans ---")
+    for relative_path, coerce in PIPELINE_MODELS:
+        path = scoring.MODELS_ROOT / relative_path
+        if not path.exists():
+            print(f"  {relative_path}: not found, skipped")
+            continue
+        pipeline = joblib.load(path)
+        plan, estimator = compile_preprocessing(pipeline, coerce_numeric=coerce)
+        print(f"  {relative_path}: {len(plan.columns)} input columns")
+
+        record = probe_records(plan, n_rows=n, seed=3)[:1]
+        reference = DataFramePlan(None, [])
+        timed("DataFrame + ColumnTransformer, 1 row x100", lambda: [pipeline[:-1].transform(reference.transform(record)) for _ in range(100)])
+        timed("compiled plan, 1 row x100", lambda: [plan.transform(record) for _ in range(100)])
+
+
+def bench_micro_batching(n=512):
+    print("--- Micro-batching ---")
+    loaded = [name for name in ("phishing", "malware", "networking") if scoring.load_model(name)]
+    for name in loaded:
+        if name == "phishing":
+            records = sample_phishing_rows(n, seed=4)
+        elif name == "malware":
+            rng = random.Random(4)
+            records = [{f: rng.randint(0, 5000) for f in scoring.registry.get("malware").artifacts["malware_features"]} for _ in range(n)]
+        else:
+            records = [{**record, "protocol_type": "tcp", "service": "http", "flag": "SF"}
+                       for record in probe_records(scoring.registry.get("networking").plan, n_rows=n, seed=4)]
+        scorer = lambda batch, name=name: scoring.score(name, batch)
+
+        async def unbatched():
+            return await asyncio.gather(*[run_in_threadpool(scorer, [record]) for record in records])
+
+        async def batched():
+            batcher = MicroBatcher(lambda batch: run_in_threadpool(scorer, batch))
+            return await asyncio.gather(*[batcher.submit(record) for record in records])
+
+        print(f"  {name}: {n} concurrent requests")
+        timed("one scorer call per request", lambda: asyncio.run(unbatched()))
+        timed("micro-batched (2 ms / 64)", lambda: asyncio.run(batched()))
+
+
+def bench_prediction_cache(n=2000, distinct=200):
+    print("--- Prediction cache ---")
+    if not scoring.load_model("phishing"):
+        return
+    # Campaign-like traffic: a few hundred distinct messages, each reported many times.
+    pool = sample_phishing_rows(distinct, seed=5)
+    rng = random.Random(5)
+    records = [dict(rng.choice(pool)) for _ in range(n)]
+    version = scoring.model_version("phishing")
+
+    async def score(batch):
+        return scoring.score("phishing", batch)
+
+    def cached():
+        cache = PredictionCache()
+        for record in records:
+            asyncio.run(cache.score("phishing", version, [record], score))
+        return cache
+
+    stats = cached().stats()
+    print(f"  phishing: {n} requests, hit rate {stats['hit_rate']} ({stats['entries']} entries)")
+    timed("uncached, one scorer call per request", lambda: [scoring.score("phishing", [record]) for record in records])
+    timed("cached", cached)
+
+
+if __name__ == "__main__":
+    bench_phishing_features()
+    bench_text_features()
+    bench_url_features()
+    bench_html_text()
+    bench_compiled_forest()
+    bench_preprocessing_plans()
+    bench_micro_batching()
+    bench_prediction_cache()
@@ -1,14 +1,19 @@
-import joblib
-import pandas as pd
-import numpy as np
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from pathlib import Path
-import re
-from urllib.parse import urlparse
-import string
-from bs4 import BeautifulSoup
+import asyncio
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Optional, Dict, Any, List
+
+from cyberrakshak_ml.cache import prediction_cache
+from cyberrakshak_ml.scoring import ScoringError
+from cyberrakshak_ml.url_features import url_cache_stats
+
+from . import batching, workers
+from .streaming import NDJSONScoringResponse, streaming_stats
 
 # --- 1. Setup & Configuration ---
 
@@ -18,88 +23,52 @@ app = FastAPI(
     version="1.0.0",
 )
 
-BASE_DIR = Path(__file__).parent.resolve()
-MODELS_ROOT = BASE_DIR.parent
-
 # --- 2. Load Models and Artifacts ---
+# Models are loaded at startup, either into this process or into per-model
+# worker process pools (see workers.py for the SCORING_WORKERS settings).
+# Loading runs in the background and all models load concurrently; the server
+# answers right away and GET /ready reports when every model is loaded. After
+# that, changed model files are hot-reloaded (see workers.py, MODEL_RELOAD_INTERVAL).
+# Single-record requests are coalesced into small batches in front of the pools
+# (see batching.py for the BATCH_WINDOW_MS / BATCH_MAX_SIZE settings).
 
-models = {}
-try:
-    # Phishing
-    phishing_model_path = MODELS_ROOT / "phishing/models/phishing_rf_model.pkl"
-    phishing_features_path = MODELS_ROOT / "phishing/models/phishing_features.pkl"
-    models["phishing_model"] = joblib.load(phishing_model_path)
-    models["phishing_features"] = joblib.load(phishing_features_path)
-
-    # Malware
-    malware_model_path = MODELS_ROOT / "malware/models/malware_rf_model.pkl"
-    malware_features_path = MODELS_ROOT / "malware/models/malware_features.pkl"
-    models["malware_model"] = joblib.load(malware_model_path)
-    models["malware_features"] = joblib.load(malware_features_path)
-
-    # Ransomware
-    ransomware_model_path = MODELS_ROOT / "Ransomware/models/ransomware_rf_model.pkl"
-    models["ransomware_model"] = joblib.load(ransomware_model_path)
-
-    # Networking
-    networking_model_path = MODELS_ROOT / "networking/models/network_rf_model.pkl"
-    models["networking_model"] = joblib.load(networking_model_path)
-
-    # Zero-Day
-    zero_day_model_path = MODELS_ROOT / "zero_day_attack/models/zero_day_model.pkl"
-    models["zero_day_model"] = joblib.load(zero_day_model_path)
-
-except FileNotFoundError as e:
-    print(f"FATAL: Could not load a model - {e}. Please ensure all models are trained and located in the correct 'models' subdirectories.")
-    # In a production app, you might want to exit or disable endpoints.
-
-# --- 3. Phishing Model Helpers ---
-
-STOPWORDS = {
-    'a','about','above','after','again','against','all','am','an','and','any','are','as','at','be','because','been',
-    'before','being','below','between','both','but','by','could','did','do','does','doing','down','during','each',
-    'few','for','from','further','had','has','have','having','he','her','here','hers','herself','him','himself','his',
-    'how','i','if','in','into','is','it','its','itself','just','me','more','most','my','myself','no','nor','not','now',
-    'of','off','on','once','only','or','other','our','ours','ourselves','out','over','own','same','she','should','so',
-    'some','such','than','that','the','their','theirs','them','themselves','then','there','these','they','this','those',
-    'through','to','too','under','until','up','very','was','we','were','what','when','where','which','while','who','whom',
-    'why','will','with','you','your','yours','yourself','yourselves'
-}
+@app.on_event("startup")
+async def startup_event():
+    workers.create_pools()
+    batching.start_batchers(workers.score)
+    app.state.loader = asyncio.ensure_future(load_and_watch_models())
 
-def clean_text(text):
-    if pd.isna(text): return ""
-    text = BeautifulSoup(str(text), "html.parser").get_text()
-    text = text.lower()
-    text = text.translate(str.maketrans('', '', string.punctuation))
-    tokens = [w for w in text.split() if w not in STOPWORDS]
-    return " ".join(tokens)
 
-def extract_url_features(url):
-    if not url or pd.isna(url): return { "url_length": 0, "num_dots": 0, "num_hyphens": 0, "num_digits": 0, "has_https": 0, "has_at_symbol": 0, "num_slash": 0, "has_ip_address": 0, "contains_login": 0, "contains_verify": 0 }
-    return {
-        "url_length": len(url), "num_dots": url.count('.'), "num_hyphens": url.count('-'),
-        "num_digits": sum(c.isdigit() for c in url), "has_https": int("https" in url.lower()),
-        "has_at_symbol": int("@" in url), "num_slash": url.count('/'),
-        "has_ip_address": int(bool(re.match(r"^\d{1,3}(\.\d{1,3}){3}$", urlparse(url).hostname or ""))),
-        "contains_login": int("login" in url.lower()), "contains_verify": int("verify" in url.lower())
-    }
+async def load_and_watch_models():
+    await workers.start_pools()
+    interval = workers.configured_reload_interval()
+    if interval > 0:
+        await workers.watch_models(interval)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.loader.cancel()
+    workers.stop_pools()
 
-def extract_text_features(subject, body):
-    combined = clean_text(str(subject) + " " + str(body))
-    return {
-        "text_length": len(combined), "num_words": len(combined.split()), "num_exclamations": combined.count('!'),
-        "num_digits": sum(c.isdigit() for c in combined), "contains_login": int("login" in combined),
-        "contains_verify": int("verify" in combined), "contains_password": int("password" in combined)
-    }
 
-def extract_phishing_features(row):
-    feats = {}
-    if 'url' in row and pd.notna(row['url']):
-        feats.update(extract_url_features(row['url']))
-    feats.update(extract_text_features(row.get('subject', ''), row.get('body', '')))
-    return pd.Series(feats)
+@app.exception_handler(ScoringError)
+async def scoring_error_handler(request: Request, exc: ScoringError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
-# --- 4. Pydantic Input Models ---
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # A batch over MAX_BATCH_SIZE fails validation as a whole (see the *Batch types); that is a 413.
+    for error in exc.errors():
+        if error["type"] == "too_long" and tuple(error["loc"]) == ("body",):
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Batch too large: {len(error['input'])} records (max {MAX_BATCH_SIZE})."}
+            )
+    return await request_validation_exception_handler(request, exc)
+
+# --- 3. Pydantic Input Models ---
 
 class PhishingInput(BaseModel):
     subject: Optional[str] = ""
@@ -263,6 +232,123 @@ class ZeroDayInput(BaseModel):
     payload_size: int = Field(0, alias="payload size")
     btc: float = 0.0
 
+class ScanInput(BaseModel):
+    """One event seen from several sides; every section is optional."""
+    email: Optional[PhishingInput] = None    # phishing
+    process: Optional[MalwareInput] = None   # malware
+    file: Optional[RansomwareInput] = None   # ransomware
+    # One flat record of connection/event fields (NetworkingInput and/or ZeroDayInput
+    # names), shared by the networking and zero-day models.
+    connection: Optional[Dict[str, Any]] = None
+    # Only run these models (model names as in /ready); default: every applicable one.
+    models: Optional[List[str]] = None
+
+
+# Batch request bodies. The size cap is checked while the body is validated, so an
+# oversized batch is rejected before thousands of input records are built.
+MAX_BATCH_SIZE = 10000
+
+PhishingBatch = Annotated[List[PhishingInput], Field(max_length=MAX_BATCH_SIZE)]
+MalwareBatch = Annotated[List[MalwareInput], Field(max_length=MAX_BATCH_SIZE)]
+RansomwareBatch = Annotated[List[RansomwareInput], Field(max_length=MAX_BATCH_SIZE)]
+NetworkingBatch = Annotated[List[NetworkingInput], Field(max_length=MAX_BATCH_SIZE)]
+ZeroDayBatch = Annotated[List[ZeroDayInput], Field(max_length=MAX_BATCH_SIZE)]
+
+
+# --- 4. Scoring Helpers ---
+# Scoring itself lives in scoring.py. Every record is first looked up in the
+# prediction cache; single-record misses go through the model's micro-batcher,
+# batch misses already make one call and go straight to the model's pool.
+
+async def score_single(name, record):
+    async def score(records):
+        return [await batching.score_one(name, records[0])]
+    return (await prediction_cache.score(name, workers.pools[name].version, [record], score))[0]
+
+async def score_batch(name, records):
+    return await prediction_cache.score(name, workers.pools[name].version, records, lambda misses: workers.score(name, misses))
+
+def score_stream(name, input_model, by_alias=False):
+    """NDJSON in, NDJSON out; chunks go through score_batch (see streaming.py)."""
+    def parse(line):
+        return input_model.model_validate_json(line).dict(by_alias=by_alias)
+    return NDJSONScoringResponse(name, parse, lambda records: score_batch(name, records))
+
+# --- Composite scan ---
+# /scan scores one event with every applicable model concurrently, from one parsed
+# request. The connection record is validated once and handed to both network
+# models: "protocol" and "protocol_type" name the same field, and a model runs if
+# the record has any of its fields. URL features are computed once per URL and
+# cached (url_features.py), whichever request scores that URL.
+
+# A prediction that counts as a threat in the combined verdict.
+THREAT_PREDICTIONS = {"phishing", "malware", "malicious", "anomaly", "High"}
+
+NETWORK_FIELDS = {
+    "networking": {field.alias or name for name, field in NetworkingInput.model_fields.items()} | {"protocol"},
+    "zero_day": {field.alias or name for name, field in ZeroDayInput.model_fields.items()} | {"protocol_type"},
+}
+
+def scan_records(scan):
+    """Model name -> validated record for every model the scan applies to."""
+    records = {}
+    if scan.email is not None:
+        records["phishing"] = scan.email.dict()
+    if scan.process is not None:
+        records["malware"] = scan.process.dict()
+    if scan.file is not None:
+        records["ransomware"] = scan.file.dict()
+    if scan.connection:
+        connection = dict(scan.connection)
+        protocol = connection.get("protocol_type", connection.get("protocol"))
+        if protocol is not None:
+            connection.setdefault("protocol_type", protocol)
+            connection.setdefault("protocol", protocol)
+        try:
+            if connection.keys() & NETWORK_FIELDS["networking"]:
+                records["networking"] = NetworkingInput(**connection).dict()
+            if connection.keys() & NETWORK_FIELDS["zero_day"]:
+                records["zero_day"] = ZeroDayInput(**connection).dict(by_alias=True)
+        except ValidationError as e:
+            raise RequestValidationError([dict(error, loc=("body", "connection") + tuple(error["loc"])) for error in e.errors()])
+    if scan.models is not None:
+        unknown = set(scan.models) - set(workers.pools)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown model(s): {', '.join(sorted(unknown))}.")
+        records = {name: record for name, record in records.items() if name in scan.models}
+    return records
+
+async def scan_event(scan):
+    records = scan_records(scan)
+    start = time.perf_counter()
+
+    async def timed(name, record):
+        model_start = time.perf_counter()
+        try:
+            # A copy, so the cached prediction is never modified.
+            result = dict(await score_single(name, record))
+        except ScoringError as e:
+            result = {"error": e.detail, "status_code": e.status_code}
+        result["latency_ms"] = round((time.perf_counter() - model_start) * 1000, 3)
+        return result
+
+    results = dict(zip(records, await asyncio.gather(*[timed(name, record) for name, record in records.items()])))
+    errors = sorted(name for name, result in results.items() if "error" in result)
+    flagged = sorted(name for name, result in results.items() if result.get("prediction") in THREAT_PREDICTIONS)
+    if flagged:
+        verdict = "threat"
+    elif results and not errors:
+        verdict = "clean"
+    else:
+        verdict = "inconclusive"  # nothing to score, or a model that could not answer
+    return {
+        "verdict": verdict,
+        "flagged_by": flagged,
+        "models": results,
+        "errors": errors,
+        "total_latency_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
 # --- 5. API Endpoints ---
 
 @app.get("/", tags=["Health Check"])
@@ -271,140 +357,141 @@ def read_root():
     return {"message": "Cyber Threat Intelligence API is running."}
 
 
+@app.get("/ready", tags=["Health Check"])
+def readiness():
+    """Per-model load state and load time; 503 until every model is loaded."""
+    models = workers.pool_readiness()
+    ready = bool(models) and all(status["state"] == "ready" for status in models.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "models": models})
+
+
+@app.post("/models/reload", tags=["Health Check"])
+async def reload_models(model: Optional[str] = None):
+    """Reloads one model (or all) from its files and swaps it in without dropping requests."""
+    if model is not None and model not in workers.pools:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'.")
+    return await workers.reload_pools([model] if model else None)
+
+
+@app.get("/metrics/workers", tags=["Health Check"])
+def worker_metrics():
+    """Per-model pool size, queue depth and latency counters."""
+    return workers.pool_stats()
+
+
+@app.get("/metrics/batching", tags=["Health Check"])
+def batching_metrics():
+    """Per-model micro-batching window, batch counts and average batch size."""
+    return batching.batcher_stats()
+
+
+@app.get("/metrics/cache", tags=["Health Check"])
+def cache_metrics():
+    """Prediction cache size and hit/miss/eviction counters, and the URL feature cache."""
+    return dict(prediction_cache.stats(), url_features=url_cache_stats())
+
+
+@app.get("/metrics/streaming", tags=["Health Check"])
+def stream_metrics():
+    """Per-model streaming chunk settings, open streams and record counters."""
+    return streaming_stats()
+
+
 @app.post("/predict/phishing", tags=["Predictions"])
-def predict_phishing(data: PhishingInput):
+async def predict_phishing(data: PhishingInput):
     """Predicts if an email/URL is phishing."""
-    if "phishing_model" not in models:
-        raise HTTPException(status_code=503, detail="Phishing model not loaded.")
+    return await score_single("phishing", data.dict())
 
-    try:
-        feats = extract_phishing_features(data.dict())
-        feat_array = np.array([feats.get(f, 0) for f in models["phishing_features"]]).reshape(1, -1)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Feature extraction failed: {e}")
 
-    model = models["phishing_model"]
-    pred_prob = model.predict_proba(feat_array)[0][1]
-    prediction = "phishing" if pred_prob >= 0.5 else "legitimate"
+@app.post("/predict/phishing/batch", tags=["Predictions"])
+async def predict_phishing_batch(data: PhishingBatch):
+    """Scores a list of emails/URLs with one model call. Results keep the input order."""
+    return await score_batch("phishing", [item.dict() for item in data])
 
-    return {
-        "prediction": prediction,
-        "confidence": round(float(pred_prob), 4),
-        "features": feats.to_dict()
-    }
+
+@app.post("/predict/phishing/stream", tags=["Predictions"])
+async def predict_phishing_stream():
+    """Scores an NDJSON stream of emails/URLs (one JSON object per line); results stream back as NDJSON, in order."""
+    return score_stream("phishing", PhishingInput)
 
 
 @app.post("/predict/malware", tags=["Predictions"])
-def predict_malware(data: MalwareInput):
+async def predict_malware(data: MalwareInput):
     """Predicts if a process is malware based on system features."""
-    if "malware_model" not in models:
-        raise HTTPException(status_code=503, detail="Malware model not loaded.")
-
-    model = models["malware_model"]
-    features = models["malware_features"]
-    
-    input_dict = data.dict()
-    feat_array = np.array([input_dict.get(f, 0) for f in features]).reshape(1, -1)
-    
-    pred_prob = model.predict_proba(feat_array)[0][1]
-    prediction = "malware" if pred_prob >= 0.5 else "benign"
+    return await score_single("malware", data.dict())
 
-    return {
-        "prediction": prediction,
-        "confidence": round(float(pred_prob), 4)
-    }
+
+@app.post("/predict/malware/batch", tags=["Predictions"])
+async def predict_malware_batch(data: MalwareBatch):
+    """Scores a list of processes with one model call. Results keep the input order."""
+    return await score_batch("malware", [item.dict() for item in data])
+
+
+@app.post("/predict/malware/stream", tags=["Predictions"])
+async def predict_malware_stream():
+    """Scores an NDJSON stream of processes (one JSON object per line); results stream back as NDJSON, in order."""
+    return score_stream("malware", MalwareInput)
 
 
 @app.post("/predict/ransomware", tags=["Predictions"])
-def predict_ransomware(data: RansomwareInput):
+async def predict_ransomware(data: RansomwareInput):
     """Predicts if a file is ransomware based on PE features."""
-    if "ransomware_model" not in models:
-        raise HTTPException(status_code=503, detail="Ransomware model not loaded.")
-    
-    model = models["ransomware_model"]
-    input_df = pd.DataFrame([data.dict()])
-
-    try:
-        # --- FINAL, ROBUST FIX for Training-Serving Skew ---
-        # This error happens when the model's preprocessor (e.g., StandardScaler)
-        # receives data of a different type than it was trained on (e.g., a string for a numeric column).
-        # The fix is to inspect the loaded model to find which columns it expects to be numeric,
-        # and then force those columns in the input data to be numeric.
-
-        preprocessor = model.named_steps.get('preprocessor')
-        if preprocessor and hasattr(preprocessor, 'transformers_'):
-            # 1. Get the list of numeric column names from the fitted preprocessor.
-            numeric_cols_from_model = [
-                col for name, _, cols in preprocessor.transformers_ if name == 'num' for col in cols
-            ]
-
-            # 2. For each column the model expects to be numeric, ensure it is numeric.
-            for col in numeric_cols_from_model:
-                if col in input_df.columns:
-                    input_df[col] = pd.to_numeric(input_df[col], errors='coerce').fillna(0).astype(np.float64)
-
-        pred_prob_all = model.predict_proba(input_df)
-
-        # Assumes class 1 is malicious
-        pred_prob = pred_prob_all[0][1]
-        prediction = "malicious" if pred_prob >= 0.5 else "benign"
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Prediction failed: {e}")
+    return await score_single("ransomware", data.dict())
 
-    return {
-        "prediction": prediction,
-        "confidence": round(float(pred_prob), 4)
-    }
+
+@app.post("/predict/ransomware/batch", tags=["Predictions"])
+async def predict_ransomware_batch(data: RansomwareBatch):
+    """Scores a list of PE files with one model call. Results keep the input order."""
+    return await score_batch("ransomware", [item.dict() for item in data])
+
+
+@app.post("/predict/ransomware/stream", tags=["Predictions"])
+async def predict_ransomware_stream():
+    """Scores an NDJSON stream of PE files (one JSON object per line); results stream back as NDJSON, in order."""
+    return score_stream("ransomware", RansomwareInput)
 
 
 @app.post("/predict/networking", tags=["Predictions"])
-def predict_networking(data: NetworkingInput):
+async def predict_networking(data: NetworkingInput):
     """Predicts if network traffic is an anomaly."""
-    if "networking_model" not in models:
-        raise HTTPException(status_code=503, detail="Networking model not loaded.")
-    
-    model = models["networking_model"]
-    input_df = pd.DataFrame([data.dict()])
-
-    try:
-        # Assumes class 1 is anomaly
-        pred_prob = model.predict_proba(input_df)[0][1]
-        prediction = "anomaly" if pred_prob >= 0.5 else "normal"
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Prediction failed: {e}")
+    return await score_single("networking", data.dict())
 
-    return {
-        "prediction": prediction,
-        "confidence": round(float(pred_prob), 4)
-    }
+
+@app.post("/predict/networking/batch", tags=["Predictions"])
+async def predict_networking_batch(data: NetworkingBatch):
+    """Scores a list of network connections with one model call. Results keep the input order."""
+    return await score_batch("networking", [item.dict() for item in data])
+
+
+@app.post("/predict/networking/stream", tags=["Predictions"])
+async def predict_networking_stream():
+    """Scores an NDJSON stream of network connections (one JSON object per line); results stream back as NDJSON, in order."""
+    return score_stream("networking", NetworkingInput)
 
 
 @app.post("/predict/zero-day", tags=["Predictions"])
-def predict_zero_day(data: ZeroDayInput):
+async def predict_zero_day(data: ZeroDayInput):
     """Predicts the threat level of a network event."""
-    if "zero_day_model" not in models:
-        raise HTTPException(status_code=503, detail="Zero-Day model not loaded.")
-
-    model = models["zero_day_model"]
-    
     # Pydantic's `alias` allows us to handle feature names with spaces
-    input_df = pd.DataFrame([data.dict(by_alias=True)])
+    return await score_single("zero_day", data.dict(by_alias=True))
 
-    try:
-        prediction = model.predict(input_df)[0]
-        pred_probs = model.predict_proba(input_df)[0]
-        
-        # Create a dictionary of class probabilities
-        classifier = model.named_steps['classifier']
-        class_probabilities = {classifier.classes_[i]: round(float(prob), 4) for i, prob in enumerate(pred_probs)}
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Prediction failed: {e}")
+@app.post("/predict/zero-day/batch", tags=["Predictions"])
+async def predict_zero_day_batch(data: ZeroDayBatch):
+    """Scores a list of network events with one model call. Results keep the input order."""
+    return await score_batch("zero_day", [item.dict(by_alias=True) for item in data])
 
-    return {
-        "prediction": prediction,
-        "class_probabilities": class_probabilities
-    }
+
+@app.post("/predict/zero-day/stream", tags=["Predictions"])
+async def predict_zero_day_stream():
+    """Scores an NDJSON stream of network events (one JSON object per line); results stream back as NDJSON, in order."""
+    return score_stream("zero_day", ZeroDayInput, by_alias=True)
+
+
+@app.post("/scan", tags=["Predictions"])
+async def scan(data: ScanInput):
+    """Scores one composite event (email, process, PE file, connection) with every applicable model at once."""
+    return await scan_event(data)
 
 
 # To run the app:
@@ -413,8 +500,8 @@ def predict_zero_day(data: ZeroDayInput):
 
 if __name__ == "__main__":
     import uvicorn
-    # This allows running the app directly for debugging, e.g. `python api/main.py`
-    # For production, use the uvicorn command.
+    # This allows running the app directly for debugging, e.g. `python -m api.main`
+    # from the 'models' directory. For production, use the uvicorn command.
     print("--- Starting API Server ---")
     print("Access documentation at http://127.0.0.1:8000/docs")
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("api.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+from cyberrakshak_ml import scoring
+
+# --- Streaming NDJSON scoring ---
+# POST /predict/<model>/stream takes newline-delimited JSON records, one per line,
+# and answers with one NDJSON result per non-blank input line, in input order.
+# Results are written while the request body is still being read, so a client
+# can send millions of records in one request.
+#
+# Lines are parsed and validated as they arrive and scored in chunks of
+# STREAM_BATCH_SIZE records. At most STREAM_MAX_IN_FLIGHT chunks are being scored
+# or waiting to be written at a time; beyond that the body is not read any
+# further, so TCP flow control slows the client down. Memory per stream is
+# bounded by those two settings and STREAM_MAX_LINE_BYTES, not by the body size.
+# The same holds on the way out: when the client does not read its results, no
+# more of its input is read either, so clients must read the response while
+# they upload (curl -T does; see MLDoc.md).
+#
+#   STREAM_BATCH_SIZE=<records>        default 500
+#   STREAM_MAX_IN_FLIGHT=<chunks>      default 4
+#   STREAM_MAX_LINE_BYTES=<bytes>      default 1048576
+#
+# A line that is not valid JSON or fails validation gets {"line": n, "error": ...}
+# in its place; the rest of the stream is scored as usual. So does a record whose
+# chunk could not be scored (e.g. 503 while the model is loading).
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_LINE_BYTES = 1024 * 1024
+
+ParseFn = Callable[[bytes], Dict[str, Any]]
+ScoreFn = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+# A chunk entry: (line number, validated record or None, error message or None).
+Entry = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class StreamError(Exception):
+    """A malformed body; reported as the last line of the response, after which the stream ends."""
+
+
+def _setting(variable: str, default: int) -> int:
+    return max(1, int(os.getenv(variable, default)))
+
+
+def _dumps(result: Dict[str, Any]) -> bytes:
+    return json.dumps(result, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+def _error_message(e: ValueError) -> str:
+    if hasattr(e, "errors"):  # pydantic: one "field: message" per problem
+        return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'record'}: {error['msg']}" for error in e.errors())
+    return str(e)
+
+
+class StreamStats:
+    def __init__(self):
+        self.active = 0
+        self.streams = 0
+        self.records = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "batch_size": _setting("STREAM_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            "max_in_flight": _setting("STREAM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT),
+            "active_streams": self.active,
+            "streams": self.streams,
+            "records": self.records,
+            "rejected_lines": self.rejected,
+            "failed_records": self.failed,
+        }
+
+
+stream_stats: Dict[str, StreamStats] = {name: StreamStats() for name in scoring.MODEL_NAMES}
+
+
+class NDJSONScoringResponse(Response):
+    """
+    Response for one scoring stream. It reads the request body itself, rather than
+    through Starlette's StreamingResponse, which would also be listening on
+    `receive` for a disconnect while the body is still arriving.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, name: str, parse: ParseFn, score: ScoreFn):
+        super().__init__(media_type=self.media_type)
+        self.name = name
+        self.parse = parse
+        self.score = score
+        self.batch_size = _setting("STREAM_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        self.max_in_flight = _setting("STREAM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)
+        self.max_line_bytes = _setting("STREAM_MAX_LINE_BYTES", DEFAULT_MAX_LINE_BYTES)
+        self.stats = stream_stats[name]
+
+    async def __call__(self, scope, receive, send):
+        # Scored chunks in input order; the bound is what stops the reader.
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+        reader = asyncio.ensure_future(self._read(receive, chunks))
+        self.stats.active += 1
+        self.stats.streams += 1
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": [(key, value) for key, value in self.raw_headers if key != b"content-length"],
+            })
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, bytes):  # a StreamError, already formatted
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    break
+                await send({"type": "http.response.body", "body": await chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            if self.background is not None:
+                await self.background()
+        finally:
+            self.stats.active -= 1
+            reader.cancel()
+            # The client went away or the stream ended early: nobody will read these chunks.
+            while not chunks.empty():
+                chunk = chunks.get_nowait()
+                if isinstance(chunk, asyncio.Future):
+                    chunk.cancel()
+
+    async def _read(self, receive, chunks: asyncio.Queue):
+        entries: List[Entry] = []
+        buffer = b""
+        line_number = 0
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+                more_body = message.get("more_body", False)
+                buffer += message.get("body", b"")
+                lines = buffer.split(b"\n")
+                buffer = b"" if not more_body else lines.pop()
+                if len(buffer) > self.max_line_bytes:
+                    raise StreamError(f"line {line_number + len(lines) + 1} is longer than {self.max_line_bytes} bytes")
+                for line in lines:
+                    line_number += 1
+                    if not line.strip():
+                        continue
+                    entries.append(self._parse_line(line_number, line))
+                    if len(entries) >= self.batch_size:
+                        # Waits while max_in_flight chunks are pending: this is the backpressure.
+                        await chunks.put(asyncio.ensure_future(self._score_chunk(entries)))
+                        entries = []
+            if entries:
+                await chunks.put(asyncio.ensure_future(self._score_chunk(entries)))
+            await chunks.put(None)
+        except StreamError as e:
+            if entries:
+                await chunks.put(asyncio.ensure_future(self._score_chunk(entries)))
+            await chunks.put(_dumps({"error": f"Malformed stream: {e}"}))
+        except Exception as e:
+            await chunks.put(_dumps({"error": f"Could not read the stream: {e}"}))
+
+    def _parse_line(self, line_number: int, line: bytes) -> Entry:
+        try:
+            return line_number, self.parse(line), None
+        except ValueError as e:  # invalid JSON and pydantic's ValidationError
+            self.stats.rejected += 1
+            return line_number, None, _error_message(e)
+
+    async def _score_chunk(self, entries: List[Entry]) -> bytes:
+        records = [record for _, record, error in entries if error is None]
+        results = await self._score_records(records) if records else []
+        self.stats.records += len(records)
+        results = iter(results)
+        out = []
+        for line_number, _, error in entries:
+            result = next(results) if error is None else {"error": error}
+            if "error" in result:
+                result = dict(result, line=line_number)
+            out.append(_dumps(result))
+        return b"".join(out)
+
+    async def _score_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            return await self.score(records)
+        except Exception as e:
+            status_code = e.status_code if isinstance(e, scoring.ScoringError) else 500
+            if len(records) > 1 and status_code != 503:
+                # As in the micro-batcher: one bad record fails the whole call, so
+                # score the chunk one record at a time and only fail that record.
+                return [(await self._score_records([record]))[0] for record in records]
+            self.stats.failed += len(records)
+            detail = e.detail if isinstance(e, scoring.ScoringError) else str(e)
+            return [{"error": detail, "status_code": status_code}] * len(records)
+
+
+def streaming_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: stats.as_dict() for name, stats in stream_stats.items()}
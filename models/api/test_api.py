@@ -1,5 +1,6 @@
 import requests
 import json
+import time
 
 BASE_URL = "http://127.0.0.1:8000"
 
@@ -272,6 +273,74 @@ def test_zero_day():
         response = requests.post(f"{BASE_URL}/predict/zero-day", json=case["data"])
         print_response(case["name"], response)
 
+def test_batch():
+    test_cases = [
+        {
+            "name": "Phishing Batch (Mixed)",
+            "path": "predict/phishing/batch",
+            "data": [
+                {
+                    "subject": "Urgent: Verify Your Account",
+                    "body": "Please click this link to verify your login details http://secure-login-account-verification.com",
+                    "url": "http://secure-login-account-verification.com"
+                },
+                {
+                    "url": "https://www.bbc.com/news"
+                }
+            ]
+        },
+        {
+            "name": "Networking Batch (Mixed)",
+            "path": "predict/networking/batch",
+            "data": [
+                {"duration": 0, "protocol_type": "tcp", "service": "http", "flag": "SF", "src_bytes": 181, "dst_bytes": 5450, "logged_in": 1},
+                {"duration": 0, "protocol_type": "tcp", "service": "private", "flag": "S0", "count": 123, "serror_rate": 1.0}
+            ]
+        }
+    ]
+    for case in test_cases:
+        response = requests.post(f"{BASE_URL}/{case['path']}", json=case["data"])
+        print_response(case["name"], response)
+
+def test_scan():
+    event = {
+        "email": {"subject": "Urgent: Verify Your Account", "body": "Log in here", "url": "http://192.168.0.1/login"},
+        "process": {"prio": 120, "total_vm": 5000},
+        "connection": {"protocol": "tcp", "service": "http", "flag": "S0", "count": 300, "serror_rate": 1.0}
+    }
+    response = requests.post(f"{BASE_URL}/scan", json=event)
+    print_response("Composite Scan (Email + Process + Connection)", response)
+
+def test_stream():
+    records = [
+        {"subject": "Urgent: Verify Your Account", "url": "http://secure-login-account-verification.com"},
+        {"subject": 42},  # invalid: reported on its own line, the rest is still scored
+        {"url": "https://www.bbc.com/news"}
+    ]
+    # A generator body is sent chunked, as a real bulk upload would be.
+    body = (json.dumps(record).encode() + b"\n" for record in records)
+    response = requests.post(f"{BASE_URL}/predict/phishing/stream", data=body,
+                             headers={"Content-Type": "application/x-ndjson"}, stream=True)
+    print("--- Testing: Phishing Stream (NDJSON) ---")
+    print(f"Status: {'✅ SUCCESS' if response.status_code == 200 else f'❌ FAILED (HTTP {response.status_code})'}")
+    for line in response.iter_lines():
+        print(line.decode())
+    print("-" * 40 + "\n")
+
+def wait_until_ready(timeout=120):
+    """Models load in the background after the server starts; wait for GET /ready."""
+    deadline = time.time() + timeout
+    while True:
+        response = requests.get(f"{BASE_URL}/ready")
+        if response.status_code == 200 or time.time() > deadline:
+            print_response("Readiness", response)
+            return response.status_code == 200
+        time.sleep(0.5)
+
+def test_worker_metrics():
+    response = requests.get(f"{BASE_URL}/metrics/workers")
+    print_response("Worker Pool Metrics", response)
+
 if __name__ == "__main__":
     # Check if the server is running
     try:
@@ -279,12 +348,17 @@ if __name__ == "__main__":
         if health_check.status_code != 200:
             print(f"API server is not responding at {BASE_URL}. Please start it first.")
         else:
-            print("API Server is running. Starting tests...\n")
+            print("API Server is running. Waiting for the models to load...\n")
+            wait_until_ready()
             test_phishing()
             test_malware()
             test_ransomware()
             test_networking()
             test_zero_day()
+            test_batch()
+            test_stream()
+            test_scan()
+            test_worker_metrics()
     except requests.exceptions.ConnectionError:
         print(f"Could not connect to the API server at {BASE_URL}.")
         print("Please make sure the server is running with the command:")
@@ -0,0 +1,274 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from cyberrakshak_ml import scoring
+
+# --- Process-pool model execution ---
+# sklearn inference holds the GIL, so a single API process scores on one core no
+# matter how many requests are in flight. Each model can instead get its own pool
+# of worker processes; every worker loads only that model (see
+# scoring.load_model) and scores whole record lists sent from the event loop.
+#
+# Pool sizes come from the environment:
+#   SCORING_WORKERS=<n|auto>              default for every model (0 = in-process)
+#   SCORING_WORKERS_<MODEL>=<n|auto>      per model, e.g. SCORING_WORKERS_PHISHING=4
+# "auto" means one worker per CPU. With 0 workers a model is loaded in the API
+# process and scored in Starlette's threadpool, which is the original behaviour.
+#
+# Hot reload: when a model's files change (or on POST /models/reload), the new
+# version is loaded next to the old one and swapped in once it is ready. In-process
+# models swap in the registry (see registry.py). Worker pools start a new executor,
+# wait until all of its workers have loaded the model, and then replace the old
+# one; the old workers finish the requests they were given and exit.
+#   MODEL_RELOAD_INTERVAL=<seconds>       how often to check the files, default 10 (0 = never)
+
+DEFAULT_RELOAD_INTERVAL = 10.0
+
+
+def configured_pool_size(name: str) -> int:
+    value = os.getenv(f"SCORING_WORKERS_{name.upper()}", os.getenv("SCORING_WORKERS", "0")).strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+
+def configured_reload_interval() -> float:
+    return float(os.getenv("MODEL_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+
+
+# --- Worker-process entry points (must be importable top-level functions) ---
+
+def _load_worker_model(name: str):
+    scoring.load_model(name)
+
+
+def _worker_status(name: str) -> Dict[str, Any]:
+    return scoring.registry.status(name)
+
+
+def _score_in_worker(name: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return scoring.score(name, records)
+
+
+class ScoringPool:
+    """Runs one model's scorer in worker processes (or in-process) and keeps queue metrics."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.executor: Optional[ProcessPoolExecutor] = None
+        # Worker pools only; in-process pools read their status from the registry.
+        self._status: Dict[str, Any] = {"state": "pending", "version": None, "load_seconds": None, "error": None}
+        self._reloading = asyncio.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        # Per model version: completed, failed, total_seconds.
+        self.by_version: Dict[Optional[str], Dict[str, Any]] = {}
+
+    @property
+    def status(self) -> Dict[str, Any]:
+        return dict(self._status) if self.size else scoring.registry.status(self.name)
+
+    @property
+    def version(self) -> Optional[str]:
+        """The model version new requests are scored with."""
+        return self.status["version"]
+
+    @property
+    def reloading(self) -> bool:
+        """True while a reload of this pool is in progress."""
+        return self._reloading.locked()
+
+    async def start(self):
+        if self.size == 0:
+            # In a thread, so the pools load side by side and the event loop stays free.
+            await run_in_threadpool(scoring.load_model, self.name)
+            return
+        self._status["state"] = "loading"
+        self.executor, self._status = await self._start_executor()
+
+    async def reload(self) -> Dict[str, Any]:
+        """Loads the model's current files and swaps them in once they are ready."""
+        async with self._reloading:
+            if self.size == 0:
+                await run_in_threadpool(scoring.load_model, self.name)
+                return self.status
+            executor, status = await self._start_executor()
+            if status["state"] != "ready":
+                executor.shutdown(wait=False, cancel_futures=True)
+                # Keep serving the current version and report why the new one was rejected.
+                self._status["error"] = status["error"]
+                return self.status
+            old, self.executor, self._status = self.executor, executor, status
+            if old is not None:
+                # Queued and running requests still complete on the old workers.
+                old.shutdown(wait=False)
+            return self.status
+
+    async def _start_executor(self) -> Tuple[ProcessPoolExecutor, Dict[str, Any]]:
+        start = time.perf_counter()
+        executor = self._new_executor()
+        # One task per worker at once makes the executor start every process now,
+        # rather than on demand, so each worker loads its model up front.
+        loop = asyncio.get_running_loop()
+        statuses = await asyncio.gather(
+            *[loop.run_in_executor(executor, _worker_status, self.name) for _ in range(self.size)]
+        )
+        failed = [status for status in statuses if status["state"] != "ready"]
+        versions = {status["version"] for status in statuses}
+        if failed:
+            print(f"WARNING: {self.name} model failed to load in {len(failed)} worker(s).")
+        elif len(versions) > 1:
+            # A file changed while the workers were loading; the watcher will reload again.
+            failed = [{"error": f"workers loaded different versions {sorted(versions)}"}]
+        return executor, {
+            "state": "failed" if failed else "ready",
+            "version": None if failed else versions.pop(),
+            # Wall time until every worker process had its model, including process start-up.
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "error": failed[0]["error"] if failed else None,
+        }
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # "spawn" keeps the workers independent of the server's threads and event loop.
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_model,
+            initargs=(self.name,),
+        )
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def score(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.executor is None and self.status["state"] in ("pending", "loading"):
+            raise scoring.ScoringError(503, f"{self.name} model is still loading; please retry.")
+        self.in_flight += 1
+        start = time.perf_counter()
+        executor = self.executor
+        version = self.version
+        failed = False
+        try:
+            if executor is not None:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(executor, _score_in_worker, self.name, records)
+            else:
+                results = await run_in_threadpool(scoring.score, self.name, records)
+            if results:
+                # The version that actually scored them, which may predate a swap.
+                version = results[0]["model_version"]
+            return results
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); replace the pool once so later requests recover.
+            failed = True
+            if self.executor is executor:
+                self.stop()
+                self.executor = self._new_executor()
+            raise scoring.ScoringError(503, f"{self.name} worker process crashed; please retry.")
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight -= 1
+            self.completed += 1
+            self.failed += failed
+            self.total_seconds += elapsed
+            counters = self.by_version.setdefault(version, {"completed": 0, "failed": 0, "total_seconds": 0.0})
+            counters["completed"] += 1
+            counters["failed"] += failed
+            counters["total_seconds"] += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        capacity = self.size or None
+        return {
+            "version": self.version,
+            "mode": "process" if self.executor is not None else "in-process",
+            "workers": self.size,
+            "in_flight": self.in_flight,
+            # Requests waiting for a free worker (in-process scoring has no fixed capacity).
+            "queue_depth": max(0, self.in_flight - capacity) if capacity else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_latency_ms": round(self.total_seconds / self.completed * 1000, 3) if self.completed else None,
+            "versions": {
+                version: {
+                    "completed": counters["completed"],
+                    "failed": counters["failed"],
+                    "avg_latency_ms": round(counters["total_seconds"] / counters["completed"] * 1000, 3),
+                }
+                for version, counters in self.by_version.items()
+            },
+        }
+
+
+pools: Dict[str, ScoringPool] = {}
+
+
+def create_pools():
+    for name in scoring.MODEL_NAMES:
+        pools[name] = ScoringPool(name, configured_pool_size(name))
+
+
+async def start_pools():
+    """Loads every pool's model concurrently (call create_pools first)."""
+    await asyncio.gather(*[pool.start() for pool in pools.values()])
+
+
+def stop_pools():
+    for pool in pools.values():
+        pool.stop()
+
+
+async def reload_pools(names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    names = list(names or pools)
+    statuses = await asyncio.gather(*[pools[name].reload() for name in names])
+    return dict(zip(names, statuses))
+
+
+async def watch_models(interval: float):
+    """Reloads a model when its files change. A change must hold for two checks, so half-copied files are skipped."""
+    seen: Dict[str, str] = {}
+    rejected: Dict[str, str] = {}
+    while True:
+        await asyncio.sleep(interval)
+        for name, pool in pools.items():
+            if pool.reloading or pool.status["state"] in ("pending", "loading"):
+                continue
+            current = scoring.model_version(name)
+            if current == pool.version or current == rejected.get(name):
+                seen.pop(name, None)
+                continue
+            if seen.get(name) != current:
+                seen[name] = current
+                continue
+            print(f"INFO: {name} model files changed; reloading.")
+            status = await pool.reload()
+            if status["error"]:
+                # Not retried until the files change again.
+                rejected[name] = current
+            seen.pop(name, None)
+
+
+async def score(name: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return await pools[name].score(records)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+def pool_readiness() -> Dict[str, Dict[str, Any]]:
+    return {name: dict(pool.status, mode="process" if pool.size else "in-process") for name, pool in pools.items()}
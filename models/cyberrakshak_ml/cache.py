@@ -0,0 +1,122 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# --- Prediction cache ---
+# Campaigns report the same URLs and email templates over and over. Results are
+# cached per validated input record, keyed by a canonical hash of the record plus
+# the model name and version, so a new model never serves an old model's answers.
+# Memory is bounded by the entry count (keys are digests, not the inputs), and
+# entries expire after a TTL. Shared by the models API and the backend's
+# MLModelManager; safe to use from threads.
+#
+# API settings come from the environment:
+#   PREDICTION_CACHE_SIZE=<entries>     default 10000, 0 disables the cache
+#   PREDICTION_CACHE_TTL=<seconds>      default 600
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self.enabled = self.max_entries > 0 and self.ttl > 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(model: str, version: Optional[str], record: Dict[str, Any]) -> str:
+        """Canonical digest of a validated record: key order and whitespace do not matter."""
+        canonical = json.dumps([model, version, record], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers get their own copy, so mutating a result cannot corrupt the cache.
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, result: Any):
+        if not self.enabled:
+            return
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(result))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    async def score(
+        self,
+        model: str,
+        version: Optional[str],
+        records: List[Dict[str, Any]],
+        score: Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]],
+    ) -> List[Any]:
+        """
+        Returns results for `records` in order, calling `score` once with only the
+        records that missed (duplicates within the call are scored once).
+        """
+        if not self.enabled:
+            return await score(records)
+
+        keys = [self.key(model, version, record) for record in records]
+        results = [self.get(key) for key in keys]
+        missing: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                missing.setdefault(key, []).append(i)
+        if not missing:
+            return results
+
+        fresh = await score([records[indexes[0]] for indexes in missing.values()])
+        for (key, indexes), result in zip(missing.items(), fresh):
+            self.put(key, result)
+            results[indexes[0]] = result
+            for i in indexes[1:]:
+                results[i] = copy.deepcopy(result)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", 600)),
+)
@@ -0,0 +1,183 @@
+import copy
+import warnings
+from typing import Any, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+# --- Compiled random-forest inference ---
+# Every fitted tree of a RandomForestClassifier is flattened into shared,
+# contiguous node arrays at load time. Inference walks all trees for all rows at
+# once with a handful of NumPy gathers per tree level, which avoids sklearn's
+# per-call input validation and joblib dispatch (the fixed cost that dominates
+# single-row predict_proba on 150-200 tree forests).
+#
+# For large batches the per-level NumPy overhead stops paying off, so leaf ids
+# come from each tree's own Cython traversal instead; both paths share the same
+# leaf-value table and summation.
+#
+# The arithmetic mirrors sklearn exactly: inputs are cast to float32, split tests
+# are `x <= threshold` in float64, leaf distributions are normalised per tree and
+# summed in tree order before dividing by the number of trees. `verify_forest`
+# checks the result bit-for-bit against sklearn before a compiled forest is used.
+
+TREE_LEAF = -1
+
+# Batches at least this large are traversed by the fitted trees' Cython `apply`.
+CYTHON_TRAVERSAL_ROWS = 32
+
+
+class CompiledForest:
+    def __init__(self, forest: RandomForestClassifier):
+        leaves, features, thresholds, lefts, rights, missing_left, values, roots = [], [], [], [], [], [], [], []
+        offset = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+
+            leaves.append(is_leaf)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, TREE_LEAF, tree.children_left + offset))
+            rights.append(np.where(is_leaf, TREE_LEAF, tree.children_right + offset))
+            missing_left.append(
+                np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n_nodes)), dtype=bool) & ~is_leaf
+            )
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba.
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += n_nodes
+
+        self.is_leaf = np.concatenate(leaves)
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        # children[2 * node + go_left]: right child at even slots, left child at odd ones.
+        self.children = np.ascontiguousarray(
+            np.column_stack([np.concatenate(rights), np.concatenate(lefts)]).ravel(), dtype=np.intp
+        )
+        self.missing_left = np.ascontiguousarray(np.concatenate(missing_left))
+        self.value = np.ascontiguousarray(np.concatenate(values))
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.trees = [estimator.tree_ for estimator in forest.estimators_]
+        self.n_estimators = len(forest.estimators_)
+        self.n_features_in_ = forest.n_features_in_
+        self.classes_ = forest.classes_
+        self.allows_missing = _accepts_missing_values(forest)
+
+    def apply(self, X) -> np.ndarray:
+        """Returns the global leaf index reached by every row in every tree, shape (n_rows, n_trees)."""
+        if sparse.issparse(X):
+            X = X.toarray()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, but the forest expects {self.n_features_in_} features.")
+        # Same input checks as sklearn's predict_proba.
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        check_missing = bool(np.isnan(X).any())
+        if check_missing and not self.allows_missing:
+            raise ValueError("Input X contains NaN.")
+
+        n_rows, n_trees = X.shape[0], self.roots.size
+        if n_rows >= CYTHON_TRAVERSAL_ROWS:
+            return np.column_stack([tree.apply(X) for tree in self.trees]) + self.roots
+
+        # Walk every (row, tree) path together, dropping paths as they reach a leaf.
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, n_rows)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        current = nodes[active]
+        row_offsets = (active // n_trees) * X.shape[1]
+        while active.size:
+            x = flat_X[row_offsets + self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if check_missing:
+                go_left |= np.isnan(x) & self.missing_left[current]
+            current = self.children[2 * current + go_left]
+            done = self.is_leaf[current]
+            if done.any():
+                nodes[active[done]] = current[done]
+                pending = ~done
+                active, current, row_offsets = active[pending], current[pending], row_offsets[pending]
+        return nodes.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaf_values = self.value[self.apply(X)]  # (n_rows, n_trees, n_classes)
+        # cumsum adds trees strictly in order, matching sklearn's `out += proba` loop.
+        proba = np.cumsum(leaf_values, axis=1)[:, -1, :]
+        proba /= self.n_estimators
+        return proba
+
+
+def _accepts_missing_values(forest: RandomForestClassifier) -> bool:
+    sequential = copy.copy(forest)
+    sequential.n_jobs = 1
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # unnamed features
+            sequential.predict_proba(np.full((1, forest.n_features_in_), np.nan))
+        return True
+    except ValueError:
+        return False
+
+
+def final_forest(model: Any) -> Optional[RandomForestClassifier]:
+    """The random forest a model scores with: the model itself or a pipeline's last step."""
+    if isinstance(model, RandomForestClassifier):
+        return model
+    if isinstance(model, Pipeline) and isinstance(model.steps[-1][1], RandomForestClassifier):
+        return model.steps[-1][1]
+    return None
+
+
+def probe_inputs(forest: RandomForestClassifier, n_rows: int = 256, seed: int = 0) -> np.ndarray:
+    """Rows that land on, just below and just above the forest's own split thresholds."""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, forest.n_features_in_))
+    for f in range(forest.n_features_in_):
+        used = np.concatenate([
+            est.tree_.threshold[est.tree_.feature == f] for est in forest.estimators_
+        ])
+        used = used[np.isfinite(used)]
+        if used.size:
+            picks = rng.choice(used, size=n_rows)
+            X[:, f] = picks + rng.choice([-1e-6, 0.0, 1e-6], size=n_rows) * np.maximum(np.abs(picks), 1.0)
+    return X
+
+
+def verify_forest(compiled: CompiledForest, forest: RandomForestClassifier, X: Optional[np.ndarray] = None) -> bool:
+    """
+    Bit-for-bit comparison against sklearn's predict_proba (run sequentially, so
+    its summation order is fixed), through both the small- and large-batch paths.
+    """
+    if X is None:
+        X = probe_inputs(forest)
+    sequential = copy.copy(forest)
+    sequential.n_jobs = 1
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # unnamed features
+        expected = sequential.predict_proba(X)
+
+    step = CYTHON_TRAVERSAL_ROWS - 1
+    small_batches = np.concatenate([compiled.predict_proba(X[i:i + step]) for i in range(0, len(X), step)])
+    return np.array_equal(compiled.predict_proba(X), expected) and np.array_equal(small_batches, expected)
+
+
+def compile_forest(model: Any) -> Optional[CompiledForest]:
+    """Returns a verified CompiledForest for a RandomForestClassifier, or None for any other model."""
+    if not isinstance(model, RandomForestClassifier):
+        return None
+    compiled = CompiledForest(model)
+    if not verify_forest(compiled, model):
+        print("WARNING: compiled forest disagrees with sklearn; using sklearn.")
+        return None
+    return compiled
@@ -0,0 +1,103 @@
+import re
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+
+# --- Fast HTML-to-text stripper ---
+# A single forward scan over the markup that keeps text and decodes entities the
+# same way BeautifulSoup's "html.parser" builder does, without building a tree.
+# Memory use is bounded by the size of the extracted text. Anything the scanner
+# does not model exactly (unterminated tags or comments, odd end tags, ambiguous
+# character references, <template>/<rt>/<rp> content) is handed to BeautifulSoup.
+#
+# The output equals `BeautifulSoup(markup, "html.parser").get_text()` except that
+# BeautifulSoup collapses whitespace-only strings between tags to a single space
+# or newline; the phishing tokenizer splits on whitespace, so features match.
+
+_TOKEN_RE = re.compile(r"""
+    (?P<text>[^<&]+)
+  | (?P<starttag><(?P<tagname>[a-zA-Z][-.a-zA-Z0-9:_]*)
+        (?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*
+        \s*(?P<selfclose>/?)>)
+  | (?P<endtag></\s*[a-zA-Z][-.a-zA-Z0-9:_]*\s*>)
+  | (?P<comment><!--.*?--\s*>)
+  | (?P<cdata><!\[(?i:CDATA)\[(?P<cdata_text>.*?)\]\s*\]\s*>)
+  | (?P<mssection><!\[(?i:if|else|endif)(?![-_.a-zA-Z0-9]).*?\]\s*>)
+  | (?P<decl><!(?!--)(?!\[)[^>]*>)
+  | (?P<pi><\?[^>]*>)
+  | (?P<charref>&\#(?:(?P<dec>[0-9]+)|[xX](?P<hex>[0-9a-fA-F]+))(?=[^0-9a-fA-F]);?)
+  | (?P<entityref>&(?P<entity>[a-zA-Z][-.a-zA-Z0-9]*)(?=[^a-zA-Z0-9]);?)
+  | (?P<literal><(?![a-zA-Z/!?])|&(?![a-zA-Z\#]))
+""", re.S | re.X)
+
+# Elements whose content html.parser treats as raw text up to the closing tag;
+# BeautifulSoup stores it as Script/Stylesheet strings, which get_text() skips.
+_RAW_TEXT_CLOSE = {
+    "script": re.compile(r"</\s*script\s*>", re.I),
+    "style": re.compile(r"</\s*style\s*>", re.I),
+}
+
+# Elements whose descendant strings BeautifulSoup excludes from get_text().
+_EXCLUDED_CONTAINERS = {"template", "rt", "rp"}
+
+_ENTITIES = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+
+
+class MalformedMarkup(ValueError):
+    """Raised when the fast scanner cannot reproduce html.parser's behaviour."""
+
+
+def _charref(code: int) -> str:
+    # BeautifulSoup decodes references below 256 as windows-1252 and replaces
+    # invalid code points; only the ranges where that agrees with chr() are
+    # handled here.
+    if code in (9, 10, 13) or 0x20 <= code < 0x7F or (0xA0 <= code <= 0x10FFFF and not 0xD800 <= code <= 0xDFFF):
+        return chr(code)
+    raise MalformedMarkup(f"character reference {code}")
+
+
+def strip_html(markup: str) -> str:
+    """Extracts the text of `markup` in one pass. Raises MalformedMarkup on unsupported input."""
+    pieces = []
+    append = pieces.append
+    match = _TOKEN_RE.match
+    pos, end = 0, len(markup)
+
+    while pos < end:
+        token = match(markup, pos)
+        if token is None:
+            raise MalformedMarkup(f"unsupported markup at offset {pos}")
+        kind = token.lastgroup
+        pos = token.end()
+
+        if kind == "text" or kind == "literal":
+            append(token.group())
+        elif kind == "starttag":
+            name = token.group("tagname").lower()
+            if name in _EXCLUDED_CONTAINERS:
+                raise MalformedMarkup(f"<{name}> content")
+            if name in _RAW_TEXT_CLOSE and not token.group("selfclose"):
+                close = _RAW_TEXT_CLOSE[name].search(markup, pos)
+                if close is None:
+                    raise MalformedMarkup(f"unterminated <{name}>")
+                pos = close.end()
+        elif kind == "charref":
+            digits = token.group("dec")
+            append(_charref(int(digits) if digits is not None else int(token.group("hex"), 16)))
+        elif kind == "entityref":
+            name = token.group("entity")
+            append(_ENTITIES.get(name, "&" + name))
+        elif kind == "cdata":
+            # BeautifulSoup turns an empty CDATA section into a single space.
+            append(token.group("cdata_text") or " ")
+        # endtag, comment, mssection, decl and pi carry no text
+
+    return "".join(pieces)
+
+
+def html_to_text(markup: str) -> str:
+    """Returns the text content of `markup`, falling back to BeautifulSoup for malformed documents."""
+    try:
+        return strip_html(markup)
+    except MalformedMarkup:
+        return BeautifulSoup(markup, "html.parser").get_text()
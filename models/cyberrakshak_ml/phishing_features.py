@@ -0,0 +1,155 @@
+import re
+import string
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .html_text import html_to_text
+from .url_features import URL_FEATURES, url_feature_matrix
+
+# --- Column-oriented phishing feature extraction ---
+# Shared by the models API and the backend's MLModelManager. Every function here
+# works on whole columns (lists or Series) so a single request and a batch of
+# thousands go through exactly the same code.
+
+TEXT_FEATURES = [
+    "text_length", "num_words", "num_exclamations", "num_digits",
+    "contains_login", "contains_verify", "contains_password"
+]
+
+STOPWORDS = {
+    'a','about','above','after','again','against','all','am','an','and','any','are','as','at','be','because','been',
+    'before','being','below','between','both','but','by','could','did','do','does','doing','down','during','each',
+    'few','for','from','further','had','has','have','having','he','her','here','hers','herself','him','himself','his',
+    'how','i','if','in','into','is','it','its','itself','just','me','more','most','my','myself','no','nor','not','now',
+    'of','off','on','once','only','or','other','our','ours','ourselves','out','over','own','same','she','should','so',
+    'some','such','than','that','the','their','theirs','them','themselves','then','there','these','they','this','those',
+    'through','to','too','under','until','up','very','was','we','were','what','when','where','which','while','who','whom',
+    'why','will','with','you','your','yours','yourself','yourselves'
+}
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# --- Single-pass tokenizer tables ---
+# text_features works on the UTF-8 bytes of the lowercased text. Punctuation is
+# ASCII and ASCII bytes never occur inside a multi-byte character, so one
+# bytes.translate can drop it (and lowercase ASCII-only text). The rest of the
+# Unicode whitespace that str.split splits on is turned into spaces first.
+_ASCII_TABLE = bytearray(range(256))
+_ASCII_TABLE[ord("A"):ord("Z") + 1] = bytes(range(ord("a"), ord("z") + 1))
+_ASCII_TABLE[0x1c:0x20] = b"    "  # separators that str.split treats as whitespace
+TOKEN_TABLE = bytes(_ASCII_TABLE)
+PUNCTUATION_BYTES = string.punctuation.encode("ascii")
+STOPWORD_BYTES = {word.encode("ascii") for word in STOPWORDS}
+ASCII_DIGITS = b"0123456789"
+UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+_NON_ASCII = range(0x80, sys.maxunicode + 1)
+NON_ASCII_SPACE_RE = re.compile("[" + "".join(ch for ch in map(chr, _NON_ASCII) if ch.isspace()) + "]")
+# str.isdigit is wider than \d (superscripts, circled digits, ...); 1 per such code point.
+NON_ASCII_DIGITS = np.zeros(sys.maxunicode + 1, dtype=np.uint8)
+NON_ASCII_DIGITS[[cp for cp in _NON_ASCII if chr(cp).isdigit()]] = 1
+
+
+def _as_text_series(values: Iterable[Any]) -> pd.Series:
+    """Turn a list/Series of optional strings into an object Series, with missing values as ''."""
+    series = pd.Series(list(values), dtype=object)
+    return series.where(series.notna(), "").astype(str)
+
+
+def clean_text(text):
+    if pd.isna(text): return ""
+    text = html_to_text(str(text))
+    text = text.lower()
+    text = text.translate(PUNCTUATION_TABLE)
+    tokens = [w for w in text.split() if w not in STOPWORDS]
+    return " ".join(tokens)
+
+
+def url_feature_columns(urls: Iterable[Optional[str]]) -> Dict[str, np.ndarray]:
+    """Computes every URL feature for a column of URLs (see url_features.py). Missing URLs score as all zeros."""
+    matrix = url_feature_matrix(_as_text_series(urls).tolist())
+    return {name: matrix[:, i] for i, name in enumerate(URL_FEATURES)}
+
+
+def text_features(text: Union[str, bytes]) -> Tuple[int, ...]:
+    """
+    All text features of one email (subject + " " + body), in TEXT_FEATURES order,
+    with the values they would have on clean_text(text).
+
+    One tokenizing pass over bytes, without building the cleaned string: stopwords
+    contain no digits and none of the keywords, and the keywords contain no
+    whitespace, so digits and keywords can be looked up before stopwords are dropped.
+    """
+    if isinstance(text, (bytes, bytearray)):
+        text = text.decode("utf-8", errors="replace")
+    text = html_to_text(text)
+    if text.isascii():
+        data = text.encode("ascii").translate(TOKEN_TABLE, PUNCTUATION_BYTES)
+        extra_bytes = other_digits = 0
+    else:
+        lowered = text.lower()
+        if NON_ASCII_SPACE_RE.search(lowered):
+            lowered = NON_ASCII_SPACE_RE.sub(" ", lowered)
+        data = lowered.encode("utf-8", "surrogatepass").translate(TOKEN_TABLE, PUNCTUATION_BYTES)
+        # Bytes beyond the first of each character, to turn byte lengths into character lengths.
+        extra_bytes = len(data) - len(data.translate(None, UTF8_CONTINUATION_BYTES))
+        code_points = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        other_digits = int(NON_ASCII_DIGITS[code_points].sum())
+    tokens = [word for word in data.split() if word not in STOPWORD_BYTES]
+    return (
+        sum(map(len, tokens)) - extra_bytes + max(len(tokens) - 1, 0),  # len(" ".join(tokens))
+        len(tokens),
+        0,  # "!" is punctuation, so clean text never contains one
+        len(data) - len(data.translate(None, ASCII_DIGITS)) + other_digits,
+        int(b"login" in data),
+        int(b"verify" in data),
+        int(b"password" in data),
+    )
+
+
+def text_feature_columns(subjects: Iterable[Optional[str]], bodies: Iterable[Optional[str]]) -> Dict[str, np.ndarray]:
+    """Computes every text feature for parallel columns of subjects and bodies."""
+    combined = _as_text_series(subjects) + " " + _as_text_series(bodies)
+    rows = [text_features(text) for text in combined]
+    matrix = np.array(rows, dtype=np.int64).reshape(len(rows), len(TEXT_FEATURES))
+    return {name: matrix[:, i] for i, name in enumerate(TEXT_FEATURES)}
+
+
+def extract_phishing_feature_columns(
+    subjects: Iterable[Optional[str]],
+    bodies: Iterable[Optional[str]],
+    urls: Iterable[Optional[str]],
+) -> Dict[str, np.ndarray]:
+    """
+    Computes all phishing features for whole columns in one pass.
+
+    Text features are applied after URL features, so the shared keys (num_digits,
+    contains_login, contains_verify) hold the text values, as in training.
+    """
+    columns = url_feature_columns(urls)
+    columns.update(text_feature_columns(subjects, bodies))
+    return columns
+
+
+def phishing_feature_matrix(columns: Dict[str, np.ndarray], feature_names: List[str]) -> np.ndarray:
+    """Stacks feature columns into a 2-D float array in `feature_names` order; unknown features are 0."""
+    n_rows = len(next(iter(columns.values())))
+    return np.column_stack(
+        [columns[name] if name in columns else np.zeros(n_rows) for name in feature_names]
+    ).astype(np.float64).reshape(n_rows, len(feature_names))
+
+
+def phishing_feature_records(columns: Dict[str, np.ndarray], urls: Iterable[Optional[str]]) -> List[Dict[str, int]]:
+    """
+    Builds the per-row feature dicts returned to clients. URL keys are only
+    reported for rows that actually carried a URL field.
+    """
+    url_keys = URL_FEATURES + [name for name in TEXT_FEATURES if name not in URL_FEATURES]
+    values = {name: column.tolist() for name, column in columns.items()}
+    return [
+        {name: values[name][i] for name in (url_keys if pd.notna(url) else TEXT_FEATURES)}
+        for i, url in enumerate(urls)
+    ]
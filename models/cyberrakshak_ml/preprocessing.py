@@ -0,0 +1,256 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+# --- Precompiled preprocessing plans ---
+# A fitted Pipeline's ColumnTransformer is compiled once at load time into plain
+# NumPy: the numeric column names with their imputer fills and scaler mean/scale
+# vectors, and one category -> index lookup per one-hot encoded column. Requests
+# then go from validated input dicts straight to a feature matrix, without
+# building a DataFrame or re-walking `transformers_`.
+#
+# A plan is only used after it reproduces the ColumnTransformer's output exactly
+# on probe rows; pipelines it cannot express keep the original pandas path.
+
+
+class UnsupportedTransformer(ValueError):
+    """Raised when a fitted transformer has no compiled equivalent."""
+
+
+def _coerce_number(value: Any) -> float:
+    # Same result as `pd.to_numeric(errors='coerce').fillna(0)` for scalar inputs.
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if number != number else number
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class NumericBlock:
+    """Columns that are imputed and/or standard-scaled (or passed through) as float64."""
+
+    def __init__(self, columns: List[str], fill=None, mean=None, scale=None, coerce: bool = False):
+        self.columns = columns
+        self.fill = fill
+        self.mean = mean
+        self.scale = scale
+        self.coerce = coerce
+        self.width = len(columns)
+
+    def transform(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        columns = self.columns
+        if self.coerce:
+            values = np.array([[_coerce_number(row[c]) for c in columns] for row in records], dtype=np.float64)
+        else:
+            values = np.array([[row[c] for c in columns] for row in records], dtype=np.float64)
+        values = values.reshape(len(records), self.width)
+
+        # Same operations, in the same order, as SimpleImputer and StandardScaler.
+        if self.fill is not None:
+            missing = np.isnan(values)
+            if missing.any():
+                values = np.where(missing, self.fill, values)
+        if self.mean is not None:
+            values -= self.mean
+        if self.scale is not None:
+            values /= self.scale
+        return values
+
+
+class OneHotBlock:
+    """Columns one-hot encoded against the fitted OneHotEncoder vocabularies."""
+
+    def __init__(self, columns: List[str], categories: List[np.ndarray], handle_unknown: str, fill=None):
+        self.columns = columns
+        self.fill = fill
+        self.handle_unknown = handle_unknown
+        self.lookups, self.missing_index, self.offsets = [], [], []
+        offset = 0
+        for cats in categories:
+            values = cats.tolist()
+            self.lookups.append({value: i for i, value in enumerate(values) if not _is_missing(value)})
+            self.missing_index.append(next((i for i, value in enumerate(values) if _is_missing(value)), None))
+            self.offsets.append(offset)
+            offset += len(values)
+        self.width = offset
+
+    def transform(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        out = np.zeros((len(records), self.width))
+        for j, column in enumerate(self.columns):
+            lookup, missing_index, offset = self.lookups[j], self.missing_index[j], self.offsets[j]
+            for i, row in enumerate(records):
+                value = row[column]
+                if self.fill is not None and _is_missing(value):
+                    value = self.fill[j]
+                index = missing_index if _is_missing(value) else lookup.get(value)
+                if index is not None:
+                    out[i, offset + index] = 1.0
+                elif self.handle_unknown == "error":
+                    raise ValueError(f"Found unknown categories [{value!r}] in column {j} during transform")
+        return out
+
+
+class PreprocessingPlan:
+    """A compiled ColumnTransformer: input dicts in, the transformer's feature matrix out."""
+
+    def __init__(self, blocks: list, sparse_output: bool):
+        self.blocks = blocks
+        self.sparse_output = sparse_output
+        self.columns = [column for block in blocks for column in block.columns]
+
+    def transform(self, records: List[Dict[str, Any]]):
+        try:
+            parts = [block.transform(records) for block in self.blocks]
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {{{e.args[0]!r}}}")
+        X = np.hstack(parts) if parts else np.zeros((len(records), 0))
+        return sparse.csr_matrix(X) if self.sparse_output else X
+
+
+class DataFramePlan:
+    """The original pandas path, for pipelines that cannot be compiled."""
+
+    def __init__(self, preprocessor, coerce_columns: List[str]):
+        self.preprocessor = preprocessor
+        self.coerce_columns = coerce_columns
+
+    def transform(self, records: List[Dict[str, Any]]):
+        input_df = pd.DataFrame(records)
+        for col in self.coerce_columns:
+            if col in input_df.columns:
+                input_df[col] = pd.to_numeric(input_df[col], errors='coerce').fillna(0).astype(np.float64)
+        return input_df if self.preprocessor is None else self.preprocessor.transform(input_df)
+
+
+def _column_names(columns) -> List[str]:
+    names = list(columns) if not isinstance(columns, (str, slice)) else None
+    if names is None or not all(isinstance(name, str) for name in names):
+        raise UnsupportedTransformer(f"column selector {columns!r}")
+    return names
+
+
+def _imputer_fill(imputer: SimpleImputer) -> np.ndarray:
+    missing_values = imputer.missing_values
+    if not (isinstance(missing_values, float) and missing_values != missing_values):
+        raise UnsupportedTransformer(f"SimpleImputer(missing_values={missing_values!r})")
+    if imputer.add_indicator or pd.isna(pd.Series(imputer.statistics_, dtype=object)).any():
+        raise UnsupportedTransformer("SimpleImputer with indicators or empty features")
+    return imputer.statistics_
+
+
+def _is_identity(step) -> bool:
+    # Fitted ColumnTransformers store "passthrough" as an identity FunctionTransformer.
+    if isinstance(step, FunctionTransformer):
+        return step.func is None
+    return step is None or (isinstance(step, str) and step == "passthrough")
+
+
+def _compile_block(transformer, columns: List[str], coerce: bool):
+    steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+    steps = [step for step in steps if not _is_identity(step)]
+    fill = None
+    if steps and isinstance(steps[0], SimpleImputer):
+        fill = _imputer_fill(steps.pop(0))
+
+    if len(steps) == 1 and isinstance(steps[0], OneHotEncoder):
+        encoder = steps[0]
+        if encoder.drop_idx_ is not None or getattr(encoder, "_infrequent_enabled", False):
+            raise UnsupportedTransformer("OneHotEncoder with dropped or infrequent categories")
+        if np.dtype(encoder.dtype) != np.float64:
+            raise UnsupportedTransformer(f"OneHotEncoder(dtype={encoder.dtype})")
+        return OneHotBlock(columns, encoder.categories_, encoder.handle_unknown,
+                           fill=None if fill is None else fill.tolist())
+
+    if all(isinstance(step, StandardScaler) for step in steps) and len(steps) <= 1:
+        if fill is not None:
+            fill = np.asarray(fill, dtype=np.float64)
+        scaler = steps[0] if steps else None
+        return NumericBlock(
+            columns, fill=fill, coerce=coerce,
+            mean=scaler.mean_ if scaler is not None and scaler.with_mean else None,
+            scale=scaler.scale_ if scaler is not None and scaler.with_std else None,
+        )
+
+    raise UnsupportedTransformer(" -> ".join(type(step).__name__ for step in steps))
+
+
+def _compile_column_transformer(preprocessor: ColumnTransformer, coerce_numeric: bool) -> PreprocessingPlan:
+    blocks = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        names = _column_names(columns)
+        if not names:
+            continue
+        blocks.append(_compile_block(transformer, names, coerce=coerce_numeric and name == 'num'))
+    return PreprocessingPlan(blocks, sparse_output=bool(preprocessor.sparse_output_))
+
+
+def probe_records(plan: PreprocessingPlan, n_rows: int = 64, seed: int = 0) -> List[Dict[str, Any]]:
+    """Rows covering every fitted category (plus an unseen one where allowed) and varied numbers."""
+    rng = np.random.default_rng(seed)
+    records = [{} for _ in range(n_rows)]
+    for block in plan.blocks:
+        for j, column in enumerate(block.columns):
+            if isinstance(block, OneHotBlock):
+                choices = list(block.lookups[j])
+                if block.handle_unknown != "error" or not choices:
+                    choices.append("__unseen__")
+                values = [choices[i % len(choices)] for i in range(n_rows)]
+            else:
+                values = (rng.standard_normal(n_rows) * 1000).round(rng.integers(0, 4)).tolist()
+            for record, value in zip(records, values):
+                record[column] = value
+    return records
+
+
+def verify_plan(plan: PreprocessingPlan, reference: DataFramePlan, records: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """Exact comparison of the compiled plan against the ColumnTransformer's own output."""
+    if records is None:
+        records = probe_records(plan)
+    expected = reference.transform(records)
+    actual = plan.transform(records)
+    if sparse.issparse(expected) != sparse.issparse(actual):
+        return False
+    if sparse.issparse(expected):
+        expected, actual = expected.toarray(), actual.toarray()
+    return np.array_equal(np.asarray(expected), actual)
+
+
+def compile_preprocessing(model: Any, coerce_numeric: bool = False) -> Tuple[Any, Any]:
+    """
+    Splits a fitted `Pipeline(ColumnTransformer, estimator)` into a feature plan
+    and its final estimator. The plan's `transform(records)` takes a list of
+    input dicts. `coerce_numeric` turns non-numeric values in numeric columns
+    into 0 (training-serving skew guard for the ransomware model).
+    """
+    if not isinstance(model, Pipeline):
+        return DataFramePlan(None, []), model
+
+    preprocessor, estimator = model[:-1], model.steps[-1][1]
+    first_step = model.steps[0][1]
+    coerce_columns = []
+    if coerce_numeric and isinstance(first_step, ColumnTransformer):
+        coerce_columns = [col for name, _, cols in first_step.transformers_ if name == 'num' for col in cols]
+    reference = DataFramePlan(preprocessor, coerce_columns)
+
+    if len(model.steps) != 2 or not isinstance(first_step, ColumnTransformer):
+        return reference, estimator
+    try:
+        plan = _compile_column_transformer(first_step, coerce_numeric)
+        if verify_plan(plan, reference):
+            return plan, estimator
+        print(f"WARNING: compiled preprocessing disagrees with {type(first_step).__name__}; using pandas.")
+    except Exception as e:
+        print(f"WARNING: could not compile preprocessing ({e}); using pandas.")
+    return reference, estimator
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import joblib
+
+# --- Versioned model registry ---
+# Holds the one loaded version of each model that new requests are scored with.
+# A reload builds the new version completely (load, compile, verify) on the side
+# and then swaps it in with a single assignment. Scorers take one reference to a
+# LoadedModel per call, so calls already in flight finish on the version they
+# started with. A failed reload leaves the current version in place.
+
+
+def save_atomically(obj: Any, path: Union[str, Path]):
+    """Saves a model artifact with joblib for the training scripts."""
+    # Write next to the target and rename over it: the API hot-reloads and
+    # memory-maps model files, so it must never see a half-written one.
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class LoadedModel:
+    """One loaded version of a model: its artifacts plus the compiled inference path."""
+
+    def __init__(self, name: str, version: str, artifacts: Dict[str, Any], plan=None, predictor=None):
+        self.name = name
+        self.version = version
+        self.artifacts = artifacts
+        # Pipelines only: precompiled preprocessing, and the estimator that scores its output.
+        self.plan = plan
+        self.predictor = predictor
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    def __init__(self, build: Callable[[str], LoadedModel]):
+        self.build = build
+        self._models: Dict[str, LoadedModel] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        return self._models.get(name)
+
+    def load(self, name: str) -> Optional[LoadedModel]:
+        """Builds the current files of `name` and swaps them in. Returns None if that failed."""
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # One load per model at a time; a second reload request waits and then reloads again.
+        with lock:
+            status = self._status.setdefault(name, {"state": "pending", "version": None, "load_seconds": None, "error": None})
+            if name not in self._models:
+                status["state"] = "loading"
+            start = time.perf_counter()
+            try:
+                model = self.build(name)
+            except Exception as e:
+                status["error"] = str(e)
+                if name not in self._models:
+                    status["state"] = "failed"
+                return None
+            self._models[name] = model
+            status.update(state="ready", version=model.version, load_seconds=round(time.perf_counter() - start, 3), error=None)
+            return model
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """State of the version being served; `error` is the last failed load, if any."""
+        return dict(self._status.get(name) or {"state": "pending", "version": None, "load_seconds": None, "error": None})
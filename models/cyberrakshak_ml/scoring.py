@@ -0,0 +1,251 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+from pathlib import Path
+
+from .forest import compile_forest
+from .phishing_features import (
+    extract_phishing_feature_columns, phishing_feature_matrix, phishing_feature_records
+)
+from .preprocessing import compile_preprocessing
+from .registry import LoadedModel, ModelRegistry
+
+# --- Model loading and scoring ---
+# Everything needed to score records, without the web layer, so the same code
+# runs in the API process and in the worker processes (see workers.py). Each
+# scorer takes one loaded model version (see registry.py) and a list of
+# already-validated records, and makes a single predict_proba call, so single
+# and batch requests share one code path.
+
+# The trained model files live in this tree, next to the package; that is why it
+# is installed in editable mode (pip install -e models), never copied elsewhere.
+MODELS_ROOT = Path(__file__).parent.parent.resolve()
+
+MODEL_FILES = {
+    "phishing": {
+        "phishing_model": "phishing/models/phishing_rf_model.pkl",
+        "phishing_features": "phishing/models/phishing_features.pkl",
+    },
+    "malware": {
+        "malware_model": "malware/models/malware_rf_model.pkl",
+        "malware_features": "malware/models/malware_features.pkl",
+    },
+    "ransomware": {"ransomware_model": "Ransomware/models/ransomware_rf_model.pkl"},
+    "networking": {"networking_model": "networking/models/network_rf_model.pkl"},
+    "zero_day": {"zero_day_model": "zero_day_attack/models/zero_day_model.pkl"},
+}
+MODEL_NAMES = tuple(MODEL_FILES)
+MODEL_LABELS = {
+    "phishing": "Phishing", "malware": "Malware", "ransomware": "Ransomware",
+    "networking": "Networking", "zero_day": "Zero-Day",
+}
+
+# Pipelines are split into a precompiled feature plan (see preprocessing.py) and
+# their final estimator, so requests never build a DataFrame. Random forests are
+# flattened into array-backed forests (see forest.py). Both are verified against
+# sklearn at load time; anything that cannot be compiled keeps its sklearn path.
+PIPELINE_MODELS = ("ransomware_model", "networking_model", "zero_day_model")
+
+# Plain arrays in the pickles (scaler statistics, coefficients, class labels) are
+# memory-mapped read-only, so every process serving the same file shares one copy
+# in the page cache. sklearn copies tree nodes into its own buffers on unpickle,
+# so forests are not shared this way. Replace model files by renaming a new file
+# over the old one, never by rewriting it in place. MODEL_MMAP=0 turns this off.
+MMAP_MODE = "r" if os.getenv("MODEL_MMAP", "1") != "0" else None
+
+
+class ScoringError(Exception):
+    """A scoring failure with the HTTP status the API should answer with. Picklable across processes."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def model_version(name: str) -> str:
+    """Short fingerprint of a model's artifact files; it changes whenever one of them is replaced."""
+    digest = hashlib.sha1()
+    for path in sorted(MODEL_FILES[name].values()):
+        try:
+            stat = (MODELS_ROOT / path).stat()
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()[:12]
+
+
+def load_artifacts(name: str) -> dict:
+    """Unpickles one model's artifact files (see MMAP_MODE)."""
+    return {key: joblib.load(MODELS_ROOT / path, mmap_mode=MMAP_MODE) for key, path in MODEL_FILES[name].items()}
+
+
+def build_model(name: str) -> LoadedModel:
+    """Loads and compiles the current files of one model. Compilation verifies against sklearn, which also warms it."""
+    for _ in range(3):
+        version = model_version(name)
+        artifacts = load_artifacts(name)
+        # A file replaced while we were reading would pair new artifacts with an old version.
+        if model_version(name) == version:
+            break
+    else:
+        raise RuntimeError("model files kept changing while loading")
+
+    key = f"{name}_model"
+    estimator, plan = artifacts[key], None
+    if key in PIPELINE_MODELS:
+        # The ransomware plan coerces its numeric columns to guard against training-serving skew.
+        plan, estimator = compile_preprocessing(estimator, coerce_numeric=(key == "ransomware_model"))
+    return LoadedModel(name, version, artifacts, plan=plan, predictor=compile_forest(estimator) or estimator)
+
+
+# The versions this process scores with. Per-model load state (pending -> loading ->
+# ready | failed) is reported by the readiness endpoint.
+registry = ModelRegistry(build_model)
+
+
+def load_model(name: str) -> bool:
+    """Loads (or reloads) one model and swaps it in. Returns False if it could not be loaded."""
+    if registry.load(name) is None:
+        print(f"ERROR: Could not load the {name} model - {registry.status(name)['error']}. Please ensure all models are trained and located in the correct 'models' subdirectories.")
+        return False
+    return True
+
+
+def load_models(names=MODEL_NAMES) -> dict:
+    """Loads models concurrently (file reads and NumPy work release the GIL). Returns name -> loaded."""
+    names = list(names)
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as executor:
+        return dict(zip(names, executor.map(load_model, names)))
+
+
+def score_phishing(model, records):
+    if not records:
+        return []
+
+    # Subjects/bodies are stringified as before, so an explicit null still reads as "None".
+    subjects = [str(row.get('subject', '')) for row in records]
+    bodies = [str(row.get('body', '')) for row in records]
+    urls = [row.get('url') for row in records]
+
+    try:
+        columns = extract_phishing_feature_columns(subjects, bodies, urls)
+        feat_array = phishing_feature_matrix(columns, model.artifacts["phishing_features"])
+        feats = phishing_feature_records(columns, urls)
+    except Exception as e:
+        raise ScoringError(400, f"Feature extraction failed: {e}")
+
+    pred_probs = model.predictor.predict_proba(feat_array)[:, 1]
+
+    return [
+        {
+            "prediction": "phishing" if pred_prob >= 0.5 else "legitimate",
+            "confidence": round(float(pred_prob), 4),
+            "features": f
+        }
+        for f, pred_prob in zip(feats, pred_probs)
+    ]
+
+def score_malware(model, records):
+    if not records:
+        return []
+
+    features = model.artifacts["malware_features"]
+
+    feat_array = np.array([[row.get(f, 0) for f in features] for row in records]).reshape(len(records), -1)
+    pred_probs = model.predictor.predict_proba(feat_array)[:, 1]
+
+    return [
+        {
+            "prediction": "malware" if pred_prob >= 0.5 else "benign",
+            "confidence": round(float(pred_prob), 4)
+        }
+        for pred_prob in pred_probs
+    ]
+
+def score_ransomware(model, records):
+    if not records:
+        return []
+
+    try:
+        # Numeric columns are coerced to floats by the plan (non-numeric values become 0),
+        # so string inputs cannot break the model's StandardScaler.
+        X = model.plan.transform(records)
+
+        # Assumes class 1 is malicious
+        pred_probs = model.predictor.predict_proba(X)[:, 1]
+    except Exception as e:
+        raise ScoringError(400, f"Prediction failed: {e}")
+
+    return [
+        {
+            "prediction": "malicious" if pred_prob >= 0.5 else "benign",
+            "confidence": round(float(pred_prob), 4)
+        }
+        for pred_prob in pred_probs
+    ]
+
+def score_networking(model, records):
+    if not records:
+        return []
+
+    try:
+        X = model.plan.transform(records)
+        # Assumes class 1 is anomaly
+        pred_probs = model.predictor.predict_proba(X)[:, 1]
+    except Exception as e:
+        raise ScoringError(400, f"Prediction failed: {e}")
+
+    return [
+        {
+            "prediction": "anomaly" if pred_prob >= 0.5 else "normal",
+            "confidence": round(float(pred_prob), 4)
+        }
+        for pred_prob in pred_probs
+    ]
+
+def score_zero_day(model, records):
+    if not records:
+        return []
+
+    classifier = model.predictor
+
+    try:
+        X = model.plan.transform(records)
+        predictions = classifier.predict(X)
+        pred_probs = classifier.predict_proba(X)
+        classes = classifier.classes_
+    except Exception as e:
+        raise ScoringError(400, f"Prediction failed: {e}")
+
+    return [
+        {
+            "prediction": prediction,
+            # Create a dictionary of class probabilities
+            "class_probabilities": {classes[i]: round(float(prob), 4) for i, prob in enumerate(probs)}
+        }
+        for prediction, probs in zip(predictions, pred_probs)
+    ]
+
+
+SCORERS = {
+    "phishing": score_phishing,
+    "malware": score_malware,
+    "ransomware": score_ransomware,
+    "networking": score_networking,
+    "zero_day": score_zero_day,
+}
+
+
+def score(name, records):
+    """Scores records with the current version of model `name`; each result names that version."""
+    model = registry.get(name)
+    if model is None:
+        raise ScoringError(503, f"{MODEL_LABELS[name]} model not loaded.")
+    results = SCORERS[name](model, records)
+    for result in results:
+        result["model_version"] = model.version
+    return results
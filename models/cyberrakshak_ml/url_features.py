@@ -0,0 +1,90 @@
+import functools
+import os
+import re
+from typing import Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+# --- URL features ---
+# Every phishing request carries a URL, and campaigns send the same URLs again
+# and again. Each distinct URL is parsed once into a compact tuple of its feature
+# values (in URL_FEATURES order), and the tuples are kept in a bounded LRU cache
+# keyed by the exact URL string. Shared by the models API and the backend's
+# MLModelManager through phishing_features.url_feature_columns.
+#
+#   URL_FEATURE_CACHE_SIZE=<urls>      default 50000, 0 disables the cache
+
+URL_FEATURES = [
+    "url_length", "num_dots", "num_hyphens", "num_digits", "has_https",
+    "has_at_symbol", "num_slash", "has_ip_address", "contains_login", "contains_verify"
+]
+
+IP_HOST_RE = re.compile(r"^\d{1,3}(\.\d{1,3}){3}$")
+IP_IN_URL_RE = re.compile(r"\d{1,3}(\.\d{1,3}){3}")
+
+ASCII_DIGITS = b"0123456789"
+
+EMPTY_URL_FEATURES = (0,) * len(URL_FEATURES)
+
+
+def count_digits(text: str) -> int:
+    """Characters for which str.isdigit is true (wider than \\d), as num_digits has always been counted."""
+    # A single C-level pass for ASCII text (nearly all URLs and most emails).
+    if text.isascii():
+        data = text.encode("ascii")
+        return len(data) - len(data.translate(None, ASCII_DIGITS))
+    return sum(ch.isdigit() for ch in text)
+
+
+def _url_features(url: str) -> Tuple[int, ...]:
+    """Feature values of one URL, in URL_FEATURES order ('' scores as all zeros)."""
+    if not url:
+        return EMPTY_URL_FEATURES
+    lowered = url.lower()
+    # urlparse is the slow part, and only needed if the hostname could be an IP:
+    # the hostname is a substring of the URL, unless urlsplit removed tabs or
+    # newlines from it, so URLs without a dotted quad anywhere are ruled out.
+    has_ip_address = 0
+    if IP_IN_URL_RE.search(url) or not url.isprintable():
+        has_ip_address = int(IP_HOST_RE.match(urlparse(url).hostname or "") is not None)
+    return (
+        len(url),
+        url.count("."),
+        url.count("-"),
+        count_digits(url),
+        int("https" in lowered),
+        int("@" in url),
+        url.count("/"),
+        has_ip_address,
+        int("login" in lowered),
+        int("verify" in lowered),
+    )
+
+
+def _cache_size() -> int:
+    return max(0, int(os.getenv("URL_FEATURE_CACHE_SIZE", 50000)))
+
+
+url_features = functools.lru_cache(maxsize=_cache_size())(_url_features) if _cache_size() else _url_features
+
+
+def url_feature_matrix(urls: Iterable[Optional[str]]) -> np.ndarray:
+    """One row of URL features per URL; urls must already be strings (missing ones as '')."""
+    rows = [url_features(url) for url in urls]
+    return np.array(rows, dtype=np.int64).reshape(len(rows), len(URL_FEATURES))
+
+
+def url_cache_stats() -> dict:
+    if not hasattr(url_features, "cache_info"):
+        return {"enabled": False}
+    info = url_features.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "enabled": True,
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else None,
+    }
@@ -7,6 +7,8 @@ import joblib
 from pathlib import Path
 import os
 
+from cyberrakshak_ml.registry import save_atomically
+
 # -----------------------------------------------------
 # Base paths
 # -----------------------------------------------------
@@ -94,8 +96,8 @@ print("ROC-AUC:", roc_auc_score(y_test, probs[:, 1]))
 model_file = MODELS_DIR / "malware_rf_model.pkl"
 features_file = MODELS_DIR / "malware_features.pkl"
 
-joblib.dump(model, model_file)
-joblib.dump(feature_cols, features_file)
+save_atomically(model, model_file)
+save_atomically(feature_cols, features_file)
 print(f"\nModel saved to: {model_file}")
 print(f"Feature list saved to: {features_file}")
 
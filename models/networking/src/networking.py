@@ -8,7 +8,8 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-import joblib
+
+from cyberrakshak_ml.registry import save_atomically
 
 # -----------------------------------------------------
 # Function to train and save the model
@@ -88,7 +89,7 @@ def train_model():
 
     # Save model
     model_path = MODELS_DIR / "network_rf_model.pkl"
-    joblib.dump(pipeline, model_path)
+    save_atomically(pipeline, model_path)
     print(f"\n✅ Model saved to: {model_path}")
 
     return pipeline
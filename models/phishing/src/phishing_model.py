@@ -13,6 +13,8 @@ import os
 import string
 from bs4 import BeautifulSoup
 
+from cyberrakshak_ml.registry import save_atomically
+
 # -----------------------------------------------------
 # Base paths
 # -----------------------------------------------------
@@ -171,8 +173,8 @@ print("ROC-AUC:", roc_auc_score(y_test, probs[:, 1]))
 model_file = MODELS_DIR / "phishing_rf_model.pkl"
 features_file = MODELS_DIR / "phishing_features.pkl"
 
-joblib.dump(model, model_file)
-joblib.dump(list(X.columns), features_file)
+save_atomically(model, model_file)
+save_atomically(list(X.columns), features_file)
 print(f"\nModel saved to: {model_file}")
 print(f"Feature list saved to: {features_file}")
 
@@ -0,0 +1,132 @@
+"""
+The original per-row implementations that the optimized code paths replaced, and
+sample data for comparing them. Used by the parity tests and by api/benchmarks.py.
+"""
+import random
+import re
+import string
+from urllib.parse import urlparse
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from cyberrakshak_ml.phishing_features import STOPWORDS, clean_text
+
+# --- Reference implementations (the original per-row code) ---
+
+def reference_clean_text(text):
+    if pd.isna(text): return ""
+    text = BeautifulSoup(str(text), "html.parser").get_text()
+    text = text.lower()
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    tokens = [w for w in text.split() if w not in STOPWORDS]
+    return " ".join(tokens)
+
+def reference_url_features(url):
+    if not url or pd.isna(url): return { "url_length": 0, "num_dots": 0, "num_hyphens": 0, "num_digits": 0, "has_https": 0, "has_at_symbol": 0, "num_slash": 0, "has_ip_address": 0, "contains_login": 0, "contains_verify": 0 }
+    return {
+        "url_length": len(url), "num_dots": url.count('.'), "num_hyphens": url.count('-'),
+        "num_digits": sum(c.isdigit() for c in url), "has_https": int("https" in url.lower()),
+        "has_at_symbol": int("@" in url), "num_slash": url.count('/'),
+        "has_ip_address": int(bool(re.match(r"^\d{1,3}(\.\d{1,3}){3}$", urlparse(url).hostname or ""))),
+        "contains_login": int("login" in url.lower()), "contains_verify": int("verify" in url.lower())
+    }
+
+def reference_text_features(subject, body):
+    combined = reference_clean_text(str(subject) + " " + str(body))
+    return {
+        "text_length": len(combined), "num_words": len(combined.split()), "num_exclamations": combined.count('!'),
+        "num_digits": sum(c.isdigit() for c in combined), "contains_login": int("login" in combined),
+        "contains_verify": int("verify" in combined), "contains_password": int("password" in combined)
+    }
+
+# str.isdigit is wider than \d, so the previous code added the other digits to the pattern.
+PREVIOUS_DIGIT_PATTERN = "[\\d" + re.escape("".join(
+    ch for ch in map(chr, range(0x110000)) if ch.isdigit() and not re.match(r"\d", ch)
+)) + "]"
+
+def as_text_series(values):
+    """Optional strings as an object Series, with missing values as ''."""
+    series = pd.Series(list(values), dtype=object)
+    return series.where(series.notna(), "").astype(str)
+
+def previous_text_feature_columns(subjects, bodies):
+    """The column-oriented text features before the single-pass tokenizer."""
+    combined = as_text_series(subjects) + " " + as_text_series(bodies)
+    cleaned = pd.Series([clean_text(text) for text in combined], dtype=object)
+    return {
+        "text_length": cleaned.str.len().to_numpy(),
+        "num_words": cleaned.str.split().str.len().to_numpy(),
+        "num_exclamations": cleaned.str.count("!").to_numpy(),
+        "num_digits": cleaned.str.count(PREVIOUS_DIGIT_PATTERN).to_numpy(),
+        "contains_login": cleaned.str.contains("login", regex=False).to_numpy(dtype=int),
+        "contains_verify": cleaned.str.contains("verify", regex=False).to_numpy(dtype=int),
+        "contains_password": cleaned.str.contains("password", regex=False).to_numpy(dtype=int),
+    }
+
+def reference_phishing_features(row):
+    feats = {}
+    if 'url' in row and pd.notna(row['url']):
+        feats.update(reference_url_features(row['url']))
+    feats.update(reference_text_features(row.get('subject', ''), row.get('body', '')))
+    return pd.Series(feats)
+
+# --- Sample data ---
+
+WORDS = ["verify", "your", "login", "password", "account", "urgent", "click", "here", "the", "bank",
+         "Invoice", "LOGIN!", "2FA", "¹²³", "①", "résumé", "naïve", "12345", "&amp;", "&lt;b&gt;", "...", "@"]
+TAGS = ["<p>", "</p>", "<b>", "</b>", "<br/>", '<a href="http://x.com/login">', "</a>",
+        "<!-- hidden -->", "<script>var x = 1;</script>", "<style>p {}</style>", "<div class=\"c\">", "</div>"]
+URLS = ["http://secure-login-account-verification.com", "https://www.bbc.com/news", "http://203.0.113.10/admin/login.php",
+        "https://login.microsoft.com.security-update-required.com/auth", "http://user@1.2.3.4:8080/x", "",
+        "HTTPS://EXAMPLE.COM/Verify?id=٣٤", None]
+
+def random_text(rng, n_words):
+    parts = []
+    for _ in range(n_words):
+        parts.append(rng.choice(TAGS) if rng.random() < 0.2 else rng.choice(WORDS))
+        parts.append(rng.choice([" ", " ", "\n", "\t", ""]))
+    return "".join(parts)
+
+def sample_phishing_rows(n, seed=0, max_words=40):
+    rng = random.Random(seed)
+    return [
+        {"subject": random_text(rng, rng.randint(0, 8)), "body": random_text(rng, rng.randint(0, max_words)),
+         "url": rng.choice(URLS)}
+        for _ in range(n)
+    ]
+
+HTML_EDGE_CASES = [
+    "a<script>var x = '<b>1</b>';</script>b", "a<STYLE>p {}</style >b", "a<!-- c -- >b", "a<![CDATA[x]]>b",
+    "a<![CDATA[]]>b", "<!DOCTYPE html>a", "a<?php x ?>b", "a < b > c", "a<b", "a<", "a <3 b", "a<1>b",
+    "a&amp;b &lt;x&gt; &nbsp;&#39; &AMP; &foo; &ampx", "&am<b>p;", "a</p >b", "a</ b>c", "a<!b>c",
+    'a<div class="x>y">b', "x<template>t</template>y", "a<ruby>X<rt>kan</rt></ruby>b", "&#0; &#150; &#x41;x",
+    "&#x; <b>hi</b>", "<!--[if mso]><table><![endif]-->a<![if !mso]>b<![endif]>", "<p>a</p>\n\n<p>b</p>",
+]
+
+def newsletter_html(n_blocks, seed=0):
+    rng = random.Random(seed)
+    blocks = ['<!DOCTYPE html><html><head><style>td {padding: 0}</style><title>Weekly deals</title></head><body>']
+    for _ in range(n_blocks):
+        blocks.append(
+            f'<table class="row"><tr><td style="font-family:Arial">'
+            f'<a href="https://example.com/p/{rng.randint(1, 99999)}?utm_source=news&amp;id=7">'
+            f'{random_text(rng, 12)}</a><br/>&nbsp;&copy; 2025 &#8217;</td></tr></table>'
+            f'<!-- tracking --><img src="https://t.example.com/{rng.randint(1, 99999)}.gif" width="1" height="1" />'
+        )
+    blocks.append("<script>window.x = 1;</script></body></html>")
+    return "".join(blocks)
+
+def sample_urls(n, seed=0, distinct=500):
+    """Campaign-like traffic: n URLs drawn from `distinct` generated ones plus the edge cases in URLS."""
+    rng = random.Random(seed)
+    hosts = ["secure-login.example.com", "203.0.113.10", "1.2.3.4:8080", "user@10.0.0.1", "[::1]", "[2001:db8::1]:443",
+             "ＥＸＡＭＰＬＥ.com", "a.b.c.d", "999.1.1.1", "1.2.3", "١٢٣.١.١.١", "verify-account.bank.co.uk"]
+    generated = [
+        f"{rng.choice(['http', 'https', 'HTTPS', 'ftp'])}://{rng.choice(hosts)}/{rng.choice(WORDS)}/{rng.randint(0, 10**6)}"
+        f"{rng.choice(['', '?id=٣٤', '#Login', '?next=/verify&x=-1'])}"
+        for _ in range(distinct)
+    ]
+    pool = generated + [url for url in URLS if url] + ["not a url", "//1.2.3.4", "http://1.2.3.4.", " http://1.2.3.4 ",
+                                                  "http://1.2\t.3.4/", "http://1.2.3\n.4/x", "\x00http://1.2.3.4"]
+    return [rng.choice(pool) for _ in range(n)]
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from api.main import MAX_BATCH_SIZE, app
+
+# Without the context manager the startup handler does not run, so no models are
+# loaded: these requests are all answered by request validation.
+client = TestClient(app)
+
+
+def test_an_oversized_batch_is_rejected_with_413():
+    response = client.post("/predict/malware/batch", json=[{}] * (MAX_BATCH_SIZE + 1))
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Batch too large: {MAX_BATCH_SIZE + 1} records (max {MAX_BATCH_SIZE})."
+
+
+def test_other_invalid_bodies_are_still_422():
+    response = client.post("/predict/malware/batch", json=[{"state": "not a number"}])
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 0, "state"]
@@ -0,0 +1,169 @@
+"""
+Parity of the optimized scoring code paths with the original implementations
+they replaced. The model tests use whichever trained models are present and
+skip the rest.
+"""
+import asyncio
+import random
+
+import joblib
+import numpy as np
+import pytest
+from bs4 import BeautifulSoup
+from starlette.concurrency import run_in_threadpool
+
+from api.batching import MicroBatcher
+from cyberrakshak_ml import scoring
+from cyberrakshak_ml.cache import PredictionCache
+from cyberrakshak_ml.forest import CompiledForest, final_forest, probe_inputs, verify_forest
+from cyberrakshak_ml.html_text import html_to_text
+from cyberrakshak_ml.phishing_features import (
+    TEXT_FEATURES, clean_text, extract_phishing_feature_columns, phishing_feature_matrix,
+    phishing_feature_records, text_feature_columns, text_features
+)
+from cyberrakshak_ml.preprocessing import DataFramePlan, PreprocessingPlan, compile_preprocessing, probe_records
+from cyberrakshak_ml.url_features import URL_FEATURES, url_feature_matrix
+
+from tests.reference import (
+    HTML_EDGE_CASES, newsletter_html, previous_text_feature_columns, random_text, reference_clean_text,
+    reference_phishing_features, reference_url_features, sample_phishing_rows, sample_urls
+)
+
+FOREST_MODELS = [
+    "phishing/models/phishing_rf_model.pkl",
+    "malware/models/malware_rf_model.pkl",
+    "Ransomware/models/ransomware_rf_model.pkl",
+    "networking/models/network_rf_model.pkl",
+]
+
+PIPELINE_MODELS = [
+    ("Ransomware/models/ransomware_rf_model.pkl", True),
+    ("networking/models/network_rf_model.pkl", False),
+    ("zero_day_attack/models/zero_day_model.pkl", False),
+]
+
+
+def load_model_file(relative_path):
+    path = scoring.MODELS_ROOT / relative_path
+    if not path.exists():
+        pytest.skip(f"{relative_path} not found")
+    return joblib.load(path)
+
+
+def loaded_model(name):
+    if not scoring.load_model(name):
+        pytest.skip(f"{name} model not found")
+    return scoring.registry.get(name)
+
+
+def test_phishing_features_match_the_per_row_code():
+    rows = sample_phishing_rows(2000)
+    urls = [row["url"] for row in rows]
+
+    columns = extract_phishing_feature_columns([str(row["subject"]) for row in rows], [str(row["body"]) for row in rows], urls)
+    records = phishing_feature_records(columns, urls)
+    matrix = phishing_feature_matrix(columns, TEXT_FEATURES)
+
+    for i, row in enumerate(rows):
+        expected = reference_phishing_features(row).to_dict()
+        assert records[i] == expected, row
+        assert list(matrix[i]) == [float(expected.get(f, 0)) for f in TEXT_FEATURES], row
+
+
+def test_single_pass_text_features_match_the_previous_columns():
+    rng = random.Random(2)
+    # Large bodies: newsletters and long word salads, with HTML, Unicode digits and keywords.
+    bodies = [newsletter_html(rng.randint(20, 80), seed=i) if i % 3 == 0 else random_text(rng, rng.randint(500, 3000))
+              for i in range(300)]
+    bodies += HTML_EDGE_CASES + ["", "Login now! verify your PASSWORD ¹²³ ٣٤", "a\xa0b\u3000c x\x1cy",
+                                 "İstanbul \u212a LOGIN", "\ud800 lone surrogate", "naïve résumé — ①②"]
+    subjects = [random_text(rng, rng.randint(0, 8)) for _ in bodies]
+
+    expected = previous_text_feature_columns(subjects, bodies)
+    columns = text_feature_columns(subjects, bodies)
+    for name in TEXT_FEATURES:
+        assert columns[name].tolist() == expected[name].tolist(), name
+    for subject, body in zip(subjects[:20], bodies[:20]):
+        combined = subject + " " + body
+        assert text_features(combined.encode("utf-8")) == text_features(combined)
+
+
+def test_url_features_match_the_per_url_code():
+    urls = sample_urls(20000)
+
+    matrix = url_feature_matrix(urls)
+
+    for url, row in zip(urls, matrix.tolist()):
+        expected = reference_url_features(url)
+        assert row == [expected[name] for name in URL_FEATURES], url
+
+
+def test_html_stripping_matches_beautifulsoup():
+    rng = random.Random(1)
+    documents = HTML_EDGE_CASES + [random_text(rng, rng.randint(0, 60)) for _ in range(5000)] + [newsletter_html(50)]
+
+    for markup in documents:
+        # BeautifulSoup collapses whitespace-only strings, so compare modulo whitespace runs.
+        assert html_to_text(markup).split() == BeautifulSoup(markup, "html.parser").get_text().split(), markup
+        assert clean_text(markup) == reference_clean_text(markup), markup
+
+
+@pytest.mark.parametrize("relative_path", FOREST_MODELS)
+def test_compiled_forests_match_sklearn_bit_for_bit(relative_path):
+    forest = final_forest(load_model_file(relative_path))
+
+    assert verify_forest(CompiledForest(forest), forest, probe_inputs(forest, n_rows=2000, seed=2))
+
+
+@pytest.mark.parametrize("relative_path,coerce", PIPELINE_MODELS)
+def test_preprocessing_plans_match_their_pipelines(relative_path, coerce):
+    pipeline = load_model_file(relative_path)
+
+    plan, estimator = compile_preprocessing(pipeline, coerce_numeric=coerce)
+
+    assert isinstance(plan, PreprocessingPlan), f"fell back to {type(plan).__name__}"
+    # End-to-end against the pipeline itself, on rows the original DataFrame path accepts.
+    records = probe_records(plan, n_rows=500, seed=3)
+    expected = pipeline.predict_proba(DataFramePlan(None, []).transform(records))
+    assert np.array_equal(estimator.predict_proba(plan.transform(records)), expected)
+
+
+@pytest.mark.parametrize("name", ["phishing", "malware", "networking"])
+def test_micro_batching_gives_the_unbatched_results(name):
+    model = loaded_model(name)
+    if name == "phishing":
+        records = sample_phishing_rows(512, seed=4)
+    elif name == "malware":
+        rng = random.Random(4)
+        records = [{f: rng.randint(0, 5000) for f in model.artifacts["malware_features"]} for _ in range(512)]
+    else:
+        records = [{**record, "protocol_type": "tcp", "service": "http", "flag": "SF"}
+                   for record in probe_records(model.plan, n_rows=512, seed=4)]
+    scorer = lambda batch: scoring.score(name, batch)
+
+    async def unbatched():
+        return await asyncio.gather(*[run_in_threadpool(scorer, [record]) for record in records])
+
+    async def batched():
+        batcher = MicroBatcher(lambda batch: run_in_threadpool(scorer, batch))
+        return await asyncio.gather(*[batcher.submit(record) for record in records])
+
+    assert asyncio.run(batched()) == [result[0] for result in asyncio.run(unbatched())]
+
+
+def test_cached_predictions_match_uncached_ones():
+    loaded_model("phishing")
+    # Campaign-like traffic: a few hundred distinct messages, each reported many times.
+    pool = sample_phishing_rows(200, seed=5)
+    rng = random.Random(5)
+    records = [dict(rng.choice(pool)) for _ in range(2000)]
+    version = scoring.model_version("phishing")
+    cache = PredictionCache()
+
+    async def score(batch):
+        return scoring.score("phishing", batch)
+
+    results = [asyncio.run(cache.score("phishing", version, [record], score))[0] for record in records]
+
+    assert results == [scoring.score("phishing", [record])[0] for record in records]
+    assert cache.stats()["hit_rate"] > 0
@@ -7,9 +7,10 @@ from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
-import joblib
 from pathlib import Path
 
+from cyberrakshak_ml.registry import save_atomically
+
 # -------------------------------------------------------------------
 # 1️⃣ Load the dataset
 # -------------------------------------------------------------------
@@ -106,7 +107,7 @@ print(classification_report(y_test, y_pred))
 # 10) Save the model
 # -------------------------------------------------------------------
 model_path = MODELS_DIR / "zero_day_model.pkl"
-joblib.dump(clf, model_path)
+save_atomically(clf, model_path)
 print(f"\n✅ Model saved to: {model_path}")
 
 # -------------------------------------------------------------------